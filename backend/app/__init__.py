@@ -1,17 +1,40 @@
 # backend/app/__init__.py (Blueprintを使わないバージョン)
-from flask import Flask, jsonify, request, Response, make_response # 必要なものをインポート
+from flask import Flask, jsonify, request, Response, make_response, stream_with_context, g # 必要なものをインポート
 from flask_cors import CORS
 import os
+import time
 from datetime import datetime
 import traceback # エラーログ用
+import json
 
 # サービスとユーティリティをインポート
 from .services import gemini_service
 from .services import scoring_service
+from .services import evaluation_service
+from .services import result_store
+from .services import job_queue
+from .services import metrics
 from .utils import text_processing
 from .utils import export_utils
+from .utils import profiling
 from . import config # config.py をインポート
 
+def _format_sse(event, data):
+    """Server-Sent Events 形式の1イベント分の文字列を作る"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _read_candidate_text():
+    """
+    リクエストから候補者テキストを取り出す
+    Content-Type: text/plain の場合は本文そのものを候補者テキストとして扱い、ストリームのまま渡す
+    (巨大な貼り付けでも全体をメモリに読み込まず、フッターが見つかった時点で読むのをやめられる)
+    Returns:
+        tuple: (候補者の生テキスト or ストリーム, エラーメッセージ or None)
+    """
+    if request.mimetype == 'text/plain':
+        return request.stream, None
+    return evaluation_service.parse_evaluate_request(request.get_json())
+
 def create_app():
     app = Flask(__name__)
 
@@ -21,12 +44,63 @@ def create_app():
         app,
         origins=[frontend_url] if frontend_url != '*' else '*',
         methods=["GET", "POST", "OPTIONS"],
-        allow_headers=["Content-Type", "Authorization"],
+        allow_headers=["Content-Type", "Authorization", config.PROFILING_HEADER],
         supports_credentials=True, # 一旦 True のまま試す
         automatic_options=True # これが効かない前提で進めるが、念のため残す
     )
     print(f"CORS enabled for origins: {frontend_url} with methods and headers.")
 
+    # --- バックグラウンドジョブの処理スレッド (再起動前に受け付けた未処理の分もここから続ける) ---
+    # gunicorn --preload では create_app は master で1回だけ呼ばれるので、fork した各ワーカーでは
+    # 最初のリクエストで起動する (プロセスごとに1回だけ。job_queue.start_workers を参照)
+    # JOB_WORKERS_AUTOSTART が無効 (ベンチマーク・テストなど) なら起動しない
+    if config.JOB_WORKERS_AUTOSTART:
+        job_queue.start_workers()
+
+        @app.before_request
+        def ensure_job_workers():
+            job_queue.start_workers()
+
+    # --- リクエストごとの処理時間 (/metrics の http_request_duration_seconds) ---
+    # リクエストごとに print すると負荷が高いときに標準出力で詰まるので、ログの代わりにここで数える
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_duration(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=request.method, route=route, status=str(response.status_code)
+            )
+        return response
+
+    # --- リクエスト単位のプロファイリング (config.PROFILING_ENABLED のときだけ) ---
+    # X-Profile: 1 ヘッダーか PROFILING_SAMPLE_RATE で選ばれたリクエストを、レスポンスを送り終わるまでサンプリングする
+    # (エクスポートは本文をストリーミングで生成するので、after_request ではなく送り終わった時点で止める)
+    @app.before_request
+    def start_request_profile():
+        if request.method == 'POST':
+            g.request_profile = profiling.start_request_profile(request.path, request.headers.get(config.PROFILING_HEADER))
+
+    @app.after_request
+    def finish_request_profile(response):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            response.headers['X-Profile-File'] = profile.filename
+            response.call_on_close(profile.finish)
+        return response
+
+    @app.teardown_request
+    def abandon_request_profile(exc):
+        # 例外で after_request が呼ばれなかった場合は、ここでサンプリングを止める
+        # (after_request まで進んだリクエストは g から取り出し済みなので、送り終わるまで止めない)
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.finish()
+
     # --- ルート定義をここに直接記述 ---
 
     @app.route('/')
@@ -38,66 +112,128 @@ def create_app():
     def handle_evaluate_options():
         response = make_response()
         # Flask-CORSがヘッダーを付与してくれるはず
-        print("Handling OPTIONS request for /api/evaluate (direct)")
         return response, 200
 
     # --- /api/evaluate POST ハンドラ ---
     @app.route('/api/evaluate', methods=['POST'])
     def evaluate_candidate():
-        print("'/api/evaluate' endpoint hit! (POST - direct)")
+        raw_candidate_text, error = _read_candidate_text()
+        if error:
+            return jsonify({"error": error}), 400
+
+        payload, status_code = evaluation_service.evaluate_candidate_text(raw_candidate_text)
+        return jsonify(payload), status_code
+
+    # --- /api/evaluate/batch POST ハンドラ ---
+    @app.route('/api/evaluate/batch', methods=['POST'])
+    def evaluate_candidates_batch():
         data = request.get_json()
-        if not data or 'candidate_text' not in data:
-            return jsonify({"error": "Missing 'candidate_text' in request body"}), 400
-
-        raw_candidate_text = data['candidate_text']
-        print(f"Received raw text length: {len(raw_candidate_text)}")
-        # ...(ログ)
-
-        candidate_text = text_processing.clean_candidate_text(raw_candidate_text)
-        if candidate_text: print(f"Cleaned text length: {len(candidate_text)}")
-        # ...(ログ)
-        else: print("Warning: Cleaned text is empty after processing.")
-
-        # configからプロンプト取得
-        criteria_prompt_text = config.CRITERIA_PROMPT
-        full_prompt = gemini_service.build_evaluation_prompt(criteria_prompt_text)
-        evaluation_result = gemini_service.evaluate_with_gemini(full_prompt, candidate_text)
-
-        if evaluation_result:
-            if isinstance(evaluation_result, dict) and evaluation_result.get("error"):
-                 print(f"Gemini evaluation returned an error: {evaluation_result}")
-                 return jsonify({"error": "Evaluation failed during Gemini processing", "details": evaluation_result}), 500
-            calculated_scores = scoring_service.calculate_scores(evaluation_result)
-            final_response = {
-                "gemini_evaluation": evaluation_result,
-                "calculated_scores": calculated_scores
+        candidate_texts, max_concurrency, error = evaluation_service.parse_batch_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        batch_result = evaluation_service.evaluate_batch(candidate_texts, max_concurrency)
+        return jsonify(batch_result), 200
+
+    # --- /api/evaluate/stream POST ハンドラ (Server-Sent Events) ---
+    @app.route('/api/evaluate/stream', methods=['POST'])
+    def evaluate_candidate_stream():
+        raw_candidate_text, error = _read_candidate_text()
+        if error:
+            return jsonify({"error": error}), 400
+
+        def generate_events():
+            for event, event_data in evaluation_service.stream_candidate_evaluation(raw_candidate_text):
+                yield _format_sse(event, event_data)
+
+        return Response(
+            stream_with_context(generate_events()),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no", # プロキシでバッファリングされないようにする
             }
-            return jsonify(final_response), 200
-        else:
-            print("Evaluation failed in gemini_service (returned None).")
-            return jsonify({"error": "Evaluation failed due to Gemini API call error"}), 500
+        )
+
+    # --- /api/jobs POST ハンドラ (バックグラウンドジョブ) ---
+    # 件数が多く1リクエストに収まらない評価を受け付け、すぐにジョブIDを返す (202)
+    @app.route('/api/jobs', methods=['POST'])
+    def submit_job():
+        payload, status_code = job_queue.submit_job(request.get_json())
+        return jsonify(payload), status_code
+
+    # --- /api/jobs/<job_id> GET ハンドラ (進み具合のポーリング。?results=1 で終わった分の結果も返す) ---
+    @app.route('/api/jobs/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        payload, status_code = job_queue.get_job_status(job_id, request.args)
+        return jsonify(payload), status_code
+
+    # --- /api/rescore POST ハンドラ ---
+    @app.route('/api/rescore', methods=['POST'])
+    def rescore_results():
+        payload, status_code = evaluation_service.rescore_evaluations(request.get_json())
+        return jsonify(payload), status_code
+
+    # --- /api/usage GET ハンドラ ---
+    @app.route('/api/usage', methods=['GET'])
+    def usage_report():
+        # モデルごとの呼び出し回数・平均応答時間・トークン数・コスト見積もりと、段階評価・事前判定の集計
+        return jsonify({
+            "models": gemini_service.client.usage.report(),
+            "tiering": evaluation_service.tiering_report(),
+            "prescreen": evaluation_service.prescreen_report(),
+        }), 200
+
+    # --- /metrics GET ハンドラ (Prometheus のテキスト形式) ---
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        # 段階ごとの処理時間・Gemini の応答時間とトークン数・キャッシュヒット・再試行などの集計 (このプロセスの分)
+        return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+    # --- /api/results GET ハンドラ ---
+    @app.route('/api/results', methods=['GET'])
+    def list_results():
+        response_data, status_code = evaluation_service.list_results(request.args)
+        return jsonify(response_data), status_code
 
     # --- /api/export POST ハンドラ ---
     @app.route('/api/export', methods=['POST'])
     def export_results():
-        print("'/api/export' endpoint hit! (direct)")
         data = request.get_json()
-        results_list = data.get('resultsList')
-        export_format = data.get('format')
-        if not results_list or not isinstance(results_list, list): return jsonify({"error": "Missing or invalid 'resultsList'"}), 400
+        export_format = data.get('format') if data else None
         if export_format not in ['csv', 'md']: return jsonify({"error": "Invalid or missing 'format'"}), 400
 
-        print(f"Received {len(results_list)} results to export in {export_format} format.")
+        # 出力対象は、結果そのもの (resultsList)・保存済みのID (resultIds)・条件 (filter) のどれかで指定する
+        results_list = data.get('resultsList')
+        result_ids = data.get('resultIds')
+        result_filter = data.get('filter')
+        store = result_store.get_result_store()
+        if results_list is not None:
+            if not results_list or not isinstance(results_list, list): return jsonify({"error": "Missing or invalid 'resultsList'"}), 400
+        elif result_ids is not None or result_filter is not None:
+            if store is None: return jsonify({"error": "Result store is disabled"}), 400
+            if result_ids is not None:
+                if not result_ids or not isinstance(result_ids, list): return jsonify({"error": "Invalid 'resultIds'"}), 400
+                results_list = [result for result in store.get_many(result_ids) if result]
+                if not results_list: return jsonify({"error": "No stored results found for 'resultIds'"}), 404
+            else:
+                if not isinstance(result_filter, dict): return jsonify({"error": "Invalid 'filter'"}), 400
+                # 件数が多くてもメモリに載せないよう、保存先から1件ずつ読みながら出力する
+                results_list = store.iter_results(result_filter.get('since'), result_filter.get('until'), result_filter.get('limit'))
+        else:
+            return jsonify({"error": "Missing 'resultsList', 'resultIds' or 'filter'"}), 400
+
         filename_base = f"evaluation_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         filename = f"{filename_base}.{export_format}"
         file_content = ""
         mimetype = "text/plain"
         try:
             if export_format == 'csv':
-                file_content = export_utils.generate_csv(results_list)
+                # 1件ずつ生成しながら送るので、件数が多くてもメモリを食わない
+                file_content = stream_with_context(export_utils.iter_csv(results_list))
                 mimetype = "text/csv; charset=utf-8-sig"
             elif export_format == 'md':
-                file_content = export_utils.generate_markdown(results_list)
+                file_content = stream_with_context(export_utils.iter_markdown(results_list))
                 mimetype = "text/markdown; charset=utf-8"
             return Response(
                 file_content,
@@ -1,4 +1,5 @@
 # backend/app/config.py
+import os
 
 # --- 評価基準プロンプト ---
 # 長いので三重引用符で囲む
@@ -70,3 +71,155 @@ ITEM_WEIGHTS = {
 
 # --- その他の設定 (例: デフォルトモデル名など、必要なら追加) ---
 # DEFAULT_GEMINI_MODEL = "gemini-2.5-pro-exp-03-25"
+
+# --- バッチ評価の設定 (/api/evaluate/batch) ---
+# 同時に Gemini へ投げるリクエスト数の上限 (リクエスト側の max_concurrency もこの値で頭打ち)
+BATCH_MAX_CONCURRENCY = 8
+# 1回のバッチで受け付ける候補者数の上限
+BATCH_MAX_ITEMS = 200
+
+# --- ローカルデータの保存先 ---
+# キャッシュ等のファイルは backend/data/ 以下に置く (Git管理外)。環境変数 BACKEND_DATA_DIR で変更できる
+DATA_DIR = os.environ.get(
+    "BACKEND_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+)
+
+# --- 評価結果キャッシュの設定 ---
+# 同じテキスト・プロンプト・モデルの組み合わせなら Gemini を呼ばずに前回の結果を返す
+CACHE_ENABLED = True
+CACHE_MAX_ENTRIES = 1024                 # メモリ上に保持する件数 (LRU)
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60     # 有効期限 (7日)
+# SQLite に保存する場合はパスを指定 (None ならメモリのみ)
+# 例: CACHE_SQLITE_PATH = os.path.join(DATA_DIR, "evaluation_cache.sqlite3")
+CACHE_SQLITE_PATH = None
+CACHE_SQLITE_MAX_ENTRIES = 100000        # SQLite に保持する件数の上限
+# SQLite の最終アクセス時刻 (古い順に消すときの順番) は取り出すたびには書き込まず、この件数たまったら、または保存のときにまとめて書く
+CACHE_SQLITE_ACCESS_FLUSH_ENTRIES = 256
+
+# --- 非同期 (ASGI) モードの設定 (asgi.py) ---
+# Gemini 呼び出し以外の Flask ルート (ヘルスチェック、エクスポートなど) を処理するスレッド数
+ASGI_WSGI_THREADS = 16
+
+# --- 再スコア計算の設定 (/api/rescore) ---
+# 1回のリクエストで再計算できる評価結果の件数の上限
+RESCORE_MAX_ITEMS = 100000
+# 保存済みの評価結果 (ID 指定) の記号スコアの行を覚えておく件数 (scoring_service.SymbolRowCache)
+# 同じ結果を重みを変えて何度も再計算するときに、行列の組み立てを省ける。1件あたり数百バイト
+RESCORE_ROW_CACHE_SIZE = int(os.environ.get("RESCORE_ROW_CACHE_SIZE", "100000"))
+
+# --- バックグラウンドジョブの設定 (/api/jobs, services/job_queue.py) ---
+# 大量の候補者 (1リクエストのタイムアウトに収まらない件数) を受け付けてすぐジョブIDを返し、
+# 各ワーカープロセス内のスレッドが1件ずつ評価する。状態は SQLite に置くので、再起動しても続きから処理できる
+JOBS_ENABLED = True
+JOB_STORE_PATH = os.path.join(DATA_DIR, "jobs.sqlite3")
+# 1回のジョブで受け付ける候補者数の上限
+JOB_MAX_ITEMS = 1000
+# 1プロセスあたりのジョブ処理スレッド数 (Gemini を同時に呼ぶ数。クォータは GeminiClient 側で守られる)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+# create_app で処理スレッドを起動するか。ベンチマーク・テスト・単発のスクリプトでは 0 にする
+# (0 でも、そのプロセスで /api/jobs にジョブを登録したときは起動する)
+JOB_WORKERS_AUTOSTART = os.environ.get("JOB_WORKERS_AUTOSTART", "1").lower() in ("1", "true", "yes")
+# 新しいジョブが無いか確認する間隔 (秒)。同じプロセスで受け付けたジョブはすぐに処理を始める
+JOB_POLL_INTERVAL_SECONDS = 2.0
+# 処理中の1件の期限 (秒)。処理しているワーカーは JOB_HEARTBEAT_SECONDS ごとに期限を延ばすので、
+# 評価に何分かかっても (速いモデル → 本番のモデル → 修復・再評価) 取り直されることはない。
+# 延長が止まって期限が切れた (ワーカーが落ちた) 1件だけを、別のワーカー (再起動後の自分も含む) がやり直す
+JOB_LEASE_SECONDS = 60
+JOB_HEARTBEAT_SECONDS = 15
+# 1件をやり直す回数の上限 (これを超えたら失敗として記録する)
+JOB_MAX_ATTEMPTS = 3
+
+# --- リクエスト単位のプロファイリング (utils/profiling.py) ---
+# 有効にすると、対象のルートのリクエストを一定間隔でサンプリングし、collapsed-stack 形式 (.folded) で書き出す
+# (flamegraph.pl / speedscope でフレームグラフにできる)。本番でも PROFILING_ENABLED を立てたときだけ動く
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+# このヘッダーに 1 を付けたリクエストはプロファイルする (例: curl -H "X-Profile: 1" ...)
+PROFILING_HEADER = "X-Profile"
+# ヘッダーが無いリクエストをプロファイルする確率 (0.01 なら 1%。0 ならヘッダーを付けたものだけ)
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+# サンプリング間隔 (秒)。短くするほど細かく取れるが、プロファイル中のリクエストの負荷が上がる
+PROFILING_INTERVAL_SECONDS = float(os.environ.get("PROFILING_INTERVAL_SECONDS", "0.005"))
+PROFILING_OUTPUT_DIR = os.environ.get("PROFILING_OUTPUT_DIR", os.path.join(DATA_DIR, "profiles"))
+# プロファイルの対象にするルート
+PROFILING_ROUTES = ("/api/evaluate", "/api/export")
+
+# --- 評価結果の保存設定 ---
+# /api/evaluate の結果をサーバー側に保存し、エクスポートや一覧ではIDや条件だけで取り出せるようにする
+RESULT_STORE_ENABLED = True
+RESULT_STORE_PATH = os.path.join(DATA_DIR, "results.sqlite3")
+# GET /api/results で1ページに返す件数 (省略時) と上限
+RESULTS_LIST_DEFAULT_LIMIT = 50
+RESULTS_LIST_MAX_LIMIT = 500
+
+# --- 使用するGeminiモデル ---
+# 評価の本番に使うモデル (精度重視)
+GEMINI_MODEL_NAME = 'gemini-2.5-pro-exp-03-25'
+# 一次評価に使う速くて安いモデル (JSON の修復にも使う)
+GEMINI_FAST_MODEL_NAME = 'gemini-2.0-flash'
+# モデルごとの料金 (100万トークンあたりの米ドル)。/api/usage のコスト見積もりに使う
+GEMINI_MODEL_PRICING = {
+    'gemini-2.5-pro-exp-03-25': {"input": 1.25, "output": 10.0},
+    'gemini-2.0-flash': {"input": 0.10, "output": 0.40},
+}
+
+# --- モデルの呼び出し先 ---
+# "live": Gemini API を呼ぶ / "fake": オフラインの代役 (services/fake_gemini.py) が評価JSONを返す
+# fake は APIキー・クォータを使わずにサーバー全体の負荷試験をするためのもの (benchmarks/load_test.py)
+GEMINI_BACKEND = os.environ.get("GEMINI_BACKEND", "live")
+# fake の応答時間 (対数正規分布の中央値 [秒] と σ。σ=0 なら毎回同じ時間)
+FAKE_GEMINI_LATENCY_SECONDS = float(os.environ.get("FAKE_GEMINI_LATENCY_SECONDS", "1.5"))
+FAKE_GEMINI_LATENCY_SIGMA = float(os.environ.get("FAKE_GEMINI_LATENCY_SIGMA", "0.4"))
+
+# --- 段階評価 (ティアリング) の設定 ---
+# まず速いモデルで評価し、暫定の総合マッチ度がこの範囲 (以上, 以下) に入る「判断が微妙な」候補者だけを
+# 本番のモデルで評価し直す。範囲外 (明らかに不合格・合格) は速いモデルの結果をそのまま使う
+TIERING_ENABLED = True
+TIERING_ESCALATION_BAND = (35.0, 80.0)
+
+# --- 必須条件の事前判定 (utils/prescreen.py) ---
+# クレンジング後のテキストから年齢・雇用形態・副業/業務委託の希望を正規表現で取り出し、required の暫定の記号を決める
+PRESCREEN_ENABLED = True
+# 暫定の記号に × (明らかに必須条件を満たさない) があれば、Gemini を呼ばずに事前判定の結果だけで評価を返す
+PRESCREEN_SHORT_CIRCUIT = True
+# 年齢条件 (以上, 以下)。範囲外でもこの歳数以内の差なら × ではなく △ にして Gemini に任せる
+PRESCREEN_AGE_RANGE = (23, 30)
+PRESCREEN_AGE_MARGIN = 2
+
+# --- Gemini API 呼び出しの設定 (gemini_service の GeminiClient) ---
+# API のクォータ (1分あたりのリクエスト数・トークン数)。プランに合わせて変更する
+# (負荷試験でクォータの影響を外したいときは環境変数で上書きできる)
+GEMINI_RPM_LIMIT = int(os.environ.get("GEMINI_RPM_LIMIT", "150"))
+GEMINI_TPM_LIMIT = int(os.environ.get("GEMINI_TPM_LIMIT", "2000000"))
+# 送信前にクォータを確保するときの、評価JSONの出力トークン数の見込み (応答後に実際の使用量で補正する)
+GEMINI_EXPECTED_OUTPUT_TOKENS = 2000
+# 429 / 5xx などの一時的なエラーの再試行 (指数バックオフ + ジッター)
+GEMINI_MAX_RETRIES = 5
+GEMINI_BACKOFF_BASE_SECONDS = 1.0
+GEMINI_BACKOFF_MAX_SECONDS = 30.0
+# 1回の呼び出しのタイムアウトと、再試行・待ち時間を含めた1リクエスト全体の期限 (秒)
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = 120
+GEMINI_DEADLINE_SECONDS = 300
+# 構造化出力 (response_mime_type='application/json' + ITEM_WEIGHTS から作ったスキーマ) を使うか
+GEMINI_STRUCTURED_OUTPUT = True
+# 出力が JSON として読めない・項目が欠けている場合に、もう一度だけ頼み直す回数
+#   読めない → 壊れた出力だけを送って JSON に直してもらう (評価のやり直しより安い)
+#   項目が欠けている → 評価をやり直す
+GEMINI_OUTPUT_RETRIES = 1
+
+# --- 候補者テキストの圧縮設定 (utils/prompt_compaction.py) ---
+# クレンジング後のテキストがこのトークン数を超えたら、評価に関係の薄い自由記述から削る
+COMPACTION_ENABLED = True
+COMPACTION_TOKEN_BUDGET = 4000
+# トークン数の数え方: "approx" (ローカルで見積もる) / "model" (Gemini の count_tokens を呼ぶ。1回の評価で2回APIを呼ぶ)
+COMPACTION_TOKEN_COUNTER = "approx"
+# 評価基準が見ている語。これを含む文は最後まで残す (基準を変えたらここも見直すこと)
+COMPACTION_KEEP_KEYWORDS = [
+    "歳", "年齢",                                                     # 年齢
+    "副業", "兼業", "業務委託", "委託", "フリーランス", "個人事業",         # 副業・業務委託
+    "正社員", "契約社員", "派遣", "アルバイト", "パート", "雇用形態",
+    "ホテル", "旅館", "宿泊", "リゾート", "民宿", "ゲストハウス",          # 宿泊業の経験
+    "フロント", "客室", "ルーム", "料飲", "宴会",
+    "支配人", "マネージャー", "マネジャー", "責任者", "主任", "リーダー", "店長", "管理", # マネージャーレベル
+    "転職", "退職", "離職",                                            # 転職希望
+    "適応", "チーム", "協調", "人間関係", "連携",                         # 適応力・チームワーク
+]
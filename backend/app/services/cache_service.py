@@ -0,0 +1,196 @@
+# backend/app/services/cache_service.py
+# Geminiの評価結果をキャッシュするモジュール
+# 同じ候補者テキスト・同じプロンプト・同じモデルなら、結果は使い回せるので API 呼び出しを省略する
+#   1段目: メモリ上の LRU (プロセス内、一番速い)
+#   2段目: SQLite ファイル (任意。プロセス再起動やワーカー間でも共有できる)
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .. import config
+
+
+def make_cache_key(candidate_text, prompt, model_name):
+    """
+    キャッシュキーを作る関数 (内容アドレス方式)
+    Args:
+        candidate_text (str): クレンジング後の候補者テキスト
+        prompt (str): build_evaluation_prompt で組み立てた完全なプロンプト
+        model_name (str): 使用するGeminiモデル名
+    Returns:
+        str: SHA-256 の16進文字列
+    """
+    hasher = hashlib.sha256()
+    # 区切りに NUL を挟んで、連結の仕方による衝突を避ける
+    for part in (model_name, prompt, candidate_text):
+        hasher.update((part or "").encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+class EvaluationCache:
+    """
+    TTL とサイズ上限つきの2段キャッシュ
+    値は JSON 文字列で保持し、取り出すたびに新しい辞書を返す (呼び出し側が書き換えても安全)
+    """
+
+    def __init__(self, max_entries, ttl_seconds, sqlite_path=None, sqlite_max_entries=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path
+        self.sqlite_max_entries = sqlite_max_entries
+        self._memory = OrderedDict() # key -> (有効期限, JSON文字列)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pending_access = {} # key -> 最終アクセス時刻 (SQLite にまだ書いていない分)
+        if sqlite_path:
+            # ファイルと接続は最初に使うときに開く (import しただけではファイルを作らない)
+            print(f"Evaluation cache SQLite tier enabled: {sqlite_path}")
+
+    # --- SQLite 層 ---
+    def _connection(self):
+        """
+        このスレッド用の SQLite 接続を返す (result_store.ResultStore と同じく、スレッドごとに持つ)
+        fork 前のプロセス (gunicorn --preload の master) で開いた接続は子プロセスで使わない
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._open_sqlite(self.sqlite_path)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _open_sqlite(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS evaluation_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluation_cache_last_access ON evaluation_cache (last_access)")
+        conn.commit()
+        return conn
+
+    def _sqlite_get(self, key, now):
+        # 読むだけで書き込みはしない (期限切れの行は保存のときにまとめて消す)
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM evaluation_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return row
+
+    def _take_pending_access(self, force=False):
+        """書き込み待ちの最終アクセス時刻を取り出す (force でなければ、たまっていないときは空)"""
+        with self._lock:
+            if not self._pending_access or (not force and len(self._pending_access) < config.CACHE_SQLITE_ACCESS_FLUSH_ENTRIES):
+                return []
+            pending = list(self._pending_access.items())
+            self._pending_access.clear()
+        return pending
+
+    def _flush_access(self, conn, pending):
+        if pending:
+            conn.executemany(
+                "UPDATE evaluation_cache SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in pending],
+            )
+
+    def _sqlite_set(self, key, value, expires_at, now):
+        conn = self._connection()
+        with conn:
+            # 消す順番が正しくなるよう、たまっている最終アクセス時刻を先に書く
+            self._flush_access(conn, self._take_pending_access(force=True))
+            conn.execute(
+                "INSERT OR REPLACE INTO evaluation_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            # 期限切れの削除と、件数上限を超えた分を古い順 (最終アクセス順) に削除
+            conn.execute("DELETE FROM evaluation_cache WHERE expires_at <= ?", (now,))
+            if self.sqlite_max_entries:
+                conn.execute(
+                    "DELETE FROM evaluation_cache WHERE key IN ("
+                    " SELECT key FROM evaluation_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.sqlite_max_entries,),
+                )
+
+    # --- メモリ層 ---
+    def _memory_set(self, key, value, expires_at):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False) # 一番使われていないものから捨てる
+
+    # --- 公開メソッド ---
+    def get(self, key):
+        """
+        キャッシュから評価結果を取り出す。無い・期限切れなら None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return json.loads(value)
+                del self._memory[key]
+
+        if not self.sqlite_path:
+            return None
+        found = self._sqlite_get(key, now)
+        if found is None:
+            return None
+        value, expires_at = found
+        with self._lock:
+            self._memory_set(key, value, expires_at) # メモリ層にも載せておく
+            self._pending_access[key] = now
+        pending = self._take_pending_access()
+        if pending:
+            conn = self._connection()
+            with conn:
+                self._flush_access(conn, pending)
+        return json.loads(value)
+
+    def set(self, key, evaluation_result):
+        """
+        評価結果をキャッシュに保存する
+        """
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        value = json.dumps(evaluation_result, ensure_ascii=False)
+        with self._lock:
+            self._memory_set(key, value, expires_at)
+            self._pending_access.pop(key, None)
+        if self.sqlite_path:
+            self._sqlite_set(key, value, expires_at, now)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending_access.clear()
+        if self.sqlite_path:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM evaluation_cache")
+
+
+# アプリ全体で共有するキャッシュ (CACHE_ENABLED が False なら None)
+evaluation_cache = None
+if config.CACHE_ENABLED:
+    evaluation_cache = EvaluationCache(
+        max_entries=config.CACHE_MAX_ENTRIES,
+        ttl_seconds=config.CACHE_TTL_SECONDS,
+        sqlite_path=config.CACHE_SQLITE_PATH,
+        sqlite_max_entries=config.CACHE_SQLITE_MAX_ENTRIES,
+    )
@@ -0,0 +1,103 @@
+# backend/app/services/evaluation_schema.py
+# Gemini の評価結果 (JSON) の形を決めるモジュール
+# config.ITEM_WEIGHTS のカテゴリ・項目から、構造化出力用のスキーマと検証処理を作る。
+# 評価項目を増減したら ITEM_WEIGHTS を変えるだけで、スキーマと検証も追従する。
+from .. import config
+
+# 表記ゆれの評価記号を、SCORE_MAP のキーにそろえるための対応表
+SYMBOL_ALIASES = {
+    "○": "〇", "◯": "〇", "O": "〇", "o": "〇",
+    "◉": "◎", "⊚": "◎",
+    "▲": "△", "▵": "△",
+    "x": "×", "X": "×", "✕": "×", "✖": "×", "❌": "×",
+}
+
+
+def build_response_schema():
+    """
+    構造化出力 (response_mime_type='application/json') 用のレスポンススキーマを作る関数
+    Returns:
+        dict: Gemini の response_schema に渡せる辞書
+    """
+    symbols = list(config.SCORE_MAP.keys())
+    item_schema = {
+        "type": "object",
+        "properties": {
+            "symbol": {"type": "string", "enum": symbols},
+            "reason": {"type": "string"},
+        },
+        "required": ["symbol", "reason"],
+    }
+    categories = {}
+    for category, items in config.ITEM_WEIGHTS.items():
+        categories[category] = {
+            "type": "object",
+            "properties": {item_key: item_schema for item_key in items},
+            "required": list(items),
+        }
+    return {
+        "type": "object",
+        "properties": {
+            "evaluation": {"type": "object", "properties": categories, "required": list(categories)},
+            "candidate_identifier": {"type": "string"},
+            "overall_comment": {"type": "string"},
+        },
+        "required": ["evaluation", "candidate_identifier", "overall_comment"],
+    }
+
+
+def _normalize_symbol(symbol):
+    if not isinstance(symbol, str):
+        return None
+    symbol = symbol.strip()
+    if symbol in config.SCORE_MAP:
+        return symbol
+    if symbol in SYMBOL_ALIASES:
+        return SYMBOL_ALIASES[symbol]
+    # "〇 (good)" のように説明が付いている場合は先頭の1文字で判断する
+    head = symbol[:1]
+    head = SYMBOL_ALIASES.get(head, head)
+    return head if head in config.SCORE_MAP else None
+
+
+def normalize_evaluation(result):
+    """
+    評価結果を検証し、ローカルで直せるところは直す関数 (渡した辞書を書き換える)
+    直すもの: 評価記号の表記ゆれ、reason / candidate_identifier / overall_comment の欠け
+    直せないもの (problems に入る): 評価項目の欠け、記号として読めない値
+    Args:
+        result (dict): パース済みの評価結果
+    Returns:
+        list[str]: 直せなかった問題の説明 (空なら有効な評価結果)
+    """
+    if not isinstance(result, dict):
+        return ["result is not a JSON object"]
+    evaluation = result.get("evaluation")
+    if not isinstance(evaluation, dict):
+        return ["missing 'evaluation' object"]
+
+    problems = []
+    for category, items in config.ITEM_WEIGHTS.items():
+        category_result = evaluation.get(category)
+        if not isinstance(category_result, dict):
+            problems.append(f"missing category '{category}'")
+            continue
+        for item_key in items:
+            item = category_result.get(item_key)
+            if isinstance(item, str):
+                item = category_result[item_key] = {"symbol": item} # 記号だけが返ってきた場合
+            if not isinstance(item, dict):
+                problems.append(f"missing item '{category}.{item_key}'")
+                continue
+            symbol = _normalize_symbol(item.get("symbol"))
+            if symbol is None:
+                problems.append(f"invalid symbol for '{category}.{item_key}': {item.get('symbol')!r}")
+                continue
+            item["symbol"] = symbol
+            if not isinstance(item.get("reason"), str):
+                item["reason"] = "" if item.get("reason") is None else str(item["reason"])
+
+    for key in ("candidate_identifier", "overall_comment"):
+        if not isinstance(result.get(key), str):
+            result[key] = "" if result.get(key) is None else str(result[key])
+    return problems
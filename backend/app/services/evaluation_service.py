@@ -0,0 +1,604 @@
+# backend/app/services/evaluation_service.py
+# クレンジング → Gemini評価 → スコア計算 の一連の流れ (パイプライン) をまとめたモジュール
+# /api/evaluate, /api/evaluate/batch, /api/evaluate/stream の各ルートと、ASGIモード (asgi.py) からここを呼ぶ
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import traceback
+
+from . import gemini_service
+from . import scoring_service
+from . import cache_service
+from . import result_store
+from . import metrics
+from ..utils import text_processing
+from ..utils import prompt_compaction
+from ..utils import prescreen
+from .. import config
+
+
+def parse_evaluate_request(data):
+    """
+    /api/evaluate のリクエストボディを検証する
+    Returns:
+        tuple: (候補者の生テキスト, エラーメッセージ or None)
+    """
+    if not isinstance(data, dict) or 'candidate_text' not in data:
+        return None, "Missing 'candidate_text' in request body"
+    return data['candidate_text'], None
+
+
+def parse_batch_request(data):
+    """
+    /api/evaluate/batch のリクエストボディを検証する
+    Returns:
+        tuple: (候補者テキストのリスト, 同時実行数 or None, エラーメッセージ or None)
+    """
+    candidate_texts = data.get('candidate_texts') if isinstance(data, dict) else None
+    if not candidate_texts or not isinstance(candidate_texts, list):
+        return None, None, "Missing or invalid 'candidate_texts' in request body"
+    if len(candidate_texts) > config.BATCH_MAX_ITEMS:
+        return None, None, f"Too many candidates (max {config.BATCH_MAX_ITEMS})"
+
+    max_concurrency = data.get('max_concurrency')
+    if max_concurrency is not None and (not isinstance(max_concurrency, int) or max_concurrency < 1):
+        return None, None, "'max_concurrency' must be a positive integer"
+    return candidate_texts, max_concurrency, None
+
+
+# 評価に使うモデルの組み合わせ (キャッシュキーに入れて、設定を変えたら別の結果として扱う)
+if config.TIERING_ENABLED:
+    EVALUATION_MODEL_KEY = "{}>{}@{}-{}".format(
+        gemini_service.FAST_MODEL_NAME, gemini_service.MODEL_NAME, *config.TIERING_ESCALATION_BAND
+    )
+else:
+    EVALUATION_MODEL_KEY = gemini_service.MODEL_NAME
+
+# 段階評価の集計 (速いモデルで評価した件数と、本番のモデルに回した件数)
+_tiering_lock = threading.Lock()
+_tiering_counts = {"screened": 0, "escalated": 0}
+# 事前判定の集計 (判定した件数と、Gemini を呼ばずに返した件数)
+_prescreen_counts = {"checked": 0, "short_circuited": 0}
+
+
+def _prepare_evaluation(raw_candidate_text):
+    """
+    クレンジング・圧縮とプロンプト組み立て、キャッシュキーの計算までを行う (通常版・ストリーミング版で共通)
+    Returns:
+        tuple: (クレンジング後テキスト, 完全なプロンプト, キャッシュキー, 事前判定の結果 or None)
+    """
+    # 各段階の処理時間は metrics に記録する (リクエストごとの print はしない)
+    with metrics.span("cleanse"):
+        candidate_text = text_processing.clean_candidate_text(raw_candidate_text)
+    if not candidate_text:
+        print("Warning: Cleaned text is empty after processing.")
+
+    # 事前判定は圧縮前のテキストで行う (圧縮で条件の行が削られても判定できるように)
+    prescreen_info = None
+    if config.PRESCREEN_ENABLED and candidate_text:
+        with metrics.span("prescreen"):
+            prescreen_info = _run_prescreen(candidate_text)
+
+    if config.COMPACTION_ENABLED and candidate_text:
+        count_tokens = gemini_service.count_tokens if config.COMPACTION_TOKEN_COUNTER == "model" else prompt_compaction.count_tokens_approx
+        with metrics.span("compact"):
+            candidate_text, stats = prompt_compaction.compact_candidate_text(candidate_text, count_tokens=count_tokens)
+        # 圧縮前後のトークン数と、削った・短くした行数 (/metrics の compaction_*)
+        metrics.COMPACTION_TOKENS.observe(stats["before_tokens"], phase="before")
+        metrics.COMPACTION_TOKENS.observe(stats["after_tokens"], phase="after")
+        metrics.COMPACTION_LINES.inc(stats["dropped_lines"], action="dropped")
+        metrics.COMPACTION_LINES.inc(stats["trimmed_lines"], action="trimmed")
+
+    # 評価基準 + JSON出力指示は起動時に組み立て済み (モデルの system_instruction として送られる)
+    full_prompt = gemini_service.EVALUATION_PROMPT
+    with metrics.span("cache_key"):
+        cache_key = cache_service.make_cache_key(candidate_text, full_prompt, EVALUATION_MODEL_KEY)
+    return candidate_text, full_prompt, cache_key, prescreen_info
+
+
+def _run_prescreen(candidate_text):
+    """
+    必須条件の事前判定を行う (正規表現だけなので Gemini 呼び出しに比べて無視できる時間で終わる)
+    Returns:
+        dict: facts (取り出した事実), required (暫定の記号), short_circuit (Gemini を省略するか)
+    """
+    facts = prescreen.extract_facts(candidate_text)
+    symbols = prescreen.provisional_required_symbols(facts)
+    short_circuit = config.PRESCREEN_SHORT_CIRCUIT and prescreen.is_clear_disqualification(symbols)
+    with _tiering_lock:
+        _prescreen_counts["checked"] += 1
+        if short_circuit:
+            _prescreen_counts["short_circuited"] += 1
+    return {"facts": facts, "required": symbols, "short_circuit": short_circuit}
+
+
+def _finish_prescreen(prescreen_info, cache_key):
+    """事前判定で不合格と分かった候補者のレスポンスを、Gemini を呼ばずに組み立てる"""
+    evaluation_result = prescreen.build_prescreen_evaluation(prescreen_info["facts"], prescreen_info["required"])
+    return _finish_evaluation(evaluation_result, cache_key, False, "prescreen", prescreen_info)
+
+
+def _lookup_cache(cache_key):
+    cache = cache_service.evaluation_cache
+    if not cache:
+        return None
+    evaluation_result = cache.get(cache_key)
+    metrics.CACHE_LOOKUPS.inc(result="miss" if evaluation_result is None else "hit")
+    return evaluation_result
+
+
+def _needs_escalation(evaluation_result):
+    """
+    速いモデルの結果を本番のモデルで評価し直すべきか
+    失敗した場合と、暫定の総合マッチ度が TIERING_ESCALATION_BAND に入る (判断が微妙な) 場合に True
+    """
+    if not evaluation_result or (isinstance(evaluation_result, dict) and evaluation_result.get("error")):
+        return True
+    total = scoring_service.calculate_scores(evaluation_result).get("total_match_percentage")
+    low, high = config.TIERING_ESCALATION_BAND
+    return total is None or low <= total <= high
+
+
+def _record_tiering(escalated):
+    with _tiering_lock:
+        _tiering_counts["screened"] += 1
+        if escalated:
+            _tiering_counts["escalated"] += 1
+
+
+def prescreen_report():
+    """/api/usage 用: 事前判定の設定と、Gemini を呼ばずに返した割合"""
+    with _tiering_lock:
+        counts = dict(_prescreen_counts)
+    return {
+        "enabled": config.PRESCREEN_ENABLED,
+        "short_circuit": config.PRESCREEN_SHORT_CIRCUIT,
+        "checked": counts["checked"],
+        "short_circuited": counts["short_circuited"],
+        "short_circuit_rate": round(counts["short_circuited"] / counts["checked"], 3) if counts["checked"] else None,
+    }
+
+
+def tiering_report():
+    """/api/usage 用: 段階評価の設定と、本番のモデルに回した割合"""
+    with _tiering_lock:
+        counts = dict(_tiering_counts)
+    return {
+        "enabled": config.TIERING_ENABLED,
+        "escalation_band": list(config.TIERING_ESCALATION_BAND),
+        "screened": counts["screened"],
+        "escalated": counts["escalated"],
+        "escalation_rate": round(counts["escalated"] / counts["screened"], 3) if counts["screened"] else None,
+    }
+
+
+def _evaluate_tiered(full_prompt, candidate_text):
+    """
+    段階評価: まず速いモデルで評価し、判断が微妙なものだけ本番のモデルで評価し直す
+    Returns:
+        tuple: (評価結果, 使ったティア "fast" / "pro")
+    """
+    if not config.TIERING_ENABLED:
+        return gemini_service.evaluate_with_gemini(full_prompt, candidate_text), "pro"
+    evaluation_result = gemini_service.evaluate_with_gemini(full_prompt, candidate_text, tier="fast")
+    escalated = _needs_escalation(evaluation_result)
+    _record_tiering(escalated)
+    if not escalated:
+        return evaluation_result, "fast"
+    return gemini_service.evaluate_with_gemini(full_prompt, candidate_text), "pro"
+
+
+async def _evaluate_tiered_async(full_prompt, candidate_text):
+    """_evaluate_tiered の非同期版"""
+    if not config.TIERING_ENABLED:
+        return await gemini_service.evaluate_with_gemini_async(full_prompt, candidate_text), "pro"
+    evaluation_result = await gemini_service.evaluate_with_gemini_async(full_prompt, candidate_text, tier="fast")
+    escalated = _needs_escalation(evaluation_result)
+    _record_tiering(escalated)
+    if not escalated:
+        return evaluation_result, "fast"
+    return await gemini_service.evaluate_with_gemini_async(full_prompt, candidate_text), "pro"
+
+
+def _finish_evaluation(evaluation_result, cache_key, from_cache, model_tier=None, prescreen_info=None):
+    """
+    Geminiの評価結果 (またはキャッシュ) からレスポンスを組み立てる (通常版・ストリーミング版で共通)
+    Args:
+        model_tier (str, optional): 評価したモデルのティア ("fast" / "pro" / 事前判定のみなら "prescreen")。キャッシュから返す場合は None
+        prescreen_info (dict, optional): 事前判定の結果 (レスポンスの prescreen に入れる)
+    Returns:
+        tuple: (レスポンス用の辞書, HTTPステータスコード)
+    """
+    source = "cache" if from_cache else (model_tier or "pro")
+    if evaluation_result:
+        if isinstance(evaluation_result, dict) and evaluation_result.get("error"):
+            print(f"Gemini evaluation returned an error: {evaluation_result.get('error')}")
+            metrics.EVALUATIONS.inc(source=source, outcome="error")
+            return {"error": "Evaluation failed during Gemini processing", "details": evaluation_result}, 500
+        cache = cache_service.evaluation_cache
+        if cache and not from_cache and model_tier != "prescreen":
+            cache.set(cache_key, evaluation_result) # 正常な結果だけをキャッシュする
+        with metrics.span("score"):
+            calculated_scores = scoring_service.calculate_scores(evaluation_result)
+        final_response = {
+            "gemini_evaluation": evaluation_result,
+            "calculated_scores": calculated_scores,
+            "cached": from_cache,
+            "evaluation_id": cache_key # /api/rescore で再計算するときに使うID
+        }
+        if model_tier:
+            final_response["model_tier"] = model_tier
+        if prescreen_info:
+            final_response["prescreen"] = {
+                "facts": prescreen_info["facts"],
+                "required": prescreen_info["required"],
+                "short_circuited": prescreen_info["short_circuit"],
+            }
+        with metrics.span("store"):
+            _save_result(final_response)
+        metrics.EVALUATIONS.inc(source=source, outcome="ok")
+        return final_response, 200
+    else:
+        print("Evaluation failed in gemini_service (returned None).")
+        metrics.EVALUATIONS.inc(source=source, outcome="error")
+        return {"error": "Evaluation failed due to Gemini API call error"}, 500
+
+
+def _save_result(final_response):
+    """
+    評価結果をサーバー側に保存し、result_id と evaluated_at をレスポンスに追加する
+    保存に失敗しても評価自体は成功として返す
+    """
+    store = result_store.get_result_store()
+    if store is None:
+        return
+    try:
+        result_id, evaluated_at = store.add({
+            "gemini_evaluation": final_response["gemini_evaluation"],
+            "calculated_scores": final_response["calculated_scores"],
+            "evaluation_id": final_response["evaluation_id"],
+            "model_tier": final_response.get("model_tier"),
+        })
+        final_response["result_id"] = result_id
+        final_response["evaluated_at"] = evaluated_at
+    except Exception as e:
+        print(f"Error saving evaluation result: {e}")
+
+
+def evaluate_candidate_text(raw_candidate_text):
+    """
+    候補者1名分の生テキストを評価する関数
+    Args:
+        raw_candidate_text (str or file-like): フロントエンドから受け取った生のテキスト (またはそのストリーム)
+    Returns:
+        tuple: (レスポンス用の辞書, HTTPステータスコード)
+    """
+    candidate_text, full_prompt, cache_key, prescreen_info = _prepare_evaluation(raw_candidate_text)
+    # 必須条件を明らかに満たさない場合は Gemini を呼ばない
+    if prescreen_info and prescreen_info["short_circuit"]:
+        return _finish_prescreen(prescreen_info, cache_key)
+
+    # 同じ内容を評価済みならキャッシュから返す (API呼び出しをスキップ)
+    evaluation_result = _lookup_cache(cache_key)
+    from_cache = evaluation_result is not None
+    model_tier = None
+    if not from_cache:
+        evaluation_result, model_tier = _evaluate_tiered(full_prompt, candidate_text)
+
+    return _finish_evaluation(evaluation_result, cache_key, from_cache, model_tier, prescreen_info)
+
+
+async def evaluate_candidate_text_async(raw_candidate_text):
+    """
+    evaluate_candidate_text の非同期版 (ASGIモード用)
+    Gemini の応答待ちは await で待つ。クレンジング・キャッシュの参照・スコア計算と結果の保存 (SQLite) は
+    イベントループを止めないよう、asyncio.to_thread で別スレッドに回す
+    """
+    candidate_text, full_prompt, cache_key, prescreen_info = await asyncio.to_thread(
+        _prepare_evaluation, raw_candidate_text
+    )
+    if prescreen_info and prescreen_info["short_circuit"]:
+        return await asyncio.to_thread(_finish_prescreen, prescreen_info, cache_key)
+
+    evaluation_result = await asyncio.to_thread(_lookup_cache, cache_key)
+    from_cache = evaluation_result is not None
+    model_tier = None
+    if not from_cache:
+        evaluation_result, model_tier = await _evaluate_tiered_async(full_prompt, candidate_text)
+
+    return await asyncio.to_thread(
+        _finish_evaluation, evaluation_result, cache_key, from_cache, model_tier, prescreen_info
+    )
+
+
+def stream_candidate_evaluation(raw_candidate_text):
+    """
+    evaluate_candidate_text のストリーミング版 (SSE用)
+    Geminiの出力を届いた順に流しつつ、カテゴリ (required, preferred, other) が
+    出揃うたびにその項目と途中経過のスコアを返す。
+    Args:
+        raw_candidate_text (str or file-like): フロントエンドから受け取った生のテキスト (またはそのストリーム)
+    Yields:
+        tuple: (イベント名, データの辞書)
+            chunk    : {"text": 生成テキストの断片}
+            category : {"category": カテゴリ名, "items": 項目の辞書, "partial_scores": 途中のスコア}
+            result   : /api/evaluate と同じ形の最終結果
+            error    : {"error": ..., "status": HTTPステータス相当}
+    """
+    candidate_text, full_prompt, cache_key, prescreen_info = _prepare_evaluation(raw_candidate_text)
+    categories = list(config.ITEM_WEIGHTS.keys())
+
+    short_circuit = bool(prescreen_info and prescreen_info["short_circuit"])
+    evaluation_result = None if short_circuit else _lookup_cache(cache_key)
+    from_cache = evaluation_result is not None
+    if short_circuit:
+        evaluation_result = prescreen.build_prescreen_evaluation(prescreen_info["facts"], prescreen_info["required"])
+    if not from_cache and not short_circuit:
+        generated_text = ""
+        completed = {}
+        try:
+            for text in gemini_service.stream_with_gemini(full_prompt, candidate_text):
+                generated_text += text
+                yield "chunk", {"text": text}
+                newly_completed = gemini_service.extract_completed_categories(generated_text, categories, skip=completed)
+                # 生成順ではなく config の並び順で返す
+                for category in categories:
+                    if category in newly_completed:
+                        completed[category] = newly_completed[category]
+                        partial_scores = scoring_service.calculate_scores({"evaluation": completed}, partial=True)
+                        yield "category", {"category": category, "items": completed[category], "partial_scores": partial_scores}
+        except Exception as e:
+            print(f"Error during Gemini streaming API call: {e}")
+            yield "error", {"error": "Evaluation failed due to Gemini API call error", "status": 500}
+            return
+        evaluation_result = gemini_service.parse_evaluation_text(generated_text)
+        evaluation_result = gemini_service.recover_evaluation(full_prompt, candidate_text, generated_text, evaluation_result)
+    else:
+        # キャッシュヒット・事前判定のみの場合も、クライアント側の処理を揃えるためカテゴリごとのイベントを送る
+        completed = {}
+        for category in categories:
+            items = evaluation_result.get("evaluation", {}).get(category)
+            if items is not None:
+                completed[category] = items
+                partial_scores = scoring_service.calculate_scores({"evaluation": completed}, partial=True)
+                yield "category", {"category": category, "items": items, "partial_scores": partial_scores}
+
+    # ストリーミングは途中経過を流すため、段階評価はせず本番のモデルだけで評価する
+    if short_circuit:
+        model_tier = "prescreen"
+    else:
+        model_tier = None if from_cache else "pro"
+    payload, status_code = _finish_evaluation(evaluation_result, cache_key, from_cache, model_tier, prescreen_info)
+    if status_code == 200:
+        yield "result", payload
+    else:
+        payload["status"] = status_code
+        yield "error", payload
+
+
+def _evaluate_batch_item(raw_candidate_text):
+    """
+    バッチ内の1件を評価する。1件の失敗でバッチ全体が止まらないよう、例外もここで受け止める
+    """
+    if not isinstance(raw_candidate_text, str):
+        return {"error": "'candidate_text' must be a string"}, 400
+    try:
+        return evaluate_candidate_text(raw_candidate_text)
+    except Exception as e:
+        print(f"Unexpected error during batch item evaluation: {e}")
+        traceback.print_exc()
+        return {"error": "Unexpected error during evaluation"}, 500
+
+
+def evaluate_batch(raw_candidate_texts, max_concurrency=None):
+    """
+    複数の候補者テキストを並列に評価する関数
+    Gemini呼び出しはI/O待ちが大半なので、スレッドプールで同時に投げる。
+    バッチ全体の所要時間は、合計ではなく一番遅い1件の時間に近くなる。
+    Args:
+        raw_candidate_texts (list[str]): 候補者の生テキストのリスト
+        max_concurrency (int, optional): 同時実行数。省略時は config.BATCH_MAX_CONCURRENCY
+    Returns:
+        dict: 入力と同じ順番の各件の結果 (results) と成功/失敗件数
+    """
+    workers = _batch_workers(raw_candidate_texts, max_concurrency)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(_evaluate_batch_item, raw_candidate_texts))
+
+    return _collect_batch_results(outcomes)
+
+
+async def evaluate_batch_async(raw_candidate_texts, max_concurrency=None):
+    """
+    evaluate_batch の非同期版 (ASGIモード用)。同時実行数はセマフォで制限する
+    """
+    workers = _batch_workers(raw_candidate_texts, max_concurrency)
+    semaphore = asyncio.Semaphore(workers)
+
+    async def evaluate_item(raw_candidate_text):
+        if not isinstance(raw_candidate_text, str):
+            return {"error": "'candidate_text' must be a string"}, 400
+        async with semaphore:
+            try:
+                return await evaluate_candidate_text_async(raw_candidate_text)
+            except Exception as e:
+                print(f"Unexpected error during batch item evaluation: {e}")
+                traceback.print_exc()
+                return {"error": "Unexpected error during evaluation"}, 500
+
+    outcomes = await asyncio.gather(*(evaluate_item(text) for text in raw_candidate_texts))
+    return _collect_batch_results(outcomes)
+
+
+def _batch_workers(raw_candidate_texts, max_concurrency):
+    if max_concurrency is None:
+        max_concurrency = config.BATCH_MAX_CONCURRENCY
+    # 設定値を上限として、1 ～ 件数 の範囲に収める
+    return max(1, min(max_concurrency, config.BATCH_MAX_CONCURRENCY, len(raw_candidate_texts)))
+
+
+def _collect_batch_results(outcomes):
+    results = []
+    succeeded = 0
+    for index, (payload, status_code) in enumerate(outcomes):
+        item = {"index": index, "status": status_code}
+        item.update(payload)
+        results.append(item)
+        if status_code == 200:
+            succeeded += 1
+
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+    }
+
+
+def rescore_evaluations(data):
+    """
+    保存済みの評価結果 (Geminiの出力) から、Geminiを呼ばずにスコアだけを計算し直す関数
+    重みを変えたときの「もしも」の比較を、数百件でも一瞬で行える。
+    Args:
+        data (dict): リクエストボディ
+            evaluations (list[dict], optional): gemini_evaluation そのもののリスト
+            ids (list[str], optional): /api/evaluate が返した evaluation_id のリスト (キャッシュから取り出す)
+            result_ids (list[str], optional): /api/evaluate が返した result_id のリスト (保存済みの結果から取り出す)
+            weights (dict, optional): 重みの上書き (scoring_service.resolve_weights を参照)
+    Returns:
+        tuple: (レスポンス用の辞書, HTTPステータスコード)
+    """
+    if not isinstance(data, dict):
+        return {"error": "Missing request body"}, 400
+    evaluations = data.get('evaluations') or []
+    evaluation_ids = data.get('ids') or []
+    result_ids = data.get('result_ids') or []
+    if not all(isinstance(value, list) for value in (evaluations, evaluation_ids, result_ids)):
+        return {"error": "'evaluations', 'ids' and 'result_ids' must be arrays"}, 400
+    if not evaluations and not evaluation_ids and not result_ids:
+        return {"error": "Provide 'evaluations', 'ids' and/or 'result_ids' to rescore"}, 400
+    if result_ids and result_store.get_result_store() is None:
+        return {"error": "Result store is disabled"}, 400
+    if len(evaluations) + len(evaluation_ids) + len(result_ids) > config.RESCORE_MAX_ITEMS:
+        return {"error": f"Too many evaluations (max {config.RESCORE_MAX_ITEMS})"}, 400
+
+    item_weights, category_weights, error = scoring_service.resolve_weights(data.get('weights'))
+    if error:
+        return {"error": error}, 400
+
+    # 入力順に (結果の雛形, 評価データ, 行のキャッシュのキー) を並べる。見つからないIDはエラーとして返す
+    # 以前に再計算した ID は記号スコアの行を覚えているので (scoring_service.SymbolRowCache)、評価データを読み込まない
+    id_keys = [("id", evaluation_id) for evaluation_id in evaluation_ids if isinstance(evaluation_id, str)]
+    id_keys += [("result_id", result_id) for result_id in result_ids if isinstance(result_id, str)]
+    cached_rows = scoring_service.symbol_rows.get_many(id_keys, scoring_service.symbol_layout(item_weights))
+
+    entries = []
+    for evaluation_result in evaluations:
+        entries.append(({}, evaluation_result, None))
+    cache = cache_service.evaluation_cache
+    for evaluation_id in evaluation_ids:
+        key = ("id", evaluation_id) if isinstance(evaluation_id, str) else None
+        stored = None
+        if key is not None and key not in cached_rows and cache:
+            stored = cache.get(evaluation_id)
+        entries.append(({"id": evaluation_id}, stored, key))
+    if result_ids:
+        uncached_ids = [result_id for result_id in result_ids
+                        if isinstance(result_id, str) and ("result_id", result_id) not in cached_rows]
+        stored_results = dict(zip(uncached_ids, result_store.get_result_store().get_many(uncached_ids)))
+        for result_id in result_ids:
+            key = ("result_id", result_id) if isinstance(result_id, str) else None
+            stored = stored_results.get(result_id) if key is not None else None
+            entries.append(({"result_id": result_id}, stored["gemini_evaluation"] if stored else None, key))
+
+    scorable = [(index, evaluation_result, key) for index, (_, evaluation_result, key) in enumerate(entries)
+                if key in cached_rows or (isinstance(evaluation_result, dict) and "evaluation" in evaluation_result)]
+    bulk_scores = scoring_service.calculate_scores_bulk(
+        [evaluation_result for _, evaluation_result, _ in scorable], item_weights, category_weights,
+        keys=[key for _, _, key in scorable], cached_rows=cached_rows,
+    )
+    scores_by_index = {index: scores for (index, _, _), scores in zip(scorable, bulk_scores)}
+
+    results = []
+    for index, (item, evaluation_result, _) in enumerate(entries):
+        item = dict(item, index=index)
+        if index in scores_by_index:
+            item["calculated_scores"] = scores_by_index[index]
+        elif ("id" in item or "result_id" in item) and evaluation_result is None:
+            item["error"] = "Evaluation not found (unknown or expired id)"
+        else:
+            item["error"] = "Invalid evaluation data (missing 'evaluation')"
+        results.append(item)
+
+    return {
+        "results": results,
+        "weights": {"item_weights": item_weights, "category_weights": category_weights},
+    }, 200
+
+
+def list_results(args):
+    """
+    /api/results (GET) の本体: 保存済みの評価結果を並べ替え・絞り込みして1ページ分返す
+    Args:
+        args (MultiDict): クエリパラメータ (request.args)
+            ids: カンマ区切りの result_id (指定した場合は他の条件を無視してそのIDだけ返す)
+            sort: created_at / total_match_percentage / required_score / preferred_score / other_score
+            order: asc / desc (省略時 desc)
+            limit: 1ページの件数
+            cursor: 前のページの next_cursor
+            since, until: 評価日時の範囲
+            min_<スコア列>, max_<スコア列>: スコアの範囲 (例: min_total_match_percentage=80)
+            symbol: 項目の記号 (例: required.age:◎ / 複数の記号を並べると「どれか」、パラメータを繰り返すと「すべて」)
+    Returns:
+        tuple: (レスポンス辞書, HTTPステータスコード)
+    """
+    store = result_store.get_result_store()
+    if store is None:
+        return {"error": "Result store is disabled"}, 400
+
+    ids = args.get('ids')
+    if ids:
+        results = [result for result in store.get_many(ids.split(',')) if result]
+        return {"results": results, "next_cursor": None}, 200
+
+    try:
+        limit = int(args.get('limit', config.RESULTS_LIST_DEFAULT_LIMIT))
+    except ValueError:
+        return {"error": "'limit' must be an integer"}, 400
+    limit = max(1, min(limit, config.RESULTS_LIST_MAX_LIMIT))
+
+    score_ranges = {}
+    for column in result_store.SCORE_COLUMNS:
+        minimum, maximum = args.get(f'min_{column}'), args.get(f'max_{column}')
+        if minimum is None and maximum is None:
+            continue
+        try:
+            score_ranges[column] = (
+                float(minimum) if minimum is not None else None,
+                float(maximum) if maximum is not None else None,
+            )
+        except ValueError:
+            return {"error": f"'min_{column}' / 'max_{column}' must be numbers"}, 400
+
+    symbols = []
+    for symbol_arg in args.getlist('symbol'):
+        item_path, _, allowed = symbol_arg.partition(':')
+        category, _, item_key = item_path.partition('.')
+        if not category or not item_key or not allowed:
+            return {"error": f"Invalid 'symbol' filter: {symbol_arg} (expected e.g. required.age:◎)"}, 400
+        symbols.append((category, item_key, list(allowed)))
+
+    try:
+        results, next_cursor = store.query(
+            sort=args.get('sort', 'created_at'),
+            order=args.get('order', 'desc'),
+            limit=limit,
+            cursor=args.get('cursor'),
+            since=args.get('since'),
+            until=args.get('until'),
+            score_ranges=score_ranges,
+            symbols=symbols,
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {"results": results, "next_cursor": next_cursor}, 200
@@ -0,0 +1,168 @@
+# backend/app/services/fake_gemini.py
+# オフラインで使える Gemini モデルの代役 (APIキー・ネットワーク不要)
+# genai.GenerativeModel と同じ呼び出し方 (generate_content / generate_content_async / count_tokens) ができ、
+# 受け取った内容を calls に記録するので、「毎回何を送っているか」を確認できる。
+#   例: gemini_service.client.model = FakeGenerativeModel(gemini_service.MODEL_NAME, system_instruction=gemini_service.EVALUATION_PROMPT)
+# config.GEMINI_BACKEND = "fake" (環境変数 GEMINI_BACKEND=fake) にすると、gemini_service のモデルがすべてこれに置き換わる
+# (APIキー・クォータを使わずにサーバー全体の負荷試験ができる。benchmarks/load_test.py を参照)
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+
+from .. import config
+from ..utils.prompt_compaction import count_tokens_approx
+
+# 項目ごとに返す評価記号 (config.ITEM_WEIGHTS の項目を順番に割り当てる)
+_FAKE_SYMBOLS = ["◎", "〇", "△", "×"]
+
+
+def build_fake_evaluation(seed=None):
+    """
+    config.ITEM_WEIGHTS の全項目を埋めた、評価結果のJSONと同じ形の辞書を作る
+    Args:
+        seed (optional): 指定すると、その値から決まる記号をランダムに割り当てる (省略時は ◎〇△× を順番に割り当てる)
+    """
+    rng = random.Random(seed) if seed is not None else None
+    evaluation = {}
+    position = 0
+    for category, items in config.ITEM_WEIGHTS.items():
+        evaluation[category] = {}
+        for item_key in items:
+            symbol = rng.choice(_FAKE_SYMBOLS) if rng else _FAKE_SYMBOLS[position % len(_FAKE_SYMBOLS)]
+            evaluation[category][item_key] = {
+                "symbol": symbol,
+                "reason": f"fake evaluation for {item_key}",
+            }
+            position += 1
+    return {"evaluation": evaluation, "candidate_identifier": "fake candidate", "overall_comment": "fake response"}
+
+
+def lognormal_latency(median_seconds, sigma, rng=None):
+    """
+    API の応答時間らしい (右に裾が長い) 待ち時間を返す関数を作る
+    Args:
+        median_seconds (float): 待ち時間の中央値 (秒)
+        sigma (float): ばらつき (対数正規分布の σ。0 なら常に median_seconds)
+    Returns:
+        callable: 呼ぶたびに待ち時間 (秒) を返す関数 (FakeGenerativeModel の delay に渡す)
+    """
+    rng = rng or random.Random()
+    lock = threading.Lock()
+    mu = math.log(median_seconds) if median_seconds > 0 else None
+
+    def sample():
+        if mu is None:
+            return 0.0
+        if sigma <= 0:
+            return median_seconds
+        with lock: # random.Random はスレッド間で共有しても壊れないが、再現性のため順番に引く
+            return rng.lognormvariate(mu, sigma)
+    return sample
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class _TokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class _Part:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    """
+    generate_content の応答 (text・parts と usage_metadata だけを持つ)
+    ストリーミングの断片では、本物と同じく usage_metadata にそこまでの出力の合計を入れる (generated_text)
+    """
+
+    def __init__(self, text, prompt_tokens, generated_text=None):
+        self.text = text
+        self.parts = [_Part(text)] if text else []
+        self.usage_metadata = _UsageMetadata(prompt_tokens, count_tokens_approx(text if generated_text is None else generated_text))
+
+
+class FakeGenerativeModel:
+    """
+    genai.GenerativeModel の代役
+    Args:
+        model_name (str): モデル名 (記録するだけ)
+        system_instruction (str, optional): システム指示 (毎回の入力トークン数には含めずに数える)
+        delay (float or callable): 1回の応答にかける秒数 (API の待ち時間の代わり)。
+            関数を渡すと呼ぶたびに待ち時間を決める (例: lognormal_latency(1.5, 0.4))
+        response_text (str, optional): 返すテキスト (省略時は build_fake_evaluation の結果。
+            generation_config で JSON 出力を指定した場合はそのまま、そうでなければ ```json で囲んだもの)
+        generation_config (dict, optional): genai.GenerativeModel と同じ生成設定
+        vary_by_content (bool): True なら送られた内容のハッシュから評価記号を決める
+            (同じ内容には同じ結果、内容が違えばスコアがばらつく。response_text を指定した場合は無視)
+        record_calls (bool): 受け取った contents を calls に残すか (長時間の負荷試験ではメモリを食うので False にする)
+    """
+
+    def __init__(self, model_name, system_instruction=None, delay=0.0, response_text=None, generation_config=None,
+                 vary_by_content=False, record_calls=True):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config
+        self.delay = delay
+        self.vary_by_content = vary_by_content and not response_text
+        self.record_calls = record_calls
+        self.response_text = response_text or self._evaluation_text(build_fake_evaluation())
+        self.calls = [] # 受け取った contents を順番に記録する
+        self._lock = threading.Lock()
+
+    def _evaluation_text(self, evaluation):
+        evaluation_json = json.dumps(evaluation, ensure_ascii=False, indent=2)
+        if (self.generation_config or {}).get("response_mime_type") != "application/json":
+            evaluation_json = "```json\n" + evaluation_json + "\n```"
+        return evaluation_json
+
+    def _response_for(self, contents):
+        if not self.vary_by_content:
+            return self.response_text
+        text = contents if isinstance(contents, str) else str(contents)
+        seed = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return self._evaluation_text(build_fake_evaluation(seed))
+
+    def _delay_seconds(self):
+        return self.delay() if callable(self.delay) else self.delay
+
+    def _record(self, contents):
+        if self.record_calls:
+            with self._lock:
+                self.calls.append(contents)
+        return count_tokens_approx(contents if isinstance(contents, str) else str(contents))
+
+    def generate_content(self, contents, stream=False, request_options=None, **kwargs):
+        prompt_tokens = self._record(contents)
+        response_text = self._response_for(contents)
+        if not stream:
+            time.sleep(self._delay_seconds())
+            return FakeResponse(response_text, prompt_tokens)
+        return self._stream(response_text, prompt_tokens)
+
+    def _stream(self, response_text, prompt_tokens, chunk_chars=64):
+        chunk_count = max(1, -(-len(response_text) // chunk_chars))
+        chunk_delay = self._delay_seconds() / chunk_count
+        for start in range(0, len(response_text), chunk_chars):
+            time.sleep(chunk_delay)
+            end = start + chunk_chars
+            yield FakeResponse(response_text[start:end], prompt_tokens, generated_text=response_text[:end])
+
+    async def generate_content_async(self, contents, request_options=None, **kwargs):
+        prompt_tokens = self._record(contents)
+        await asyncio.sleep(self._delay_seconds())
+        return FakeResponse(self._response_for(contents), prompt_tokens)
+
+    def count_tokens(self, contents, **kwargs):
+        return _TokenCount(count_tokens_approx(contents if isinstance(contents, str) else str(contents)))
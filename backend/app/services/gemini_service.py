@@ -1,33 +1,164 @@
 # backend/app/services/gemini_service.py
-import google.generativeai as genai
+# google.generativeai は読み込むだけで1秒近くかかるので、import 時には読み込まない。
+# モデルは LazyModel で包んでおき、最初に API を呼ぶときに genai の読み込み・configure・モデルの作成を行う
+# (gunicorn のワーカー起動やコールドスタートを軽くするため)
+import asyncio
+import copy
 import os
 import json # GeminiからのJSON応答を扱うためにインポートしておく
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from .. import config
+from . import cache_service
+from . import evaluation_schema
+from . import metrics
+from ..utils.prompt_compaction import count_tokens_approx
+from ..utils import json_repair
+from .fake_gemini import FakeGenerativeModel, lognormal_latency
 
 # --- APIキーの設定 ---
 # .envファイルからAPIキーを読み込む。
 # run.pyで load_dotenv() が実行されているので、ここでは os.environ.get で取得できる
 api_key = os.environ.get("GEMINI_API_KEY")
 
-if not api_key:
+if config.GEMINI_BACKEND == "fake":
+    # オフラインの代役を使うので API キーは不要
+    print(f"Using fake Gemini backend (latency median {config.FAKE_GEMINI_LATENCY_SECONDS}s, sigma {config.FAKE_GEMINI_LATENCY_SIGMA}).")
+elif not api_key:
     # APIキーが設定されていない場合はエラーメッセージを表示して、処理を続行しないようにする
     # (実際にはアプリケーション起動時にチェックする方がより堅牢)
     print("Error: GEMINI_API_KEY environment variable not set.")
     # raise ValueError("GEMINI_API_KEY environment variable not set.") # エラーを発生させて停止させることも可能
-else:
-    try:
-        # 取得したAPIキーを使ってGeminiクライアントを設定
-        genai.configure(api_key=api_key)
-        print("Gemini API configured successfully.")
-    except Exception as e:
-        print(f"Error configuring Gemini API: {e}")
-        # ここでもエラー処理を追加できる
+
+_genai = None # 読み込み・設定済みの google.generativeai モジュール
+_genai_lock = threading.Lock()
+
+
+def _load_genai():
+    """google.generativeai を読み込み、APIキーを設定して返す (最初の1回だけ)"""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            if api_key:
+                try:
+                    # 取得したAPIキーを使ってGeminiクライアントを設定
+                    genai.configure(api_key=api_key)
+                    print("Gemini API configured successfully.")
+                except Exception as e:
+                    print(f"Error configuring Gemini API: {e}")
+                    # ここでもエラー処理を追加できる
+            _genai = genai
+    return _genai
+
+
+def build_evaluation_prompt(criteria_prompt):
+     """
+     評価基準のプロンプトを受け取り、Geminiへの完全な指示を組み立てる関数（予定）
+     Args:
+         criteria_prompt (str): ユーザー定義の評価基準プロンプト
+     Returns:
+         str: Geminiに渡す最終的なプロンプト文字列
+     """
+     # 重要：ここでGeminiにJSON形式で応答するように明確に指示する！
+     json_output_instruction = """
+---
+Output the evaluation result strictly in the following JSON format. Do not include any other text before or after the JSON object.
+
+```json
+{
+  "evaluation": {
+    "required": {
+      "age": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
+      "side_job": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
+      "outsourcing": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"}
+    },
+    "preferred": {
+      "experience": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
+      "management_level": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"}
+    },
+    "other": {
+      "job_change_desire": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
+      "adaptability": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
+      "teamwork": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"}
+    }
+  },
+  "candidate_identifier": "候補者の名前や識別子 (抽出できれば)",
+  "overall_comment": "全体的な所見やコメント"
+}
+"""
+     # ユーザー定義の評価基準とJSON出力指示を組み合わせる
+     full_prompt = f"{criteria_prompt}\n{json_output_instruction}"
+     return full_prompt
+
+
+def create_model(model_name, system_instruction=None, generation_config=None):
+    """
+    config.GEMINI_BACKEND に応じてモデルを作る関数
+    "live" なら genai.GenerativeModel、"fake" ならオフラインの代役 (fake_gemini.FakeGenerativeModel)
+    """
+    if config.GEMINI_BACKEND == "fake":
+        return FakeGenerativeModel(
+            model_name,
+            system_instruction=system_instruction,
+            generation_config=generation_config,
+            delay=_fake_latency,
+            vary_by_content=True,
+            record_calls=False,
+        )
+    genai = _load_genai()
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction, generation_config=generation_config)
+
+
+class LazyModel:
+    """
+    最初に使われたときに create_model でモデルを作る代理オブジェクト
+    generate_content などの呼び出しは作ったモデルにそのまま渡す。model_name は作る前から参照できる
+    """
+
+    def __init__(self, model_name, system_instruction=None, generation_config=None):
+        self.model_name = model_name
+        self._options = {"system_instruction": system_instruction, "generation_config": generation_config}
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = create_model(self.model_name, **self._options)
+                    print(f"Gemini Model ({self.model_name}) initialized.")
+        return self._model
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+
+# 代役のモデルの待ち時間 (すべてのモデルで同じ分布を使う)
+_fake_latency = lognormal_latency(config.FAKE_GEMINI_LATENCY_SECONDS, config.FAKE_GEMINI_LATENCY_SIGMA)
 
 # --- 使用するモデルの準備 (例: gemini-pro) ---
 # ここで使うモデルを指定しておく。後で変更も可能。
 # generation_config や safety_settings もここで設定できる
-model = genai.GenerativeModel(
-    'gemini-2.5-pro-exp-03-25',
-    # 例: safety_settings=[ # コンテンツフィルターの設定 (必要に応じて調整)
+MODEL_NAME = config.GEMINI_MODEL_NAME # キャッシュキーにも使う
+FAST_MODEL_NAME = config.GEMINI_FAST_MODEL_NAME
+# 評価基準 + JSON出力指示はどのリクエストでも同じなので、起動時に1回だけ組み立てて
+# モデルの system_instruction として渡しておく (リクエストごとに送るのは候補者テキストだけになる)
+EVALUATION_PROMPT = build_evaluation_prompt(config.CRITERIA_PROMPT)
+# 構造化出力: JSON だけを、ITEM_WEIGHTS の全項目がそろった形で返してもらう
+JSON_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": evaluation_schema.build_response_schema(),
+}
+model = LazyModel(
+    MODEL_NAME,
+    system_instruction=EVALUATION_PROMPT,
+    generation_config=JSON_GENERATION_CONFIG if config.GEMINI_STRUCTURED_OUTPUT else None,
+    # 例 (live のみ): safety_settings=[ # コンテンツフィルターの設定 (必要に応じて調整)
     #     {
     #         "category": "HARM_CATEGORY_HARASSMENT",
     #         "threshold": "BLOCK_MEDIUM_AND_ABOVE"
@@ -38,129 +169,622 @@ model = genai.GenerativeModel(
     #     },
     # ]
     )
-print("Gemini Model (gemini-2.5-pro-exp-03-25) initialized.")
+# 一次評価用の速いモデル (同じ指示・同じ出力形式)
+fast_model = LazyModel(
+    FAST_MODEL_NAME,
+    system_instruction=EVALUATION_PROMPT,
+    generation_config=JSON_GENERATION_CONFIG if config.GEMINI_STRUCTURED_OUTPUT else None,
+)
+
+# 読めなかった出力を JSON に直してもらうためのモデル (候補者テキストや評価基準は送らない)
+REPAIR_INSTRUCTION = (
+    "You fix malformed JSON. The user message is the output of an evaluation that was supposed to be "
+    "a single JSON object matching the response schema. Return that JSON object only, keeping every "
+    "value as written. Do not re-evaluate or invent content."
+)
+repair_model = LazyModel(
+    FAST_MODEL_NAME, system_instruction=REPAIR_INSTRUCTION, generation_config=JSON_GENERATION_CONFIG
+)
+
+
+# --- API 呼び出しの共通処理 (クォータ管理・再試行・期限) ---
+def _retryable_errors():
+    """
+    一時的なエラーとして再試行する例外 (429 クォータ超過、5xx、タイムアウト)
+    google.api_core も読み込みが重いので、エラーが起きたときに初めて読み込む
+    """
+    from google.api_core import exceptions as google_exceptions
+    return (
+        google_exceptions.TooManyRequests, # ResourceExhausted (429) を含む
+        google_exceptions.InternalServerError,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout, # DeadlineExceeded (504) を含む
+    )
+
+
+class GeminiDeadlineExceeded(Exception):
+    """再試行や待ち時間を含めて、1リクエストの期限内に応答が得られなかった"""
+
+
+class TokenBucket:
+    """
+    トークンバケット方式の流量制限 (スレッドセーフ)
+    先に予約して残高をマイナスにし、その分だけ待つ方式なので、待っている呼び出しは到着順に進む
+    """
+
+    def __init__(self, capacity, per_minute):
+        self.capacity = float(capacity)
+        self.rate = per_minute / 60.0 # 1秒あたりの補充量
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount, max_wait=None):
+        """
+        amount 分を予約し、使えるようになるまでの待ち時間 (秒) を返す
+        待ち時間が max_wait を超える場合は予約せずに None を返す
+        """
+        amount = min(float(amount), self.capacity) # 容量を超える要求でも永遠に待たないように
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (amount - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= amount
+            return wait
+
+    def adjust(self, amount):
+        """見積もりとの差を補正する (正なら追加で消費、負なら返却)"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+def estimate_tokens(text):
+    """送信前にクォータを確保するための、おおまかなトークン数の見積もり (入力 + 出力の見込み)"""
+    return count_tokens_approx(text) + config.GEMINI_EXPECTED_OUTPUT_TOKENS
+
+
+# トークン数を数える専用のモデル (評価用の model で数えると system_instruction の分まで含まれてしまうため)
+_token_counter_model = LazyModel(MODEL_NAME)
+
+
+def count_tokens(text):
+    """
+    Gemini の count_tokens で実際のトークン数を数える (API 呼び出し1回)。失敗したら見積もりを返す
+    """
+    try:
+        return _token_counter_model.count_tokens(text).total_tokens
+    except Exception as e:
+        print(f"Error counting tokens with Gemini, using approximation: {e}")
+        return count_tokens_approx(text)
+
+
+def _model_name(model):
+    # genai のモデルは "models/gemini-..." の形で持っている
+    name = getattr(model, "model_name", None) or "unknown"
+    return name[len("models/"):] if name.startswith("models/") else name
+
+
+class ModelUsage:
+    """モデルごとの呼び出し回数・応答時間・トークン数を集計する (/api/usage で見る)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def record(self, model_name, seconds, response):
+        usage = getattr(response, "usage_metadata", None)
+        input_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        with self._lock:
+            entry = self._models.setdefault(
+                model_name, {"calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0}
+            )
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["input_tokens"] += input_tokens
+            entry["output_tokens"] += output_tokens
+        metrics.GEMINI_REQUEST_SECONDS.observe(seconds, model=model_name)
+        metrics.GEMINI_TOKENS.inc(input_tokens, model=model_name, direction="input")
+        metrics.GEMINI_TOKENS.inc(output_tokens, model=model_name, direction="output")
+
+    def report(self):
+        """
+        Returns:
+            dict: {モデル名: {calls, avg_latency_ms, input_tokens, output_tokens, estimated_cost_usd}}
+        """
+        with self._lock:
+            models = {name: dict(entry) for name, entry in self._models.items()}
+        report = {}
+        for name, entry in models.items():
+            pricing = config.GEMINI_MODEL_PRICING.get(name)
+            cost = None
+            if pricing:
+                cost = round((entry["input_tokens"] * pricing["input"] + entry["output_tokens"] * pricing["output"]) / 1_000_000, 6)
+            report[name] = {
+                "calls": entry["calls"],
+                "avg_latency_ms": round(entry["seconds"] / entry["calls"] * 1000, 1) if entry["calls"] else None,
+                "input_tokens": entry["input_tokens"],
+                "output_tokens": entry["output_tokens"],
+                "estimated_cost_usd": cost,
+            }
+        return report
+
+
+class GeminiClient:
+    """
+    Gemini 呼び出しの共通窓口 (アプリ全体で1つを共有する)
+    - RPM / TPM のトークンバケットでクォータ内に収まるよう送信を待たせる (429 を起こしにくくする)
+    - 429 / 5xx などはジッター付き指数バックオフで再試行する
+    - 1回ごとのタイムアウトと、再試行込みの全体の期限を守る
+    モデル (とその中の API クライアント) は作り直さずに使い回す。
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.usage = ModelUsage()
+        self.request_bucket = TokenBucket(config.GEMINI_RPM_LIMIT, config.GEMINI_RPM_LIMIT)
+        self.token_bucket = TokenBucket(config.GEMINI_TPM_LIMIT, config.GEMINI_TPM_LIMIT)
+
+    # --- 共通の下請け ---
+    def _reserve(self, estimated_tokens, deadline):
+        """RPM と TPM の両方を予約し、待つべき秒数を返す。期限までに間に合わなければ例外"""
+        remaining = deadline - time.monotonic()
+        request_wait = self.request_bucket.reserve(1, remaining)
+        if request_wait is None:
+            raise GeminiDeadlineExceeded("Rate limit wait exceeds the request deadline")
+        token_wait = self.token_bucket.reserve(estimated_tokens, remaining)
+        if token_wait is None:
+            self.request_bucket.adjust(-1) # 予約した分を戻す
+            raise GeminiDeadlineExceeded("Token quota wait exceeds the request deadline")
+        return max(request_wait, token_wait)
+
+    def _settle(self, response, estimated_tokens):
+        """応答に含まれる実際のトークン数で、見積もりとの差を補正する"""
+        usage = getattr(response, "usage_metadata", None)
+        total_tokens = getattr(usage, "total_token_count", None)
+        if total_tokens:
+            self.token_bucket.adjust(total_tokens - estimated_tokens)
+
+    def _request_options(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise GeminiDeadlineExceeded("Request deadline exceeded")
+        return {"timeout": min(config.GEMINI_ATTEMPT_TIMEOUT_SECONDS, remaining)}
+
+    def _backoff(self, attempt, error, deadline):
+        """再試行までの待ち時間 (フルジッター) を返す。再試行しない場合は None"""
+        if not isinstance(error, _retryable_errors()) or attempt >= config.GEMINI_MAX_RETRIES:
+            return None
+        delay = random.uniform(0, min(config.GEMINI_BACKOFF_MAX_SECONDS, config.GEMINI_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+        if time.monotonic() + delay >= deadline:
+            return None
+        print(f"Gemini API call failed ({type(error).__name__}), retrying in {delay:.1f}s (attempt {attempt + 1}/{config.GEMINI_MAX_RETRIES})")
+        metrics.GEMINI_RETRIES.inc(reason="api_error")
+        return delay
+
+    # --- 公開メソッド ---
+    def generate(self, content, stream=False, deadline_seconds=None, model=None):
+        """
+        model.generate_content をクォータ管理・再試行つきで呼ぶ
+        stream=True の場合、再試行するのは最初の応答が届くまで (途中で切れたら例外のまま返す)。
+        断片を最後まで読むと、最後の断片の usage_metadata で通常の呼び出しと同じく補正・記録する (_settle_stream)
+        model を渡すと、評価用のモデルの代わりにそれを使う (クォータは共通)
+        """
+        model = model or self.model
+        deadline = time.monotonic() + (deadline_seconds or config.GEMINI_DEADLINE_SECONDS)
+        estimated_tokens = estimate_tokens(content)
+        attempt = 0
+        while True:
+            wait = self._reserve(estimated_tokens, deadline)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                started = time.perf_counter()
+                response = model.generate_content(content, stream=stream, request_options=self._request_options(deadline))
+                if stream:
+                    return self._settle_stream(response, estimated_tokens, model, started)
+                self._settle(response, estimated_tokens)
+                self.usage.record(_model_name(model), time.perf_counter() - started, response)
+                return response
+            except Exception as e:
+                delay = self._backoff(attempt, e, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    def _settle_stream(self, response, estimated_tokens, model, started):
+        """
+        ストリーミングの応答を断片ごとにそのまま返すジェネレーター
+        最後の断片の usage_metadata にはそれまでの合計が入るので、読み終えたらそれでトークン数を補正し、使用量を記録する
+        """
+        last_chunk = None
+        for chunk in response:
+            last_chunk = chunk
+            yield chunk
+        if last_chunk is not None:
+            self._settle(last_chunk, estimated_tokens)
+            self.usage.record(_model_name(model), time.perf_counter() - started, last_chunk)
+
+    async def generate_async(self, content, deadline_seconds=None, model=None):
+        """generate の非同期版 (待ち時間は asyncio.sleep で待つので、イベントループを止めない)"""
+        model = model or self.model
+        if isinstance(model, LazyModel):
+            # 最初の呼び出しでは google.generativeai の import とモデルの作成が走るので、別スレッドで済ませておく
+            await asyncio.to_thread(model._resolve)
+        deadline = time.monotonic() + (deadline_seconds or config.GEMINI_DEADLINE_SECONDS)
+        estimated_tokens = estimate_tokens(content)
+        attempt = 0
+        while True:
+            wait = self._reserve(estimated_tokens, deadline)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                started = time.perf_counter()
+                response = await model.generate_content_async(content, request_options=self._request_options(deadline))
+                self._settle(response, estimated_tokens)
+                self.usage.record(_model_name(model), time.perf_counter() - started, response)
+                return response
+            except Exception as e:
+                delay = self._backoff(attempt, e, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+# アプリ全体で共有するクライアント
+client = GeminiClient(model)
+
+
+# --- 同一リクエストの相乗り (single-flight) ---
+# 同じ候補者テキスト・同じプロンプトの評価が同時に来たら、Gemini は1回だけ呼び、
+# 後から来たリクエストは実行中の呼び出しの結果を待って受け取る (ダブルクリックや複数人の同時送信対策)
+class SingleFlight:
+    """スレッド用: キーごとに実行中の呼び出しを1つだけにする"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {} # key -> Future
+
+    def do(self, key, func):
+        """
+        key の呼び出しが実行中ならその結果を待ち、無ければ func() を実行する
+        Returns:
+            tuple: (func の戻り値, 相乗りしたかどうか)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result(), True
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
+
+
+class AsyncSingleFlight:
+    """イベントループ用 (ASGIモード): SingleFlight と同じことを asyncio のタスクで行う"""
+
+    def __init__(self):
+        self._calls = {} # key -> asyncio.Task
+
+    async def do(self, key, coroutine_func):
+        task = self._calls.get(key)
+        if task is not None:
+            # shield: 待っている側がキャンセルされても、実行中の呼び出しは止めない
+            return await asyncio.shield(task), True
+        task = asyncio.ensure_future(coroutine_func())
+        self._calls[key] = task
+        # 登録は呼び出しが終わった時に外す (最初に来た側がキャンセルされても、後から来た側は相乗りできる)
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), False
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+
+
+def _single_flight_key(prompt, candidate_text, model_name):
+    # 評価結果キャッシュと同じ作り方のキー (同じ入力・同じモデルなら同じ結果になる単位)
+    return cache_service.make_cache_key(candidate_text, prompt, model_name)
+
+
+def _tier_model(tier):
+    """
+    段階評価のティア名から (モデル, モデル名) を返す
+    "pro" は client.model (None を渡すと client が使う)、"fast" は fast_model
+    """
+    if tier == "fast":
+        return fast_model, FAST_MODEL_NAME
+    return None, MODEL_NAME
+
+
+def _shared_result(result, joined):
+    # 相乗りした側には別の辞書を渡す (呼び出し元どうしで書き換えが干渉しないように)
+    if joined:
+        metrics.SINGLE_FLIGHT_JOINS.inc()
+        return copy.deepcopy(result)
+    return result
 
 
 # backend/app/services/gemini_service.py 内
 
+def build_request_content(prompt, candidate_text):
+    """
+    Geminiに渡す最終的なテキストコンテンツを作成する関数
+    プロンプトに加えて、評価対象のテキストも明確に渡す
+    プロンプトがモデルの system_instruction (EVALUATION_PROMPT) と同じなら、候補者テキストの部分だけを返す
+    """
+    candidate_content = f"## Candidate Information:\n```\n{candidate_text}\n```\n\n## Evaluation Output (JSON):\n"
+    if prompt is EVALUATION_PROMPT or prompt == EVALUATION_PROMPT:
+        return candidate_content
+    return f"{prompt}\n\n{candidate_content}"
+
+
+def parse_evaluation_text(generated_text):
+    """
+    Geminiが生成したテキストから評価結果のJSONを取り出す関数
+    構造化出力ならそのまま読めるが、```json の囲み・末尾のカンマ・途中での打ち切りなどはローカルで直してから読む。
+    読めた結果は evaluation_schema で検証し、記号の表記ゆれなどを直す。
+    Args:
+        generated_text (str): AIが生成したテキスト全体
+    Returns:
+        dict: 評価結果の辞書、または失敗時は "error" キーを含む辞書
+            (スキーマに合わない場合は "problems" に内容が入る)
+    """
+    with metrics.span("parse"):
+        result, repaired = json_repair.loads_tolerant(generated_text)
+        problems = evaluation_schema.normalize_evaluation(result) if result is not None else None
+    if result is None:
+        print("Error: Could not parse JSON from Gemini response.")
+        metrics.GEMINI_PARSE_RESULTS.inc(result="unreadable")
+        return {"error": "Gemini returned non-JSON response", "raw_response": generated_text}
+    if problems:
+        print(f"Error: Gemini response does not match the evaluation schema: {problems}")
+        metrics.GEMINI_PARSE_RESULTS.inc(result="invalid_schema")
+        return {"error": "Gemini response does not match the evaluation schema", "problems": problems,
+                "raw_response": generated_text}
+    metrics.GEMINI_PARSE_RESULTS.inc(result="repaired_locally" if repaired else "ok")
+    return result
+
+
+def _retry_request(prompt, candidate_text, generated_text, result, tier_model=None):
+    """
+    失敗した出力をもう一度頼み直すための (送る内容, 使うモデル) を返す
+    JSON として読めなかった → 壊れた出力だけを repair_model に送る (評価のやり直しより安い)
+    読めたが項目が欠けている → 同じモデルで評価をやり直す (None は client.model)
+    """
+    if result.get("problems"):
+        return build_request_content(prompt, candidate_text), tier_model
+    return generated_text, repair_model
+
+
+def recover_evaluation(prompt, candidate_text, generated_text, result, tier_model=None):
+    """
+    parse_evaluation_text が失敗した場合に、GEMINI_OUTPUT_RETRIES 回まで頼み直す関数
+    (成功している場合や頼み直しも失敗した場合は、受け取った結果をそのまま返す)
+    """
+    for attempt in range(config.GEMINI_OUTPUT_RETRIES):
+        if not (isinstance(result, dict) and result.get("error") and "raw_response" in result):
+            break
+        content, retry_model = _retry_request(prompt, candidate_text, generated_text, result, tier_model)
+        print(f"Retrying invalid Gemini output ({'repair' if retry_model is repair_model else 're-evaluate'}, attempt {attempt + 1})...")
+        metrics.GEMINI_RETRIES.inc(reason="repair" if retry_model is repair_model else "reevaluate")
+        try:
+            with metrics.span("gemini"):
+                generated_text = client.generate(content, model=retry_model).text
+        except Exception as e:
+            print(f"Error during Gemini retry call: {e}")
+            break
+        result = parse_evaluation_text(generated_text)
+    return result
+
+
+async def recover_evaluation_async(prompt, candidate_text, generated_text, result, tier_model=None):
+    """recover_evaluation の非同期版"""
+    for attempt in range(config.GEMINI_OUTPUT_RETRIES):
+        if not (isinstance(result, dict) and result.get("error") and "raw_response" in result):
+            break
+        content, retry_model = _retry_request(prompt, candidate_text, generated_text, result, tier_model)
+        print(f"Retrying invalid Gemini output ({'repair' if retry_model is repair_model else 're-evaluate'}, attempt {attempt + 1})...")
+        metrics.GEMINI_RETRIES.inc(reason="repair" if retry_model is repair_model else "reevaluate")
+        try:
+            with metrics.span("gemini"):
+                generated_text = (await client.generate_async(content, model=retry_model)).text
+        except Exception as e:
+            print(f"Error during async Gemini retry call: {e}")
+            break
+        result = parse_evaluation_text(generated_text)
+    return result
+
+
 # --- 評価を実行する関数を修正 ---
-def evaluate_with_gemini(prompt, candidate_text):
+def evaluate_with_gemini(prompt, candidate_text, tier="pro"):
     """
     候補者テキストとプロンプトを使ってGemini APIで評価を行う関数
+    同じ入力の評価が実行中なら、新しく呼ばずにその結果を共有する
     Args:
         prompt (str): Geminiに送る完全な指示（JSON出力指示を含む）
         candidate_text (str): 評価対象の候補者情報テキスト
+        tier (str): 使うモデル ("pro": 本番のモデル, "fast": 一次評価用の速いモデル)
     Returns:
         dict or None: 評価結果のJSONオブジェクト、またはエラー時はNone
     """
-    print(f"\n--- Evaluating with Gemini ---")
-    print(f"Prompt starts with: {prompt[:100]}...")
-    print(f"Candidate text starts with: {candidate_text[:100]}...")
+    tier_model, model_name = _tier_model(tier)
+    result, joined = _single_flight.do(
+        _single_flight_key(prompt, candidate_text, model_name),
+        lambda: _evaluate_with_gemini(prompt, candidate_text, tier_model),
+    )
+    return _shared_result(result, joined)
 
+
+def _evaluate_with_gemini(prompt, candidate_text, tier_model=None):
+    """evaluate_with_gemini の本体 (実際に API を呼ぶ)"""
     # --- ★★★ ここからが実際のAPI呼び出し ★★★ ---
-    # Geminiに渡す最終的なテキストコンテンツを作成
-    # プロンプトに加えて、評価対象のテキストも明確に渡す
-    full_content_for_gemini = f"{prompt}\n\n## Candidate Information:\n```\n{candidate_text}\n```\n\n## Evaluation Output (JSON):\n"
+    with metrics.span("prompt_build"):
+        full_content_for_gemini = build_request_content(prompt, candidate_text)
 
     try:
         # model.generate_content を使ってAIにコンテンツ生成をリクエスト
         # stream=False で、応答全体を一度に受け取る
-        print("Sending request to Gemini API...")
-        response = model.generate_content(
-            full_content_for_gemini,
-            # generation_config={'response_mime_type': 'application/json'} # ← これが使えると便利だが、
-            #                                                              # モデルやライブラリバージョンによるかも。
-            #                                                              # まずはテキストでJSONを取得する想定で進める。
-            )
-        print("Received response from Gemini API.")
+        # クォータ待ち・一時的なエラーの再試行は client (GeminiClient) が行う
+        # 構造化出力 (JSON) の設定は model 側に入っている (JSON_GENERATION_CONFIG)
+        # (処理時間は metrics に記録する。生の応答を毎回 print すると負荷が高いときに標準出力で詰まる)
+        with metrics.span("gemini"):
+            response = client.generate(full_content_for_gemini, model=tier_model)
 
         # --- レスポンスの処理 ---
         # response.text で、AIが生成したテキスト全体を取得
         generated_text = response.text
 
-        # デバッグ用に、AIが返した生のテキストを表示してみる
-        print("\n--- Raw response text from Gemini ---")
-        print(generated_text)
-        print("--- End of raw response text ---")
-
-        # AIが指示通りJSONだけを返してくれているか確認し、パースする
-        # 応答テキストの最初と最後にある ```json ... ``` を探して中身を取り出す
-        try:
-            # ```json と ``` で囲まれた部分を探す
-            json_block_match = generated_text.split('```json\n', 1)
-            if len(json_block_match) > 1:
-                json_content = json_block_match[1].split('\n```', 1)[0]
-                # JSON文字列をPythonの辞書オブジェクトに変換（パース）
-                result_json = json.loads(json_content)
-                print("Successfully parsed JSON response from Gemini.")
-                return result_json # パース成功したら辞書を返す
-            else:
-                # ```json が見つからない場合 (予期しない形式)
-                print("Error: Could not find ```json block in Gemini response.")
-                print("Trying to parse the whole text as JSON (might fail)...")
-                # ダメ元で全体をパースしてみる（失敗する可能性が高い）
-                try:
-                    result_json = json.loads(generated_text)
-                    print("Parsed the whole text as JSON.")
-                    return result_json
-                except json.JSONDecodeError:
-                    print("Error: Failed to parse the whole text as JSON.")
-                    return {"error": "Gemini returned non-JSON response", "raw_response": generated_text}
-
-        except json.JSONDecodeError as e:
-            # JSONパースに失敗した場合
-            print(f"Error: Failed to parse JSON from Gemini response: {e}")
-            # エラー情報と生の応答を返す
-            return {"error": "Failed to parse JSON response", "raw_response": generated_text}
-        except Exception as e:
-             # JSONブロックの抽出などで予期せぬエラー
-             print(f"Error processing Gemini response: {e}")
-             return {"error": "Error processing Gemini response", "raw_response": generated_text}
+        result = parse_evaluation_text(generated_text)
+        return recover_evaluation(prompt, candidate_text, generated_text, result, tier_model)
 
     except Exception as e:
-        # API呼び出し自体でエラーが発生した場合
+        # 再試行しても API 呼び出しが成功しなかった場合
         print(f"Error during Gemini API call: {e}")
         # (より詳細なエラーハンドリングが必要な場合もある)
         return None # エラー発生時は None を返す (APIルート側で500エラーにする)
     # --- ★★★ ここまでが実際のAPI呼び出し ★★★ ---
 
-def build_evaluation_prompt(criteria_prompt):
-     """
-     評価基準のプロンプトを受け取り、Geminiへの完全な指示を組み立てる関数（予定）
-     Args:
-         criteria_prompt (str): ユーザー定義の評価基準プロンプト
-     Returns:
-         str: Geminiに渡す最終的なプロンプト文字列
-     """
-     # 重要：ここでGeminiにJSON形式で応答するように明確に指示する！
-     json_output_instruction = """
----
-Output the evaluation result strictly in the following JSON format. Do not include any other text before or after the JSON object.
 
-```json
-{
-  "evaluation": {
-    "required": {
-      "age": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
-      "side_job": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
-      "outsourcing": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"}
-    },
-    "preferred": {
-      "experience": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
-      "management_level": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"}
-    },
-    "other": {
-      "job_change_desire": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
-      "adaptability": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"},
-      "teamwork": {"symbol": "評価記号(◎〇△×)", "reason": "評価理由"}
-    }
-  },
-  "candidate_identifier": "候補者の名前や識別子 (抽出できれば)",
-  "overall_comment": "全体的な所見やコメント"
-}
-"""
-     # ユーザー定義の評価基準とJSON出力指示を組み合わせる
-     full_prompt = f"{criteria_prompt}\n{json_output_instruction}"
-     return full_prompt
+async def evaluate_with_gemini_async(prompt, candidate_text, tier="pro"):
+    """
+    evaluate_with_gemini の非同期版 (ASGIモード用)
+    API応答を待つ間もイベントループを止めないので、1プロセスで多数の呼び出しを同時に待てる
+    Args:
+        prompt (str): Geminiに送る完全な指示（JSON出力指示を含む）
+        candidate_text (str): 評価対象の候補者情報テキスト
+        tier (str): 使うモデル ("pro" または "fast")
+    Returns:
+        dict or None: 評価結果のJSONオブジェクト、またはエラー時はNone
+    """
+    tier_model, model_name = _tier_model(tier)
+    result, joined = await _async_single_flight.do(
+        _single_flight_key(prompt, candidate_text, model_name),
+        lambda: _evaluate_with_gemini_async(prompt, candidate_text, tier_model),
+    )
+    return _shared_result(result, joined)
+
+
+async def _evaluate_with_gemini_async(prompt, candidate_text, tier_model=None):
+    """evaluate_with_gemini_async の本体 (実際に API を呼ぶ)"""
+    try:
+        with metrics.span("prompt_build"):
+            content = build_request_content(prompt, candidate_text)
+        with metrics.span("gemini"):
+            response = await client.generate_async(content, model=tier_model)
+        result = parse_evaluation_text(response.text)
+        return await recover_evaluation_async(prompt, candidate_text, response.text, result, tier_model)
+    except Exception as e:
+        print(f"Error during async Gemini API call: {e}")
+        return None
+
+
+def stream_with_gemini(prompt, candidate_text):
+    """
+    evaluate_with_gemini のストリーミング版。生成されたテキストを届いた順に返すジェネレーター
+    API呼び出しのエラーは呼び出し側で処理できるよう、そのまま例外として投げる
+    Args:
+        prompt (str): Geminiに送る完全な指示（JSON出力指示を含む）
+        candidate_text (str): 評価対象の候補者情報テキスト
+    Yields:
+        str: 生成されたテキストの断片
+    """
+    with metrics.span("prompt_build"):
+        content = build_request_content(prompt, candidate_text)
+    # gemini の時間は送信から最後の断片を受け取るまで (呼び出し側が読むのを待つ時間も含む)
+    with metrics.span("gemini"):
+        response = client.generate(content, stream=True)
+        for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
 
 
+def _chunk_text(chunk):
+    """
+    ストリーミングの断片からテキストを取り出す (テキストが無い断片は "")
+    安全フィルタや終了理由だけの断片では chunk.text が ValueError を投げるので、parts から読む
+    (そこで止めずに最後の断片まで読まないと、client が使ったトークン数を精算できない)
+    """
+    try:
+        parts = chunk.parts
+    except ValueError:
+        # candidates が空の断片 (プロンプトがブロックされた場合など)
+        return ""
+    return "".join(getattr(part, "text", "") or "" for part in parts)
+
+
+def _find_object_end(text, start):
+    """
+    text[start] の '{' に対応する '}' の位置を返す (文字列中の括弧は無視)。まだ閉じていなければ None
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for pos in range(start, len(text)):
+        ch = text[pos]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return pos
+    return None
+
+
+def extract_completed_categories(partial_text, categories, skip=()):
+    """
+    生成途中のテキストから、閉じ括弧まで出揃った評価カテゴリだけを取り出す関数
+    Args:
+        partial_text (str): ここまでに受信したテキスト
+        categories (iterable[str]): 探すカテゴリ名 (required, preferred, other)
+        skip (iterable[str]): 取り出し済みのカテゴリ名
+    Returns:
+        dict: {カテゴリ名: 項目の辞書} (完成したものだけ)
+    """
+    completed = {}
+    evaluation_pos = partial_text.find('"evaluation"')
+    if evaluation_pos < 0:
+        return completed
+    for category in categories:
+        if category in skip:
+            continue
+        match = re.compile(r'"%s"\s*:\s*\{' % re.escape(category)).search(partial_text, evaluation_pos)
+        if not match:
+            continue
+        start = match.end() - 1
+        end = _find_object_end(partial_text, start)
+        if end is None:
+            continue
+        try:
+            completed[category] = json.loads(partial_text[start:end + 1])
+        except json.JSONDecodeError:
+            continue # 途中で壊れている場合は、最終結果のパースに任せる
+    return completed
@@ -0,0 +1,397 @@
+# backend/app/services/job_queue.py
+# 大量の候補者をまとめて評価するバックグラウンドジョブ (/api/jobs)
+# 200名分の評価は1回の HTTP リクエストのタイムアウト (gunicorn の sync ワーカーなど) に収まらないので、
+# 受け付けた時点で候補者テキストを SQLite に書き込んでジョブIDだけを返し、各プロセス内のスレッドが1件ずつ
+# 取り出して評価する (クレンジング → Gemini評価 → スコア計算。/api/evaluate と同じ流れ)。
+# 外部のキューは使わない。処理中の1件には期限 (リース) を付けておき、プロセスが落ちて期限が切れた分は
+# 別のワーカー (再起動後の自分も含む) が取り直すので、再起動してもジョブは続きから進む。
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+from . import evaluation_service
+from . import metrics
+from .. import config
+
+# 1件ごとの状態
+PENDING, RUNNING, SUCCEEDED, FAILED = "pending", "running", "succeeded", "failed"
+
+
+class JobStore:
+    """
+    ジョブと1件ごとの状態の保存先 (ResultStore と同じく、スレッドごとの接続 + WAL モード)
+    複数のワーカープロセスが同じファイルを使っても、1件を取り出すのは1つのワーカーだけになる
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " created_at TEXT NOT NULL,"
+            " total INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            " job_id TEXT NOT NULL,"
+            " item_index INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " candidate_text TEXT,"              # 評価が終わったら消す
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " claim_token TEXT,"                 # 取り出したワーカーの印 (期限切れで取り直された後の書き込みを防ぐ)
+            " lease_expires_at REAL,"
+            " status_code INTEGER,"
+            " payload TEXT,"                     # /api/evaluate のレスポンスと同じ形の JSON
+            " finished_at TEXT,"
+            " PRIMARY KEY (job_id, item_index))"
+        )
+        # 受け付けた順 (rowid 順) に取り出す・期限切れを探すための索引
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (status, lease_expires_at)")
+        conn.commit()
+        print(f"Job store enabled: {path}")
+
+    def _connection(self):
+        # fork 前のプロセス (gunicorn --preload の master) で開いた接続は子プロセスで使わない
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create_job(self, candidate_texts):
+        """
+        ジョブを登録する
+        Args:
+            candidate_texts (list[str]): 候補者の生テキストのリスト
+        Returns:
+            tuple: (ジョブID, 受付日時の文字列)
+        """
+        job_id = uuid.uuid4().hex
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT INTO jobs (id, created_at, total) VALUES (?, ?, ?)", (job_id, created_at, len(candidate_texts)))
+            conn.executemany(
+                "INSERT INTO job_items (job_id, item_index, status, candidate_text) VALUES (?, ?, ?, ?)",
+                [(job_id, index, PENDING, text) for index, text in enumerate(candidate_texts)],
+            )
+        return job_id, created_at
+
+    def _release_expired(self, conn, now):
+        """期限が切れた処理中の1件を未処理に戻す (やり直しの上限を超えたものは失敗にする)"""
+        expired = conn.execute(
+            "SELECT job_id, item_index, attempts FROM job_items WHERE status = ? AND lease_expires_at < ?", (RUNNING, now)
+        ).fetchall()
+        for job_id, item_index, attempts in expired:
+            if attempts >= config.JOB_MAX_ATTEMPTS:
+                payload = {"error": f"Evaluation was interrupted {attempts} times"}
+                conn.execute(
+                    "UPDATE job_items SET status = ?, status_code = 500, payload = ?, candidate_text = NULL,"
+                    " claim_token = NULL, finished_at = ? WHERE job_id = ? AND item_index = ?",
+                    (FAILED, json.dumps(payload), datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_id, item_index),
+                )
+                metrics.JOB_ITEMS.inc(outcome="abandoned")
+            else:
+                conn.execute(
+                    "UPDATE job_items SET status = ?, claim_token = NULL, lease_expires_at = NULL"
+                    " WHERE job_id = ? AND item_index = ?",
+                    (PENDING, job_id, item_index),
+                )
+                metrics.JOB_ITEMS.inc(outcome="requeued")
+
+    def claim_next(self, lease_seconds):
+        """
+        未処理の1件を古いジョブから順に取り出し、処理中にする
+        Returns:
+            dict or None: job_id, item_index, candidate_text, claim_token (未処理が無ければ None)
+        """
+        now = time.time()
+        claim_token = uuid.uuid4().hex
+        conn = self._connection()
+        with conn:
+            # 読んでから書くまでの間に他のワーカーが同じ1件を取らないよう、最初に書き込みロックを取る
+            conn.execute("BEGIN IMMEDIATE")
+            self._release_expired(conn, now)
+            row = conn.execute(
+                "SELECT job_id, item_index, candidate_text FROM job_items WHERE status = ? ORDER BY rowid LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, item_index, candidate_text = row
+            conn.execute(
+                "UPDATE job_items SET status = ?, attempts = attempts + 1, claim_token = ?, lease_expires_at = ?"
+                " WHERE job_id = ? AND item_index = ?",
+                (RUNNING, claim_token, now + lease_seconds, job_id, item_index),
+            )
+        return {"job_id": job_id, "item_index": item_index, "candidate_text": candidate_text, "claim_token": claim_token}
+
+    def renew_leases(self, claims, lease_seconds):
+        """
+        処理中の1件の期限を延ばす (ワーカーが生きている印。取り直された1件は延ばさない)
+        Args:
+            claims (list[tuple]): (job_id, item_index, claim_token) のリスト
+        """
+        if not claims:
+            return
+        lease_expires_at = time.time() + lease_seconds
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "UPDATE job_items SET lease_expires_at = ? WHERE job_id = ? AND item_index = ? AND claim_token = ?",
+                [(lease_expires_at,) + claim for claim in claims],
+            )
+
+    def finish_item(self, job_id, item_index, claim_token, payload, status_code):
+        """
+        評価が終わった1件の結果を書き込む
+        Returns:
+            bool: 書き込んだか (期限切れで他のワーカーに取り直されていた場合は False)
+        """
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE job_items SET status = ?, status_code = ?, payload = ?, candidate_text = NULL,"
+                " claim_token = NULL, lease_expires_at = NULL, finished_at = ?"
+                " WHERE job_id = ? AND item_index = ? AND claim_token = ?",
+                (SUCCEEDED if status_code == 200 else FAILED, status_code, json.dumps(payload, ensure_ascii=False),
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_id, item_index, claim_token),
+            )
+        return cursor.rowcount == 1
+
+    def get_job(self, job_id, include_results=False):
+        """
+        ジョブの進み具合 (と、終わった分の結果) を返す
+        Returns:
+            dict or None: ジョブが無ければ None
+        """
+        conn = self._connection()
+        job = conn.execute("SELECT created_at, total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        created_at, total = job
+        counts = {PENDING: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        counts.update(conn.execute(
+            "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        done = counts[SUCCEEDED] + counts[FAILED]
+        if done == total:
+            status = "completed"
+        elif done or counts[RUNNING]:
+            status = "running"
+        else:
+            status = "queued"
+        finished_at = None
+        if status == "completed":
+            (finished_at,) = conn.execute("SELECT MAX(finished_at) FROM job_items WHERE job_id = ?", (job_id,)).fetchone()
+        report = {
+            "job_id": job_id,
+            "status": status,
+            "total": total,
+            "pending": counts[PENDING],
+            "running": counts[RUNNING],
+            "succeeded": counts[SUCCEEDED],
+            "failed": counts[FAILED],
+            "created_at": created_at,
+            "finished_at": finished_at,
+        }
+        if include_results:
+            # /api/evaluate/batch の results と同じ形 (終わった分だけ、入力の順番で)
+            results = []
+            for item_index, status_code, payload in conn.execute(
+                "SELECT item_index, status_code, payload FROM job_items"
+                " WHERE job_id = ? AND payload IS NOT NULL ORDER BY item_index", (job_id,)
+            ):
+                item = {"index": item_index, "status": status_code}
+                item.update(json.loads(payload))
+                results.append(item)
+            report["results"] = results
+        return report
+
+
+class JobRunner:
+    """
+    ジョブの1件ずつを取り出して評価するスレッドの集まり (プロセスごとに1つ。start_workers で作る)
+    未処理が無いときは JOB_POLL_INTERVAL_SECONDS ごとに確認する (他のプロセスが受け付けたジョブや、期限切れの1件のため)
+    処理中の1件の期限は、別の1本のスレッドが JOB_HEARTBEAT_SECONDS ごとにまとめて延ばす
+    """
+
+    def __init__(self, store, workers):
+        self.store = store
+        self.workers = workers
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._active = set() # 処理中の1件の (job_id, item_index, claim_token)
+
+    def start(self):
+        """スレッドを起動する (2回目以降は何もしない)"""
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+        print(f"Job workers started: {self.workers} threads")
+
+    def notify(self):
+        """新しいジョブを受け付けたときに、待っているスレッドを起こす"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        """
+        スレッドを止める (テスト用。処理中の1件は評価が終わってから止まる)
+        Returns:
+            bool: timeout 秒以内にすべてのスレッドが止まったか
+        """
+        self._stop.set()
+        self._wake.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = self.store.claim_next(config.JOB_LEASE_SECONDS)
+            except sqlite3.Error as e:
+                print(f"Error claiming job item: {e}")
+                item = None
+            if item is None:
+                self._wake.wait(config.JOB_POLL_INTERVAL_SECONDS)
+                self._wake.clear()
+                continue
+            claim = (item["job_id"], item["item_index"], item["claim_token"])
+            with self._lock:
+                self._active.add(claim)
+            try:
+                payload, status_code = self._evaluate(item["candidate_text"])
+            finally:
+                with self._lock:
+                    self._active.discard(claim)
+            try:
+                if self.store.finish_item(item["job_id"], item["item_index"], item["claim_token"], payload, status_code):
+                    metrics.JOB_ITEMS.inc(outcome="succeeded" if status_code == 200 else "failed")
+            except sqlite3.Error as e:
+                # 書き込めなかった1件は期限が切れたあとでやり直される
+                print(f"Error saving job item {item['job_id']}[{item['item_index']}]: {e}")
+
+    def _heartbeat(self):
+        while not self._stop.wait(config.JOB_HEARTBEAT_SECONDS):
+            with self._lock:
+                claims = list(self._active)
+            try:
+                self.store.renew_leases(claims, config.JOB_LEASE_SECONDS)
+            except sqlite3.Error as e:
+                print(f"Error renewing job leases: {e}")
+
+    def _evaluate(self, raw_candidate_text):
+        """1件を評価する。1件の失敗でスレッドが止まらないよう、例外もここで受け止める"""
+        try:
+            return evaluation_service.evaluate_candidate_text(raw_candidate_text)
+        except Exception as e:
+            print(f"Unexpected error during job item evaluation: {e}")
+            traceback.print_exc()
+            return {"error": "Unexpected error during evaluation"}, 500
+
+
+def submit_job(data):
+    """
+    /api/jobs (POST) の本体: 候補者テキストのリストを受け付けてジョブIDを返す
+    Args:
+        data (dict): リクエストボディ ({"candidate_texts": [...]})
+    Returns:
+        tuple: (レスポンス辞書, HTTPステータスコード)
+    """
+    store = get_job_store()
+    if store is None:
+        return {"error": "Background jobs are disabled"}, 400
+    candidate_texts = data.get('candidate_texts') if isinstance(data, dict) else None
+    if not candidate_texts or not isinstance(candidate_texts, list):
+        return {"error": "Missing or invalid 'candidate_texts' in request body"}, 400
+    if len(candidate_texts) > config.JOB_MAX_ITEMS:
+        return {"error": f"Too many candidates (max {config.JOB_MAX_ITEMS})"}, 400
+    if not all(isinstance(text, str) for text in candidate_texts):
+        return {"error": "Each item of 'candidate_texts' must be a string"}, 400
+
+    job_id, created_at = store.create_job(candidate_texts)
+    start_workers().notify()
+    return {"job_id": job_id, "status": "queued", "total": len(candidate_texts), "created_at": created_at}, 202
+
+
+def get_job_status(job_id, args):
+    """
+    /api/jobs/<job_id> (GET) の本体: 進み具合を返す (results=1 なら終わった分の結果も)
+    Returns:
+        tuple: (レスポンス辞書, HTTPステータスコード)
+    """
+    store = get_job_store()
+    if store is None:
+        return {"error": "Background jobs are disabled"}, 400
+    include_results = args.get('results', '').lower() in ('1', 'true', 'yes')
+    report = store.get_job(job_id, include_results)
+    if report is None:
+        return {"error": "Job not found"}, 404
+    return report, 200
+
+
+def start_workers():
+    """
+    このプロセスの処理スレッドを起動する (create_app とリクエストの受付時に呼ぶ。2回目以降は何もしない)
+    スレッドは fork で引き継がれないので、起動済みかどうかはプロセスID で判断する
+    (gunicorn --preload では master で create_app が呼ばれ、fork した各ワーカーでは最初のリクエストで起動する)
+    Returns:
+        JobRunner or None: このプロセスの JobRunner (JOBS_ENABLED が False なら None)
+    """
+    global _runner, _runner_pid
+    store = get_job_store()
+    if store is None:
+        return None
+    pid = os.getpid()
+    if _runner_pid != pid:
+        with _runner_lock:
+            if _runner_pid != pid:
+                _runner = JobRunner(store, config.JOB_WORKERS)
+                _runner.start()
+                _runner_pid = pid
+    return _runner
+
+
+def get_job_store():
+    """
+    アプリ全体で共有するジョブの保存先を返す (最初に呼ばれたときにファイルを作る)
+    Returns:
+        JobStore or None: JOBS_ENABLED が False なら None
+    """
+    global _job_store
+    if _job_store is None and config.JOBS_ENABLED:
+        with _job_store_lock:
+            if _job_store is None:
+                _job_store = JobStore(config.JOB_STORE_PATH)
+    return _job_store
+
+
+# アプリ全体で共有するジョブの保存先 (get_job_store で最初に使うときに開く)
+_job_store = None
+_job_store_lock = threading.Lock()
+# このプロセスの処理スレッド (start_workers で作る)
+_runner = None
+_runner_pid = None
+_runner_lock = threading.Lock()
@@ -0,0 +1,199 @@
+# backend/app/services/metrics.py
+# 処理時間・件数の計測と、/metrics での書き出し (Prometheus のテキスト形式)
+# リクエストごとに print すると負荷が高いときに標準出力の書き込みで詰まるので、
+# 評価パイプラインの各段階の時間やキャッシュヒット数などはここに数値として貯め、/metrics で取り出す。
+#   例: with metrics.span("cleanse"): ...            (段階ごとの処理時間)
+#       metrics.CACHE_LOOKUPS.inc(result="hit")       (件数)
+# 値はプロセスごとに持つ (gunicorn で複数ワーカーを動かす場合は、スクレイプしたワーカーの値になる)
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# ヒストグラムのバケット (秒)。テキスト処理 (ミリ秒以下) から Gemini の応答 (数十秒) までを1つの区切りでカバーする
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {} # ラベルの値のタプル -> 値
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._snapshot().items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    """増えるだけの件数"""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _snapshot(self):
+        return dict(self._values)
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """値の分布 (バケットごとの件数・合計・件数)"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][index] += 1
+            series["sum"] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """with ブロックの処理時間 (秒) を記録する (例外で抜けた場合も記録する)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _snapshot(self):
+        return {key: {"counts": list(series["counts"]), "sum": series["sum"]} for key, series in self._values.items()}
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for upper, count in zip(self.buckets + (float("inf"),), series["counts"]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(float(upper)))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """メトリクスをまとめて書き出すための入れ物"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus のテキスト形式 (text/plain; version=0.0.4) の文字列を返す"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# --- アプリで使うメトリクス ---
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "Time to build the HTTP response, by route.", ["method", "route", "status"]
+)
+STAGE_SECONDS = histogram(
+    "evaluation_stage_duration_seconds",
+    "Time spent in each evaluation pipeline stage (cleanse, compact, prescreen, cache_key, prompt_build, gemini, parse, score, store).",
+    ["stage"],
+)
+EVALUATIONS = counter(
+    "evaluations_total", "Finished candidate evaluations by source (fast, pro, prescreen, cache) and outcome.", ["source", "outcome"]
+)
+CACHE_LOOKUPS = counter("evaluation_cache_lookups_total", "Evaluation cache lookups by result (hit, miss).", ["result"])
+SINGLE_FLIGHT_JOINS = counter("gemini_single_flight_joins_total", "Evaluations that joined an identical in-flight Gemini call.")
+GEMINI_REQUEST_SECONDS = histogram(
+    "gemini_request_duration_seconds", "Latency of successful Gemini API calls (one attempt).", ["model"]
+)
+GEMINI_TOKENS = counter(
+    "gemini_tokens_total", "Tokens reported in Gemini usage metadata, by model and direction (input, output).", ["model", "direction"]
+)
+GEMINI_RETRIES = counter(
+    "gemini_retries_total",
+    "Extra Gemini calls: transient API errors (api_error) and invalid output (repair, reevaluate).",
+    ["reason"],
+)
+SCORING_MISSING = counter(
+    "scoring_missing_total", "Categories or items missing from a complete evaluation when scoring (kind: category, item).", ["kind"]
+)
+GEMINI_PARSE_RESULTS = counter(
+    "gemini_parse_results_total", "Parsing of Gemini output by result (ok, repaired_locally, unreadable, invalid_schema).", ["result"]
+)
+
+COMPACTION_TOKENS = histogram(
+    "compaction_tokens",
+    "Candidate text tokens before and after compaction (phase: before, after).",
+    ["phase"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+COMPACTION_LINES = counter(
+    "compaction_lines_total", "Lines removed or shortened by compaction (action: dropped, trimmed).", ["action"]
+)
+JOB_ITEMS = counter(
+    "job_items_total", "Background job items processed by outcome (succeeded, failed, requeued, abandoned).", ["outcome"]
+)
+
+
+def span(stage):
+    """評価パイプラインの1段階の処理時間を記録する with 文用のヘルパー"""
+    return STAGE_SECONDS.time(stage=stage)
@@ -0,0 +1,265 @@
+# backend/app/services/result_store.py
+# 評価結果をサーバー側に保存するモジュール (SQLite の1ファイル)
+# /api/evaluate の結果をここに書き込んでおけば、エクスポートや一覧表示では
+# 結果そのものを毎回アップロードしなくても、IDや条件を渡すだけで済む。
+import base64
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from .. import config
+
+
+# 一覧で並べ替え・絞り込みに使える数値の列 (保存時に calculated_scores から取り出して索引を張る)
+SORTABLE_COLUMNS = ("created_at", "total_match_percentage", "required_score", "preferred_score", "other_score")
+SCORE_COLUMNS = SORTABLE_COLUMNS[1:]
+
+
+def _encode_cursor(sort, order, last_value, last_id):
+    raw = json.dumps([sort, order, last_value, last_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor, sort, order):
+    """カーソル文字列を (最後の値, 最後のID) に戻す。並べ替え条件が違う・壊れているなら ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, last_value, last_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or cursor_order != order or not isinstance(last_id, str):
+        raise ValueError("Cursor does not match the requested sort/order")
+    return last_value, last_id
+
+
+def _extract_symbols(gemini_evaluation):
+    """gemini_evaluation.evaluation から (カテゴリ, 項目, 記号) を取り出す"""
+    evaluation = (gemini_evaluation or {}).get("evaluation")
+    if not isinstance(evaluation, dict):
+        return []
+    rows = []
+    for category, items in evaluation.items():
+        if not isinstance(items, dict):
+            continue
+        for item_key, item in items.items():
+            if isinstance(item, dict) and isinstance(item.get("symbol"), str):
+                rows.append((category, item_key, item["symbol"]))
+    return rows
+
+
+class ResultStore:
+    """
+    評価結果の保存先
+    スレッドごとに接続を持ち (SQLite の接続はスレッド間で共有できないため)、WAL モードで読み書きを並行させる
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id TEXT PRIMARY KEY,"
+            " created_at TEXT NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created_at ON results (created_at)")
+        # 一覧検索用の索引テーブル (payload を開かずに並べ替え・絞り込みができるよう、保存時に値を取り出しておく)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_index ("
+            " id TEXT PRIMARY KEY,"
+            " created_at TEXT NOT NULL,"
+            " total_match_percentage REAL NOT NULL,"
+            " required_score REAL NOT NULL,"
+            " preferred_score REAL NOT NULL,"
+            " other_score REAL NOT NULL)"
+        )
+        for column in SORTABLE_COLUMNS:
+            # (並べ替え列, id) の複合索引で、カーソルの位置から LIMIT 件だけ読めば済むようにする
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_result_index_{column} ON result_index ({column}, id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_symbols ("
+            " result_id TEXT NOT NULL,"
+            " category TEXT NOT NULL,"
+            " item TEXT NOT NULL,"
+            " symbol TEXT NOT NULL,"
+            " PRIMARY KEY (result_id, category, item)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_result_symbols_item ON result_symbols (category, item, symbol)")
+        conn.commit()
+        print(f"Result store enabled: {path}")
+
+    def _connection(self):
+        # fork 前のプロセス (gunicorn --preload の master) で開いた接続は子プロセスで使わない
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, result):
+        """
+        評価結果を1件保存する
+        Args:
+            result (dict): gemini_evaluation と calculated_scores を含む辞書
+        Returns:
+            tuple: (結果ID, 評価日時の文字列)
+        """
+        result_id = uuid.uuid4().hex
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        stored = dict(result, result_id=result_id, evaluated_at=created_at)
+        conn = self._connection()
+        scores = result.get("calculated_scores") or {}
+        with conn:
+            conn.execute(
+                "INSERT INTO results (id, created_at, payload) VALUES (?, ?, ?)",
+                (result_id, created_at, json.dumps(stored, ensure_ascii=False)),
+            )
+            conn.execute(
+                "INSERT INTO result_index (id, created_at, total_match_percentage, required_score, preferred_score, other_score)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (result_id, created_at) + tuple(float(scores.get(column) or 0) for column in SCORE_COLUMNS),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO result_symbols (result_id, category, item, symbol) VALUES (?, ?, ?, ?)",
+                [(result_id,) + row for row in _extract_symbols(result.get("gemini_evaluation"))],
+            )
+        return result_id, created_at
+
+    def get_many(self, result_ids):
+        """
+        IDのリストに対応する評価結果を、渡された順番で返す (見つからないIDは None)
+        """
+        found = {}
+        conn = self._connection()
+        # SQLite の変数の上限を超えないよう、小分けにして問い合わせる
+        for start in range(0, len(result_ids), 500):
+            chunk = [result_id for result_id in result_ids[start:start + 500] if isinstance(result_id, str)]
+            if not chunk:
+                continue
+            placeholders = ",".join("?" * len(chunk))
+            for result_id, payload in conn.execute(
+                f"SELECT id, payload FROM results WHERE id IN ({placeholders})", chunk
+            ):
+                found[result_id] = json.loads(payload)
+        return [found.get(result_id) if isinstance(result_id, str) else None for result_id in result_ids]
+
+    def iter_results(self, since=None, until=None, limit=None):
+        """
+        評価日時で絞り込んだ評価結果を古い順に1件ずつ返すジェネレーター (エクスポート用)
+        全件をメモリに載せずに済むよう、カーソルから順に読み出す
+        Args:
+            since (str, optional): この日時以降 ('YYYY-MM-DD' または 'YYYY-MM-DD HH:MM:SS')
+            until (str, optional): この日時より前
+            limit (int, optional): 最大件数
+        """
+        query = "SELECT payload FROM results"
+        conditions = []
+        params = []
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at, id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        for (payload,) in self._connection().execute(query, params):
+            yield json.loads(payload)
+
+    def query(self, sort="created_at", order="desc", limit=50, cursor=None,
+              since=None, until=None, score_ranges=None, symbols=None):
+        """
+        索引テーブルを使って評価結果を並べ替え・絞り込みし、1ページ分を返す (カーソル方式のページング)
+        OFFSET を使わず「前のページの最後の (値, ID) より後」から読むので、件数が増えても速さが変わらない
+        Args:
+            sort (str): 並べ替える列 (SORTABLE_COLUMNS のどれか)
+            order (str): 'asc' または 'desc'
+            limit (int): 1ページの件数
+            cursor (str, optional): 前のページが返した next_cursor
+            since (str, optional): この日時以降
+            until (str, optional): この日時より前
+            score_ranges (dict, optional): {列名: (最小値, 最大値)} どちらも None 可
+            symbols (list, optional): [(カテゴリ, 項目, 許可する記号のリスト)] すべてを満たすものだけ返す
+        Returns:
+            tuple: (評価結果のリスト, 次のページのカーソル または None)
+        """
+        if sort not in SORTABLE_COLUMNS:
+            raise ValueError(f"Unknown sort column: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Unknown order: {order}")
+        conditions = []
+        params = []
+        if since:
+            conditions.append("i.created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("i.created_at < ?")
+            params.append(until)
+        for column, (minimum, maximum) in (score_ranges or {}).items():
+            if column not in SCORE_COLUMNS:
+                raise ValueError(f"Unknown score column: {column}")
+            if minimum is not None:
+                conditions.append(f"i.{column} >= ?")
+                params.append(minimum)
+            if maximum is not None:
+                conditions.append(f"i.{column} <= ?")
+                params.append(maximum)
+        for category, item_key, allowed in symbols or []:
+            placeholders = ",".join("?" * len(allowed))
+            # 主キー (result_id, category, item) で1行引くだけなので、結果1件あたりの確認は一定時間
+            conditions.append(
+                "EXISTS (SELECT 1 FROM result_symbols s WHERE s.result_id = i.id"
+                f" AND s.category = ? AND s.item = ? AND s.symbol IN ({placeholders}))"
+            )
+            params.extend([category, item_key, *allowed])
+        if cursor:
+            last_value, last_id = _decode_cursor(cursor, sort, order)
+            conditions.append(f"(i.{sort}, i.id) {'<' if order == 'desc' else '>'} (?, ?)")
+            params.extend([last_value, last_id])
+
+        query = f"SELECT i.{sort}, i.id, r.payload FROM result_index i JOIN results r ON r.id = i.id"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY i.{sort} {order.upper()}, i.id {order.upper()} LIMIT ?"
+        params.append(limit + 1) # 1件多く読んで、次のページがあるかを判定する
+        rows = self._connection().execute(query, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_value, last_id, _ = rows[-1]
+            next_cursor = _encode_cursor(sort, order, last_value, last_id)
+        return [json.loads(payload) for _, _, payload in rows], next_cursor
+
+
+# アプリ全体で共有する保存先 (get_result_store で最初に使うときに開く)
+# import しただけではファイルを作らないので、ベンチマークや単発のスクリプトから app を読み込んでも軽い
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """
+    アプリ全体で共有する保存先を返す (最初に呼ばれたときに DATA_DIR にファイルを作る)
+    Returns:
+        ResultStore or None: RESULT_STORE_ENABLED が False なら None
+    """
+    global _result_store
+    if _result_store is None and config.RESULT_STORE_ENABLED:
+        with _result_store_lock:
+            if _result_store is None:
+                _result_store = ResultStore(config.RESULT_STORE_PATH)
+    return _result_store
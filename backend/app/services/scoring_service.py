@@ -1,6 +1,11 @@
 # backend/app/services/scoring_service.py
+import threading
+from collections import OrderedDict
+
 # ▼▼▼ config モジュールをインポート ▼▼▼
 from .. import config # '..'は一つ上の階層(app), そこにある config.py を指す
+from . import metrics
+# numpy は一括再計算 (/api/rescore) でしか使わないので、起動を軽くするため関数の中で読み込む
 
 # --- ▼▼▼ ハードコードされた設定定義を削除 ▼▼▼ ---
 # SCORE_MAP = { ... }
@@ -9,11 +14,14 @@ from .. import config # '..'は一つ上の階層(app), そこにある config.p
 # --- ▲▲▲ 削除 ▲▲▲ ---
 
 
-def calculate_scores(evaluation_data):
+def calculate_scores(evaluation_data, partial=False):
     """
     Geminiの評価結果データからマッチ度スコアを計算する関数
+    評価データに無いカテゴリ・項目は飛ばし、その件数をメトリクス (scoring_missing_total) に記録する
     Args:
         evaluation_data (dict): Geminiが生成した評価結果の辞書 (evaluation キーを含む)
+        partial (bool): 生成途中の評価 (ストリーミングの途中経過) の場合は True。
+            カテゴリがまだそろっていないのは当然なので、足りない分を記録しない
     Returns:
         dict: 各カテゴリのスコアと総合スコアを含む辞書
     """
@@ -32,7 +40,8 @@ def calculate_scores(evaluation_data):
         max_category_score = 1.0
 
         if category not in evaluations:
-            print(f"Warning: Category '{category}' not found in evaluation data.")
+            if not partial:
+                metrics.SCORING_MISSING.inc(kind="category")
             continue
 
         category_evaluations = evaluations[category]
@@ -40,7 +49,8 @@ def calculate_scores(evaluation_data):
         # カテゴリ内の各項目について計算
         for item_key, item_weight in items.items():
             if item_key not in category_evaluations:
-                print(f"Warning: Item '{item_key}' not found in category '{category}'.")
+                if not partial:
+                    metrics.SCORING_MISSING.inc(kind="item")
                 continue
 
             item_evaluation = category_evaluations[item_key]
@@ -59,5 +69,302 @@ def calculate_scores(evaluation_data):
 
     calculated_scores["total_match_percentage"] = round(total_percentage, 1)
 
-    print(f"Calculated scores (using config): {calculated_scores}") # ログメッセージ変更
-    return calculated_scores
\ No newline at end of file
+    return calculated_scores
+
+# --- ▼▼▼ 一括スコア計算 (過去の評価結果をまとめて再計算する用) ▼▼▼ ---
+# 記号を (候補者数 × 項目数) の行列に変換しておけば、重みを変えたときの再計算は
+# 重み行列との行列演算1回 (数万件でも数ミリ秒) で済む。
+# ただし行列を作るには1件ずつ辞書をたどる必要があり、それだけで calculate_scores のループと同じくらいかかる。
+# 保存済みの評価結果は後から変わらないので、ID (result_id / evaluation_id) ごとの行を SymbolRowCache に
+# 覚えておき、同じ結果を別の重みで再計算するときは行列の組み立てを省く。
+
+def _item_keys(item_weights):
+    """(カテゴリ, 項目) の並び順を決める。行列の列の順番になる"""
+    return [(category, item_key) for category, items in item_weights.items() for item_key in items]
+
+
+def _symbol_row(evaluation_data, grouped_items, score_map):
+    """
+    評価データ1件分の行を作る
+    Returns:
+        tuple or None: (記号スコアの並び, カテゴリがあるかの並び, 無いカテゴリ数, 無い項目数)。
+            evaluation キーを持たない無効なデータなら None
+    """
+    if not evaluation_data or "evaluation" not in evaluation_data:
+        return None
+    evaluations = evaluation_data["evaluation"] or {}
+    row = []
+    present = []
+    missing_categories = 0
+    missing_items = 0
+    for category, category_item_keys in grouped_items:
+        category_evaluations = evaluations.get(category)
+        if category_evaluations is None and category not in evaluations:
+            present.append(False)
+            missing_categories += 1
+            row.extend([0.0] * len(category_item_keys))
+            continue
+        present.append(True)
+        category_evaluations = category_evaluations if isinstance(category_evaluations, dict) else {}
+        for item_key in category_item_keys:
+            item_evaluation = category_evaluations.get(item_key)
+            if item_evaluation is None and item_key not in category_evaluations:
+                missing_items += 1
+            row.append(score_map.get(item_evaluation.get("symbol"), 0.0) if isinstance(item_evaluation, dict) else 0.0)
+    return tuple(row), tuple(present), missing_categories, missing_items
+
+
+class SymbolRowCache:
+    """
+    ID ごとの行 (_symbol_row の戻り値) を覚えておく LRU キャッシュ (スレッドセーフ)
+    項目の並びや SCORE_MAP が変わると行の意味が変わるので、そのときは中身を捨てる
+    Args:
+        max_entries (int): 覚えておく件数の上限 (1件あたり数百バイト)
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._rows = OrderedDict()
+        self._layout = None
+        self._lock = threading.Lock()
+
+    def _check_layout(self, layout):
+        if layout != self._layout:
+            self._rows.clear()
+            self._layout = layout
+
+    def get_many(self, keys, layout):
+        """見つかった行だけを {キー: 行} で返す"""
+        found = {}
+        with self._lock:
+            self._check_layout(layout)
+            for key in keys:
+                row = self._rows.get(key)
+                if row is not None:
+                    self._rows.move_to_end(key)
+                    found[key] = row
+        return found
+
+    def put_many(self, rows, layout):
+        if not rows or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_layout(layout)
+            self._rows.update(rows)
+            for key in rows:
+                self._rows.move_to_end(key)
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+
+# アプリ全体で共有する行のキャッシュ (/api/rescore の ids / result_ids で使う)
+symbol_rows = SymbolRowCache(config.RESCORE_ROW_CACHE_SIZE)
+
+
+def symbol_layout(item_weights=None):
+    """行の並び (項目の順番と SCORE_MAP)。SymbolRowCache に渡す"""
+    if item_weights is None:
+        item_weights = config.ITEM_WEIGHTS
+    return tuple(_item_keys(item_weights)), tuple(sorted(config.SCORE_MAP.items()))
+
+
+def _build_symbol_matrix(evaluation_list, item_weights=None, keys=None, cached_rows=None):
+    """build_symbol_matrix の本体。無いカテゴリ・項目の件数も返す"""
+    import numpy as np
+    if item_weights is None:
+        item_weights = config.ITEM_WEIGHTS
+    item_keys = _item_keys(item_weights)
+    categories = list(item_weights.keys())
+    grouped_items = [(category, list(item_weights[category].keys())) for category in categories]
+    score_map = config.SCORE_MAP
+    layout = symbol_layout(item_weights)
+    if keys is not None and cached_rows is None:
+        cached_rows = symbol_rows.get_many([key for key in keys if key is not None], layout)
+    cached_rows = cached_rows or {}
+
+    # numpy 配列へ1要素ずつ代入すると遅いので、Pythonのリストで組み立ててから一度に変換する
+    zero_row = (0.0,) * len(item_keys)
+    absent_row = (False,) * len(categories)
+    score_rows = []
+    present_rows = []
+    valid_rows = []
+    new_rows = {}
+    missing_categories = 0
+    missing_items = 0
+    for index, evaluation_data in enumerate(evaluation_list):
+        key = keys[index] if keys is not None else None
+        entry = cached_rows.get(key) if key is not None else None
+        if entry is None:
+            entry = _symbol_row(evaluation_data, grouped_items, score_map)
+            if entry is not None and key is not None:
+                new_rows[key] = entry
+        if entry is None:
+            score_rows.append(zero_row)
+            present_rows.append(absent_row)
+            valid_rows.append(False)
+            continue
+        score_rows.append(entry[0])
+        present_rows.append(entry[1])
+        valid_rows.append(True)
+        missing_categories += entry[2]
+        missing_items += entry[3]
+    symbol_rows.put_many(new_rows, layout)
+
+    n = len(evaluation_list)
+    scores = np.array(score_rows, dtype=np.float64).reshape(n, len(item_keys))
+    category_present = np.array(present_rows, dtype=bool).reshape(n, len(categories))
+    valid = np.array(valid_rows, dtype=bool)
+    return scores, category_present, valid, (missing_categories, missing_items)
+
+
+def build_symbol_matrix(evaluation_list, item_weights=None, keys=None):
+    """
+    評価結果のリストを、記号のスコアを並べた行列に変換する関数
+    Args:
+        evaluation_list (list[dict]): Geminiの評価結果 (evaluation キーを含む辞書) のリスト
+        item_weights (dict, optional): 項目の定義。省略時は config.ITEM_WEIGHTS
+        keys (list, optional): 各評価結果の ID (None なら覚えない)。
+            SymbolRowCache にある ID の行はそれを使い (評価データは None でよい)、無ければ作って覚える
+    Returns:
+        tuple:
+            scores (ndarray): (候補者数 × 項目数) の記号スコア。記号が無い・不明な項目は 0.0
+            category_present (ndarray[bool]): (候補者数 × カテゴリ数) そのカテゴリが評価データにあるか
+            valid (ndarray[bool]): (候補者数,) evaluation キーを持つ有効なデータか
+    """
+    return _build_symbol_matrix(evaluation_list, item_weights, keys)[:3]
+
+
+def build_weight_matrix(item_weights=None, category_weights=None):
+    """
+    (項目数 × カテゴリ数) の重み行列を作る関数
+    各項目の列には「項目の重み × カテゴリの重み × 100」が入るので、
+    記号スコア行列に掛けるとそのままカテゴリ別の寄与分 (%) になる。
+    """
+    import numpy as np
+    if item_weights is None:
+        item_weights = config.ITEM_WEIGHTS
+    if category_weights is None:
+        category_weights = config.CATEGORY_WEIGHTS
+    categories = list(item_weights.keys())
+    weights = np.zeros((len(_item_keys(item_weights)), len(categories)), dtype=np.float64)
+    for row, (category, item_key) in enumerate(_item_keys(item_weights)):
+        weights[row, categories.index(category)] = item_weights[category][item_key] * category_weights[category] * 100
+    return weights
+
+
+def score_matrix(scores, category_present, item_weights=None, category_weights=None):
+    """
+    記号スコア行列からカテゴリ別スコアと総合スコアを計算する関数 (丸め前の値)
+    Returns:
+        tuple: (カテゴリ別スコア (候補者数 × カテゴリ数), 総合スコア (候補者数,))
+    """
+    category_scores = (scores @ build_weight_matrix(item_weights, category_weights)) * category_present
+    return category_scores, category_scores.sum(axis=1)
+
+
+def resolve_weights(overrides=None):
+    """
+    リクエストで渡された重みの上書きを config の重みに重ねる関数 (一部だけの指定も可)
+    Args:
+        overrides (dict, optional): {"category_weights": {...}, "item_weights": {カテゴリ: {項目: 重み}}}
+    Returns:
+        tuple: (項目別の重み, カテゴリ別の重み, エラーメッセージ or None)
+    """
+    item_weights = {category: dict(items) for category, items in config.ITEM_WEIGHTS.items()}
+    category_weights = dict(config.CATEGORY_WEIGHTS)
+    if not overrides:
+        return item_weights, category_weights, None
+    if not isinstance(overrides, dict):
+        return None, None, "'weights' must be an object"
+
+    def is_weight(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+    for category, weight in (overrides.get("category_weights") or {}).items():
+        if category not in category_weights:
+            return None, None, f"Unknown category '{category}' in category_weights"
+        if not is_weight(weight):
+            return None, None, f"Invalid weight for category '{category}'"
+        category_weights[category] = weight
+
+    for category, items in (overrides.get("item_weights") or {}).items():
+        if category not in item_weights or not isinstance(items, dict):
+            return None, None, f"Unknown category '{category}' in item_weights"
+        for item_key, weight in items.items():
+            if item_key not in item_weights[category]:
+                return None, None, f"Unknown item '{category}.{item_key}' in item_weights"
+            if not is_weight(weight):
+                return None, None, f"Invalid weight for item '{category}.{item_key}'"
+            item_weights[category][item_key] = weight
+
+    return item_weights, category_weights, None
+
+
+def calculate_scores_bulk(evaluation_list, item_weights=None, category_weights=None, keys=None, cached_rows=None):
+    """
+    calculate_scores の一括版。重みを変えて過去の評価結果をまとめて再計算するときに使う
+    無いカテゴリ・項目は calculate_scores と同じくメトリクス (scoring_missing_total) に記録する
+    Args:
+        evaluation_list (list[dict]): Geminiの評価結果 (evaluation キーを含む辞書) のリスト
+        item_weights (dict, optional): 項目別の重み。省略時は config.ITEM_WEIGHTS
+        category_weights (dict, optional): カテゴリ別の重み。省略時は config.CATEGORY_WEIGHTS
+        keys (list, optional): 各評価結果の ID (build_symbol_matrix を参照)
+        cached_rows (dict, optional): 呼び出し側で symbol_rows.get_many を済ませている場合はその結果
+            (評価データを読み込まずに済んだ ID の行が、この間に追い出されても使えるように)
+    Returns:
+        list[dict]: calculate_scores と同じ形の辞書のリスト (入力と同じ順番)
+    """
+    if item_weights is None:
+        item_weights = config.ITEM_WEIGHTS
+    categories = list(item_weights.keys())
+    scores, category_present, valid, (missing_categories, missing_items) = _build_symbol_matrix(
+        evaluation_list, item_weights, keys, cached_rows
+    )
+    if missing_categories:
+        metrics.SCORING_MISSING.inc(missing_categories, kind="category")
+    if missing_items:
+        metrics.SCORING_MISSING.inc(missing_items, kind="item")
+    category_scores, totals = score_matrix(scores, category_present, item_weights, category_weights)
+
+    # 丸めは calculate_scores の round() と同じ値になるよう _round_like_python で行う
+    # numpy のスカラーのままだと遅いので、先に Python の list に変換しておく
+    score_keys = [f"{category}_score" for category in categories]
+    category_rows = _round_like_python(category_scores).tolist()
+    present_rows = category_present.tolist()
+    all_present = [True] * len(categories)
+    results = []
+    for row_scores, present, total, is_valid in zip(
+        category_rows, present_rows, _round_like_python(totals).tolist(), valid.tolist()
+    ):
+        if not is_valid:
+            results.append({})
+            continue
+        if present == all_present:
+            calculated_scores = dict(zip(score_keys, row_scores))
+        else:
+            calculated_scores = {
+                score_key: value for score_key, value, is_present in zip(score_keys, row_scores, present) if is_present
+            }
+        calculated_scores["total_match_percentage"] = total
+        results.append(calculated_scores)
+    return results
+
+
+def _round_like_python(values):
+    """
+    round(x, 1) と同じ値を numpy でまとめて求める (1要素ずつ round() を呼ぶより速い)
+    np.round は x * 10 を丸めるので、掛け算の誤差で .5 の境目をまたぐ値だけ結果が違うことがある。
+    境目に近い値だけは round() で求め直す
+    """
+    import numpy as np
+    scaled = values * 10
+    rounded = np.rint(scaled) / 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(value, 1) for value in values[near_tie].tolist()]
+    return rounded
+# --- ▲▲▲ 一括スコア計算 ▲▲▲ ---
@@ -1,5 +1,5 @@
 # backend/app/utils/export_utils.py
-import pandas as pd
+import csv
 import io
 from datetime import datetime
 
@@ -11,6 +11,15 @@ CSV_HEADERS_JP = [
     "その他_チームワーク_評価", "その他_チームワーク_理由", "評価日時"
 ]
 
+# --- 項目・カテゴリの表示名 ---
+ITEM_LABELS_JP = {
+    "age": "年齢", "side_job": "副業", "outsourcing": "業務委託",
+    "experience": "経験", "management_level": "役職レベル",
+    "job_change_desire": "転職希望", "adaptability": "適応力", "teamwork": "チームワーク"
+}
+CATEGORY_LABELS_CSV = {"required":"必須", "preferred":"優遇", "other":"その他"}
+CATEGORY_LABELS_MD = {"required":"必須条件", "preferred":"優遇条件", "other":"その他評価ポイント"}
+
 def _flatten_evaluation_data(result):
     flat_data = {}
     gemini_eval = result.get("gemini_evaluation", {}) if result else {}
@@ -24,78 +33,117 @@ def _flatten_evaluation_data(result):
     flat_data["優遇スコア"] = scores.get("preferred_score", "")
     flat_data["その他スコア"] = scores.get("other_score", "")
 
-    item_label_map = {
-        "age": "年齢", "side_job": "副業", "outsourcing": "業務委託",
-        "experience": "経験", "management_level": "役職レベル",
-        "job_change_desire": "転職希望", "adaptability": "適応力", "teamwork": "チームワーク"
-    }
-    category_label_map = {"required":"必須", "preferred":"優遇", "other":"その他"}
-
     for category, items in evaluation.items():
-        category_prefix = category_label_map.get(category)
+        category_prefix = CATEGORY_LABELS_CSV.get(category)
         if not category_prefix or not isinstance(items, dict): continue
 
         for item_key, details in items.items():
-            item_prefix = item_label_map.get(item_key, item_key)
+            item_prefix = ITEM_LABELS_JP.get(item_key, item_key)
             if isinstance(details, dict): # detailsが辞書であることを確認
                 header_base = f"{category_prefix}_{item_prefix}"
                 flat_data[f"{header_base}_評価"] = details.get("symbol", "")
                 flat_data[f"{header_base}_理由"] = details.get("reason", "")
 
-    flat_data["評価日時"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # 保存済みの結果なら評価した日時、そうでなければ出力した日時
+    flat_data["評価日時"] = (result.get("evaluated_at") if result else None) or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     return flat_data
 
+# CSV をまとめて yield するときの目安サイズ (1行ごとだと細かすぎるため)
+CSV_CHUNK_SIZE = 64 * 1024
+
+def iter_csv(results_list):
+    """
+    CSVを少しずつ返すジェネレーター (Flask のストリーミングレスポンス用)
+    先頭に BOM (Excel で文字化けしないように) とヘッダー行を出し、その後は1件ずつ行を書き出す。
+    件数が増えてもメモリに載るのは1チャンク分だけ。
+    Args:
+        results_list (iterable[dict]): /api/evaluate のレスポンスと同じ形の結果
+    Yields:
+        str: CSV の断片
+    """
+    buffer = io.StringIO()
+    # pandas の to_csv と同じ書式 (QUOTE_MINIMAL, 改行は \n, 無い列は空文字, 余分な列は捨てる)
+    writer = csv.DictWriter(buffer, fieldnames=CSV_HEADERS_JP, restval="", extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    yield "\ufeff" + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+
+    for result in results_list:
+        writer.writerow(_flatten_evaluation_data(result))
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
 def generate_csv(results_list):
     if not results_list: return ""
-    flat_data_list = [_flatten_evaluation_data(result) for result in results_list]
-    df = pd.DataFrame(flat_data_list)
-    df = df.reindex(columns=CSV_HEADERS_JP, fill_value="")
-    output = io.StringIO()
-    df.to_csv(output, index=False, encoding="utf-8-sig")  # ここのアンダースコア(_)をハイフン(-)に変えたで！
-    return output.getvalue()
+    return "".join(iter_csv(results_list))
+
+def _render_markdown_candidate(i, result):
+    """候補者1名分の Markdown を組み立てる (最後に1回だけ join する)"""
+    gemini_eval = result.get("gemini_evaluation", {}) if result else {}
+    scores = result.get("calculated_scores", {}) if result else {}
+    evaluation = gemini_eval.get("evaluation", {}) if gemini_eval else {}
+
+    candidate_id = gemini_eval.get('candidate_identifier', f'不明な候補者 {i+1}')
+    total_score = scores.get('total_match_percentage', 'N/A')
+    req_score = scores.get('required_score', 'N/A')
+    pref_score = scores.get('preferred_score', 'N/A')
+    other_score = scores.get('other_score', 'N/A')
+    overall_comment = gemini_eval.get('overall_comment', 'コメントなし')
+    if overall_comment is None: overall_comment = 'コメントなし'
+
+    parts = [
+        f"## {i+1}. {candidate_id}\n\n",
+        f"**総合スコア:** {total_score} %\n",
+        f"(必須: {req_score}, 優遇: {pref_score}, その他: {other_score})\n\n",
+        "**評価詳細:**\n\n",
+    ]
+
+    for category, items in evaluation.items():
+         category_label = CATEGORY_LABELS_MD.get(category, category)
+         parts.append(f"### {category_label}\n")
+         parts.append("| 評価項目 | 評価 | 理由 |\n")
+         parts.append("|---|---|---|\n")
+         if isinstance(items, dict): # items が辞書であることを確認
+             for item_key, details in items.items():
+                 item_label = ITEM_LABELS_JP.get(item_key, item_key)
+                 if isinstance(details, dict): # details が辞書であることを確認
+                     symbol = details.get('symbol', '-')
+                     reason = details.get('reason', '-')
+                     if reason is None: reason = '-'
+                     reason = reason.replace('\n', ' ').replace('|', '\\|') # Markdown テーブル用にエスケープ
+                     parts.append(f"| {item_label} | {symbol} | {reason} |\n")
+         parts.append("\n")
+
+    parts.append("**総合コメント:**\n")
+    parts.append(f"> {overall_comment.replace('> ', '')}\n\n")
+    parts.append("---\n\n")
+    return "".join(parts)
+
+_NO_RESULT = object() # iter_markdown で「結果が無い」ことを表す目印 (結果が None の場合と区別する)
+
+def iter_markdown(results_list):
+    """
+    Markdown を候補者1名ずつ返すジェネレーター (Flask のストリーミングレスポンス用)
+    文字列を += で伸ばし続けないので、件数が増えても最初のバイトがすぐ届き、メモリも増えない。
+    Args:
+        results_list (iterable[dict]): /api/evaluate のレスポンスと同じ形の結果
+    Yields:
+        str: Markdown の断片 (見出し、または候補者1名分)。結果が1件も無ければ "# 評価結果なし" だけ
+    """
+    results = iter(results_list)
+    first = next(results, _NO_RESULT)
+    if first is _NO_RESULT:
+        yield "# 評価結果なし"
+        return
+    yield "# 候補者評価結果一覧\n\n"
+    yield _render_markdown_candidate(0, first)
+    for i, result in enumerate(results, start=1):
+        yield _render_markdown_candidate(i, result)
 
 def generate_markdown(results_list):
-    if not results_list: return "# 評価結果なし"
-    markdown_output = "# 候補者評価結果一覧\n\n"
-    for i, result in enumerate(results_list):
-        gemini_eval = result.get("gemini_evaluation", {}) if result else {}
-        scores = result.get("calculated_scores", {}) if result else {}
-        evaluation = gemini_eval.get("evaluation", {}) if gemini_eval else {}
-
-        candidate_id = gemini_eval.get('candidate_identifier', f'不明な候補者 {i+1}')
-        total_score = scores.get('total_match_percentage', 'N/A')
-        req_score = scores.get('required_score', 'N/A')
-        pref_score = scores.get('preferred_score', 'N/A')
-        other_score = scores.get('other_score', 'N/A')
-        overall_comment = gemini_eval.get('overall_comment', 'コメントなし')
-
-        markdown_output += f"## {i+1}. {candidate_id}\n\n"
-        markdown_output += f"**総合スコア:** {total_score} %\n"
-        markdown_output += f"(必須: {req_score}, 優遇: {pref_score}, その他: {other_score})\n\n"
-        markdown_output += "**評価詳細:**\n\n"
-
-        item_label_map = {
-            "age": "年齢", "side_job": "副業", "outsourcing": "業務委託",
-            "experience": "経験", "management_level": "役職レベル",
-            "job_change_desire": "転職希望", "adaptability": "適応力", "teamwork": "チームワーク"
-        }
-        category_label_map = {"required":"必須条件", "preferred":"優遇条件", "other":"その他評価ポイント"}
-
-        for category, items in evaluation.items():
-             category_label = category_label_map.get(category, category)
-             markdown_output += f"### {category_label}\n"
-             markdown_output += "| 評価項目 | 評価 | 理由 |\n"
-             markdown_output += "|---|---|---|\n"
-             if isinstance(items, dict): # items が辞書であることを確認
-                 for item_key, details in items.items():
-                     item_label = item_label_map.get(item_key, item_key)
-                     if isinstance(details, dict): # details が辞書であることを確認
-                         symbol = details.get('symbol', '-')
-                         reason = details.get('reason', '-').replace('\n', ' ').replace('|', '\|') # Markdown テーブル用にエスケープ
-                         markdown_output += f"| {item_label} | {symbol} | {reason} |\n"
-             markdown_output += "\n"
-
-        markdown_output += "**総合コメント:**\n"
-        markdown_output += f"> {overall_comment.replace('> ', '')}\n\n"
-        markdown_output += "---\n\n"
-    return markdown_output
\ No newline at end of file
+    return "".join(iter_markdown(results_list or []))
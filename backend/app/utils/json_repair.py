@@ -0,0 +1,145 @@
+# backend/app/utils/json_repair.py
+# 壊れた・途中で切れた JSON をローカルで直して読むモジュール
+# LLM の出力は ```json の囲みや前後の説明文が付いたり、末尾のカンマ・途中での打ち切りが起きたりするので、
+# 1文字ずつ読みながら (括弧の深さと文字列の中かどうかを追って) 読める形に整えてから json.loads する。
+import json
+import re
+
+# 途中で切れた true / false / null の書きかけ (末尾の英字の並び)
+_PARTIAL_LITERAL_RE = re.compile(r"[A-Za-z]+$")
+
+
+def _from_first_brace(text):
+    """最初の '{' から先を返す (コードフェンスや前置きの説明文を読み飛ばす)"""
+    start = text.find("{")
+    return None if start < 0 else text[start:]
+
+
+def repair_json_text(text):
+    """
+    JSON オブジェクトらしきテキストを、json.loads できる形に整える
+    直すもの:
+      ・前後の余計なテキスト (```json の囲み、説明文など)
+      ・閉じ括弧の直前のカンマ
+      ・文字列中の生の改行・タブ
+      ・途中で切れた出力 (開いている文字列・括弧を閉じ、書きかけのキーや末尾のカンマを消す)
+    Args:
+        text (str): モデルが生成したテキスト
+    Returns:
+        str or None: 整えた JSON テキスト ('{' が見つからなければ None)
+    """
+    body = _from_first_brace(text or "")
+    if body is None:
+        return None
+
+    out = []
+    stack = [] # 開いている括弧 ('{' または '[')
+    in_string = False
+    escaped = False
+    expect_key = False # オブジェクトの中でキーを待っているところか
+    key_start = None   # 書きかけのキー (または値を待っているキー) の out 上の開始位置
+
+    def strip_trailing_comma():
+        while out and out[-1] in " \t\r\n":
+            out.pop()
+        if out and out[-1] == ",":
+            out.pop()
+
+    for ch in body:
+        if in_string:
+            if escaped:
+                escaped = False
+                out.append(ch)
+            elif ch == "\\":
+                escaped = True
+                out.append(ch)
+            elif ch == '"':
+                in_string = False
+                out.append(ch)
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+            continue
+
+        if ch == '"':
+            if stack and stack[-1] == "{" and expect_key:
+                key_start = len(out)
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append(ch)
+            expect_key = ch == "{"
+            key_start = None
+            out.append(ch)
+        elif ch in "}]":
+            strip_trailing_comma()
+            if stack:
+                stack.pop()
+            out.append(ch)
+            expect_key = False
+            key_start = None
+            if not stack:
+                break # 最初のオブジェクトが閉じたら、後ろの説明文などは無視する
+        elif ch == ",":
+            out.append(ch)
+            expect_key = bool(stack) and stack[-1] == "{"
+            key_start = None
+        elif ch == ":":
+            out.append(ch)
+            expect_key = False
+        else:
+            out.append(ch)
+
+    if stack:
+        # 途中で切れている: 書きかけのキーや、値の無いキーを消してから括弧を閉じる
+        if in_string:
+            if key_start is not None and expect_key:
+                del out[key_start:]
+            else:
+                if escaped:
+                    out.pop() # 末尾の '\' だけが残っている
+                out.append('"')
+        else:
+            tail = "".join(out).rstrip()
+            partial = _PARTIAL_LITERAL_RE.search(tail)
+            if partial and partial.group() not in ("true", "false", "null"):
+                # true / false / null の書きかけは捨てる
+                tail = tail[:partial.start()].rstrip()
+                del out[len(tail):]
+            if tail.endswith(":") and key_start is not None:
+                del out[key_start:]
+            elif expect_key and key_start is not None:
+                del out[key_start:] # キーの文字列だけで ':' が無い
+        strip_trailing_comma()
+        text_so_far = "".join(out)
+        for closer in reversed(stack):
+            text_so_far += "}" if closer == "{" else "]"
+        return text_so_far
+    return "".join(out)
+
+
+def loads_tolerant(text):
+    """
+    多少壊れていても JSON として読む関数
+    まずそのまま json.loads し、だめなら repair_json_text で整えてから読み直す
+    Args:
+        text (str): モデルが生成したテキスト
+    Returns:
+        tuple: (読み取った値 or None, 直したかどうか)
+    """
+    try:
+        return json.loads(text), False
+    except (TypeError, ValueError):
+        pass
+    repaired = repair_json_text(text)
+    if repaired is None:
+        return None, False
+    try:
+        return json.loads(repaired, strict=False), True
+    except ValueError:
+        return None, False
@@ -0,0 +1,153 @@
+# backend/app/utils/prescreen.py
+# 必須条件 (年齢・副業・業務委託) の事前判定モジュール
+# スカウト画面のテキストには「28歳」「雇用形態 / 正社員」のように条件がそのまま書かれていることが多いので、
+# クレンジング後のテキストから正規表現だけで取り出し (Gemini を呼ばずに数十マイクロ秒で終わる)、
+# required カテゴリの暫定の評価記号を決める。明らかに条件を満たさない候補者は Gemini の評価を省略できる。
+import re
+
+from .. import config
+
+# --- 取り出しに使うパターン (起動時にコンパイル) ---
+# 年齢: プロフィール欄 (会員No. の行のすぐ次の行) の「28歳」だけの行を優先し、無ければ「年齢：28歳」の形を探す
+# (クレンジングで「年齢」の見出しは消えるので、「満10歳から野球を続け」「勤続\n12歳」のような歳数を
+#  年齢と取り違えないよう、プロフィールの位置と年齢の欄以外からは取らない)
+_AGE_PROFILE_RE = re.compile(r"^[^\n]*会員No\.\d+[^\n]*\n[ \t　]*(\d{2})\s*歳[ \t　]*$", re.MULTILINE)
+_AGE_INLINE_RE = re.compile(r"年齢\s*[:：]?\s*(\d{2})\s*歳")
+# 雇用形態: 「雇用形態」の次の行の値
+_EMPLOYMENT_RE = re.compile(r"^\s*雇用形態\s*\n\s*(\S+)\s*$", re.MULTILINE)
+# 副業・業務委託の希望 (本人が書いた自由記述から)
+_SIDE_JOB_INTENT_RE = re.compile(
+    r"(?:副業|兼業|複業|ダブルワーク)\s*(?:を|も|が)?\s*(?:希望|したい|考えて|検討|予定|可能な|OK|ＯＫ)"
+)
+_OUTSOURCING_INTENT_RE = re.compile(
+    r"(?:業務委託|フリーランス|個人事業主?)\s*(?:として|で|の形で|での)?\s*(?:働きたい|希望|活動したい|契約を希望|働くことを希望)"
+)
+# 希望の語の直後の打ち消し (「業務委託希望：なし」「フリーランス希望ではありません」「副業は希望しない」)
+_NEGATION_RE = re.compile(r"\s*[:：]?\s*(?:なし|無し|ではありません|ではない|じゃない|しない|しません|不可|NG)")
+# 希望の語と同じ文にあると、本人の今の希望とは言い切れなくなる表現
+# 打ち消し (「～とは思いません」「特にありません」)、過去・逆接 (「以前は～ましたが」)、
+# 相手への条件 (「～希望の方はご遠慮ください」) など。こういう文は × にせず Gemini に任せる
+_UNCLEAR_RE = re.compile(
+    r"ない|なく|ません|なし|無し|不可|NG|ＮＧ|思わ|以前|かつて|前は|昔|ましたが|でしたが|たが|けど|けれど|ものの"
+    r"|の方|方は|ご遠慮|お断り|募集|かもしれ|迷って|悩んで"
+)
+_SENTENCE_END_RE = re.compile(r"[。．！？!?\n]")
+_MEMBER_NO_RE = re.compile(r"会員No\.\d+")
+
+OUTSOURCING_EMPLOYMENT_TYPES = ("業務委託", "フリーランス", "個人事業主")
+
+
+def _sentence_around(text, start, end):
+    """start～end を含む1文 (句点・改行で区切る) を返す"""
+    sentence_start = 0
+    for sentence_end in _SENTENCE_END_RE.finditer(text, 0, start):
+        sentence_start = sentence_end.end()
+    sentence_end = _SENTENCE_END_RE.search(text, end)
+    return text[sentence_start:sentence_end.start() if sentence_end else len(text)]
+
+
+def _classify_intent(pattern, text):
+    """
+    希望の表現がどう書かれているかを判定する
+    Returns:
+        str or None: "affirmative" (打ち消しなどの無い文で、はっきり希望している),
+            "unclear" (希望の語はあるが、同じ文の中に打ち消し・過去・相手への条件などがある), None (記載なし・直後で打ち消し)
+    """
+    result = None
+    for match in pattern.finditer(text):
+        if _NEGATION_RE.match(text, match.end()):
+            continue
+        if _UNCLEAR_RE.search(_sentence_around(text, match.start(), match.end())):
+            result = "unclear"
+            continue
+        return "affirmative"
+    return result
+
+
+def extract_facts(candidate_text):
+    """
+    クレンジング後のテキストから、必須条件の判定に使う事実を取り出す関数
+    Args:
+        candidate_text (str): クレンジング後の候補者テキスト
+    Returns:
+        dict: age (int or None), employment_types (list[str]), side_job_intent (bool),
+              outsourcing_intent (bool), outsourcing_unclear (bool), member_no (str or None)
+              *_intent ははっきり希望している場合だけ True。outsourcing_unclear は業務委託などに触れているが
+              希望かどうか言い切れない場合に True
+    """
+    text = candidate_text or ""
+    age_match = _AGE_PROFILE_RE.search(text) or _AGE_INLINE_RE.search(text)
+    member_match = _MEMBER_NO_RE.search(text)
+    outsourcing = _classify_intent(_OUTSOURCING_INTENT_RE, text)
+    return {
+        "age": int(age_match.group(1)) if age_match else None,
+        "employment_types": _EMPLOYMENT_RE.findall(text),
+        "side_job_intent": _classify_intent(_SIDE_JOB_INTENT_RE, text) == "affirmative",
+        "outsourcing_intent": outsourcing == "affirmative",
+        "outsourcing_unclear": outsourcing == "unclear",
+        "member_no": member_match.group() if member_match else None,
+    }
+
+
+def provisional_required_symbols(facts):
+    """
+    取り出した事実から required カテゴリの暫定の評価記号を決める関数
+    テキストから判断できない項目は含めない (Gemini に任せる)
+    Args:
+        facts (dict): extract_facts の戻り値
+    Returns:
+        dict: {項目キー: {"symbol": 記号, "reason": 理由}}
+    """
+    symbols = {}
+    low, high = config.PRESCREEN_AGE_RANGE
+    margin = config.PRESCREEN_AGE_MARGIN
+    age = facts.get("age")
+    if age is not None:
+        if low <= age <= high:
+            symbols["age"] = {"symbol": "◎", "reason": f"{age}歳 (条件 {low}～{high}歳の範囲内)"}
+        elif low - margin <= age <= high + margin:
+            symbols["age"] = {"symbol": "△", "reason": f"{age}歳 (条件 {low}～{high}歳に近い)"}
+        else:
+            symbols["age"] = {"symbol": "×", "reason": f"{age}歳 (条件 {low}～{high}歳の範囲外)"}
+
+    # 副業希望は「条件次第で折り合いがつく可能性」があるので × にはしない (評価ガイドラインより)
+    if facts.get("side_job_intent"):
+        symbols["side_job"] = {"symbol": "△", "reason": "副業・兼業の希望の記載あり"}
+
+    if facts.get("outsourcing_intent"):
+        symbols["outsourcing"] = {"symbol": "×", "reason": "業務委託・フリーランスでの就業希望の記載あり"}
+    elif facts.get("outsourcing_unclear"):
+        symbols["outsourcing"] = {"symbol": "△", "reason": "業務委託・フリーランスに触れた記載あり (希望かどうかは要確認)"}
+    elif facts.get("employment_types") and all(
+        employment in OUTSOURCING_EMPLOYMENT_TYPES for employment in facts["employment_types"]
+    ):
+        symbols["outsourcing"] = {"symbol": "△", "reason": "職歴が業務委託のみ"}
+    return symbols
+
+
+def is_clear_disqualification(symbols):
+    """暫定の記号に × (必須条件を明らかに満たさない) があるか"""
+    return any(item["symbol"] == "×" for item in symbols.values())
+
+
+def build_prescreen_evaluation(facts, symbols):
+    """
+    事前判定だけで評価を打ち切るときの評価結果 (Gemini の出力と同じ形) を作る関数
+    判定できなかった required の項目は △、それ以外のカテゴリは未評価として × にする
+    """
+    evaluation = {}
+    for category, items in config.ITEM_WEIGHTS.items():
+        evaluation[category] = {}
+        for item_key in items:
+            if category == "required" and item_key in symbols:
+                evaluation[category][item_key] = dict(symbols[item_key])
+            elif category == "required":
+                evaluation[category][item_key] = {"symbol": "△", "reason": "事前判定では判断できず"}
+            else:
+                evaluation[category][item_key] = {"symbol": "×", "reason": "未評価 (必須条件を満たさないため省略)"}
+    reasons = "、".join(item["reason"] for item in symbols.values() if item["symbol"] == "×")
+    return {
+        "evaluation": evaluation,
+        "candidate_identifier": facts.get("member_no") or "",
+        "overall_comment": f"事前判定で必須条件を満たさないと判断したため、AI評価を省略しました ({reasons})",
+    }
@@ -0,0 +1,127 @@
+# backend/app/utils/profiling.py
+# リクエスト単位のサンプリングプロファイラ (オプトイン)
+# 有効にしたリクエストの間だけ、別スレッドが一定間隔でリクエストを処理しているスレッドのスタックを覗き、
+# 「関数;関数;関数 件数」の collapsed-stack 形式でファイルに書き出す
+# (flamegraph.pl や speedscope にそのまま読み込んで、フレームグラフにできる)。
+# 対象のスレッドを止めずに覗くだけなので、cProfile のように全ての関数呼び出しで遅くなることはない。
+# 実時間 (wall-clock) でサンプリングするので、Gemini の応答待ちも「待っている場所」として現れる。
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from .. import config
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(frame):
+    """フレームから、外側→内側の順に ';' でつないだスタック文字列を作る"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class SamplingProfiler:
+    """
+    指定したスレッドのスタックを interval 秒ごとに記録するプロファイラ
+    Args:
+        thread_id (int): 対象のスレッドの ident (threading.get_ident())
+        interval (float): サンプリング間隔 (秒)
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+
+
+def should_profile(header_value):
+    """
+    このリクエストをプロファイルするか
+    PROFILING_ENABLED のときだけ、ヘッダー (PROFILING_HEADER: 1) があるか、PROFILING_SAMPLE_RATE の確率で選ぶ
+    """
+    if not config.PROFILING_ENABLED:
+        return False
+    if header_value and header_value.strip().lower() in ("1", "true", "yes"):
+        return True
+    return config.PROFILING_SAMPLE_RATE > 0 and random.random() < config.PROFILING_SAMPLE_RATE
+
+
+class RequestProfile:
+    """
+    1リクエスト分のプロファイル (start_request_profile で作る)
+    finish() でサンプリングを止め、PROFILING_OUTPUT_DIR に .folded ファイルを書き出す
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}.folded"
+        self._started = time.perf_counter()
+        self._profiler = SamplingProfiler(threading.get_ident(), config.PROFILING_INTERVAL_SECONDS).start()
+        self._finished = False
+        self._finish_lock = threading.Lock()
+
+    def finish(self):
+        """
+        2回目以降の呼び出し (teardown_request と call_on_close の両方から呼ばれた場合など) は何もしない
+        Returns:
+            str or None: 書き出したファイルのパス (書き出しに失敗した場合・2回目以降は None)
+            サンプリング間隔より短く終わったリクエストは空のファイルになる
+        """
+        with self._finish_lock:
+            if self._finished:
+                return None
+            self._finished = True
+        samples = self._profiler.stop()
+        elapsed = time.perf_counter() - self._started
+        path = os.path.join(config.PROFILING_OUTPUT_DIR, self.filename)
+        try:
+            os.makedirs(config.PROFILING_OUTPUT_DIR, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Error writing profile {path}: {e}")
+            return None
+        print(f"Profile written: {path} ({sum(samples.values())} samples over {elapsed * 1000:.0f} ms)")
+        return path
+
+
+def start_request_profile(route, header_value=None):
+    """
+    プロファイルの対象なら、今のスレッドのサンプリングを始めて RequestProfile を返す (対象外なら None)
+    Args:
+        route (str): ルートのパス (例: "/api/evaluate")。PROFILING_ROUTES に無ければ対象外
+        header_value (str, optional): リクエストの PROFILING_HEADER ヘッダーの値
+    """
+    if route not in config.PROFILING_ROUTES or not should_profile(header_value):
+        return None
+    return RequestProfile(route.strip("/").replace("/", "_"))
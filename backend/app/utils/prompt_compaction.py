@@ -0,0 +1,146 @@
+# backend/app/utils/prompt_compaction.py
+# クレンジング後の候補者テキストを、トークン数の予算に収まるよう圧縮するモジュール
+# clean_candidate_text の後、Gemini に送る前に通す。評価基準が見る項目 (年齢・雇用形態・宿泊業の経験など) は残し、
+# 長い自由記述 (職務内容・自己PR) のうち基準に関係しない部分から削っていく。
+import math
+import re
+
+from .. import config
+
+# --- トークン数の見積もり (オフライン) ---
+# Gemini のトークナイザーに近い値になるよう、英数字と日本語で1トークンあたりの文字数を分けて数える
+APPROX_ASCII_CHARS_PER_TOKEN = 4.0
+APPROX_OTHER_CHARS_PER_TOKEN = 1.5
+
+# これより長い行を「自由記述」とみなし、削る対象にする (短い行は項目名や値なので必ず残す)
+LONG_LINE_CHARS = 40
+# これ以上の長さの文は、2回目以降の出現を消す (短い文は項目の値のことがあるので残す)
+MIN_DEDUP_SENTENCE_CHARS = 8
+
+_SPACES_RE = re.compile(r"[ \t　]+")
+_SENTENCE_RE = re.compile(r"[^。！？!?]+[。！？!?]?")
+
+
+def count_tokens_approx(text):
+    """
+    テキストのトークン数をおおまかに見積もる (API を呼ばないのでローカルで試せる)
+    Args:
+        text (str): 対象のテキスト
+    Returns:
+        int: 見積もったトークン数
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", errors="ignore"))
+    other_chars = len(text) - ascii_chars
+    return math.ceil(ascii_chars / APPROX_ASCII_CHARS_PER_TOKEN + other_chars / APPROX_OTHER_CHARS_PER_TOKEN)
+
+
+def _keyword_re(keywords):
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords)) if keywords else None
+
+
+def _keep_keyword_sentences(line, keyword_search):
+    """長い行から、キーワードを含む文だけを残す"""
+    sentences = [sentence for sentence in _SENTENCE_RE.findall(line) if keyword_search(sentence)]
+    return "".join(sentences).strip()
+
+
+def compact_candidate_text(text, token_budget=None, count_tokens=count_tokens_approx, keywords=None):
+    """
+    候補者テキストをトークン数の予算に収まるよう圧縮する関数
+    最初から予算に収まっているテキストは一切変えずに返す (Gemini に送る内容もキャッシュキーも変わらない)。
+    予算を超えている場合は次の順に、予算に収まった時点でやめる (後ろの行ほど古い経歴・補足なので、後ろから削る)
+      0. 空白の連続をまとめ、繰り返された長い行・文を消す
+      1. キーワードを含まない長い行 (自由記述) を後ろから消す
+      2. キーワードを含む長い行を、キーワードを含む文だけに縮める
+    短い行 (項目名・値) は消さないので、予算に収まらないこともある (その場合は縮めた結果をそのまま返す)
+    Args:
+        text (str): クレンジング後の候補者テキスト
+        token_budget (int, optional): 候補者テキストに使うトークン数の上限 (省略時は config の値)
+        count_tokens (callable): トークン数を数える関数 (テキスト全体に対して最初と最後の2回だけ呼ぶ)
+        keywords (iterable[str], optional): 残したい語 (省略時は config.COMPACTION_KEEP_KEYWORDS)
+    Returns:
+        tuple: (圧縮後のテキスト, 統計の辞書)
+            before_tokens / after_tokens: 圧縮前後のトークン数, budget: 予算,
+            dropped_lines / trimmed_lines: 消した行数・縮めた行数
+    """
+    if token_budget is None:
+        token_budget = config.COMPACTION_TOKEN_BUDGET
+    keyword_re = _keyword_re(config.COMPACTION_KEEP_KEYWORDS if keywords is None else keywords)
+    keyword_search = keyword_re.search if keyword_re else (lambda _: False)
+
+    before_tokens = count_tokens(text)
+    stats = {"before_tokens": before_tokens, "after_tokens": before_tokens, "budget": token_budget,
+             "dropped_lines": 0, "trimmed_lines": 0}
+    if not text or before_tokens <= token_budget:
+        return text, stats
+
+    # --- 0. 空白の整理と、繰り返された長い行・文の除去 ---
+    lines = []
+    seen_long_lines = set()
+    seen_sentences = set()
+    for line in text.split("\n"):
+        line = _SPACES_RE.sub(" ", line).strip()
+        if len(line) > LONG_LINE_CHARS:
+            if line in seen_long_lines:
+                stats["dropped_lines"] += 1
+                continue
+            seen_long_lines.add(line)
+        if "。" in line:
+            sentences = []
+            for sentence in _SENTENCE_RE.findall(line):
+                if len(sentence) >= MIN_DEDUP_SENTENCE_CHARS:
+                    if sentence in seen_sentences:
+                        continue
+                    seen_sentences.add(sentence)
+                sentences.append(sentence)
+            deduplicated = "".join(sentences).strip()
+            if deduplicated != line:
+                stats["trimmed_lines"] += 1
+                if not deduplicated:
+                    stats["dropped_lines"] += 1
+                    continue
+                line = deduplicated
+        lines.append(line)
+
+    # count_tokens が API の場合も呼び出しを増やさないよう、行ごとの量は見積もりを実測値に合わせて換算する
+    scale = 1.0
+    if count_tokens is not count_tokens_approx:
+        approx_before = count_tokens_approx(text)
+        scale = before_tokens / approx_before if approx_before else 1.0
+    line_tokens = [count_tokens_approx(line) * scale for line in lines]
+    total = count_tokens_approx("\n".join(lines)) * scale
+
+    # --- 1. キーワードを含まない自由記述を後ろから消す ---
+    for i in range(len(lines) - 1, -1, -1):
+        if total <= token_budget:
+            break
+        line = lines[i]
+        if line is not None and len(line) > LONG_LINE_CHARS and not keyword_search(line):
+            total -= line_tokens[i]
+            lines[i] = None
+            stats["dropped_lines"] += 1
+
+    # --- 2. キーワードを含む自由記述を、キーワードを含む文だけに縮める ---
+    for i in range(len(lines) - 1, -1, -1):
+        if total <= token_budget:
+            break
+        line = lines[i]
+        if line is not None and len(line) > LONG_LINE_CHARS:
+            trimmed = _keep_keyword_sentences(line, keyword_search)
+            if trimmed != line:
+                new_tokens = count_tokens_approx(trimmed) * scale
+                total -= line_tokens[i] - new_tokens
+                lines[i], line_tokens[i] = trimmed, new_tokens
+                stats["trimmed_lines"] += 1
+
+    # 空になった行を除き、連続する空行は1つにまとめる
+    kept = []
+    for line in lines:
+        if line is None or (not line and (not kept or not kept[-1])):
+            continue
+        kept.append(line)
+    compacted = "\n".join(kept).strip()
+    stats["after_tokens"] = count_tokens(compacted)
+    return compacted, stats
@@ -70,82 +70,172 @@ LINE_PATTERNS_TO_REMOVE = [
 #     "入力なし",
 # ]
 
-def clean_candidate_text(raw_text):
+# --- ルールのコンパイル ---
+# 1行ごとに40個近いパターンを re.match し直すと遅いので、起動時に1回だけ次の形にまとめておく
+#   ・行全体が固定文字列のもの (例: "^\s*年齢$")      → set で完全一致チェック
+#   ・行頭が固定文字列のもの   (例: "^\s*更新日")     → str.startswith でまとめてチェック
+#   ・それ以外 (記号の繰り返しや英字を含むもの)         → 1本の正規表現 (|で連結) にまとめる
+_REGEX_SPECIAL_CHARS = set(".^$*+?{}[]\\|()")
+_LINE_START_PREFIX = r"^\s*"
+
+
+def _is_plain_literal(text):
+    # 正規表現の特殊文字を含まず、大文字小文字の区別がない (IGNORECASE の影響を受けない) 文字列か
+    return not (_REGEX_SPECIAL_CHARS & set(text)) and text.lower() == text.upper()
+
+
+def _compile_search_pattern(pattern):
+    # ".*XXX.*" を re.match するのは "XXX" を re.search するのと同じ (行には改行が含まれないため)
+    # 先頭の ".*" があると毎回行全体を走査し直すので外しておく
+    if pattern.startswith(".*"):
+        pattern = pattern[2:]
+    if pattern.endswith(".*") and not pattern.endswith("\\.*"):
+        pattern = pattern[:-2]
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def compile_rules():
     """
-    候補者の生テキストからヘッダー、フッター、不要な定型行を除去する関数。
+    HEADER_END_PATTERN / FOOTER_START_PATTERN / LINE_PATTERNS_TO_REMOVE をコンパイルし直す関数。
+    モジュール読み込み時に1回呼ばれる。パターンを実行中に書き換えた場合は、この関数を呼び直すこと。
+    """
+    global _HEADER_END_RE, _FOOTER_START_RE, _LINES_TO_REMOVE, _PREFIXES_TO_REMOVE, _LINE_REMOVE_RE
+
+    exact_lines = set()
+    prefixes = []
+    regex_patterns = []
+    for pattern in LINE_PATTERNS_TO_REMOVE:
+        body = pattern[len(_LINE_START_PREFIX):] if pattern.startswith(_LINE_START_PREFIX) else None
+        if body is not None and body.endswith("$") and _is_plain_literal(body[:-1]):
+            exact_lines.add(body[:-1])
+        elif body is not None and body.endswith(".*") and _is_plain_literal(body[:-2]):
+            prefixes.append(body[:-2])
+        elif body is not None and _is_plain_literal(body):
+            prefixes.append(body)
+        else:
+            regex_patterns.append(pattern)
+
+    _HEADER_END_RE = re.compile(HEADER_END_PATTERN, re.IGNORECASE)
+    _FOOTER_START_RE = _compile_search_pattern(FOOTER_START_PATTERN)
+    _LINES_TO_REMOVE = frozenset(exact_lines)
+    _PREFIXES_TO_REMOVE = tuple(prefixes)
+    _LINE_REMOVE_RE = re.compile("|".join(f"(?:{p})" for p in regex_patterns), re.IGNORECASE) if regex_patterns else None
+
+
+def _should_remove_line(line_to_check):
+    """
+    LINE_PATTERNS_TO_REMOVE のどれかに一致するか (line_to_check は strip 済みであること)
+    """
+    if line_to_check in _LINES_TO_REMOVE:
+        return True
+    if _PREFIXES_TO_REMOVE and line_to_check.startswith(_PREFIXES_TO_REMOVE):
+        return True
+    return _LINE_REMOVE_RE is not None and _LINE_REMOVE_RE.match(line_to_check) is not None
 
-    Args:
-        raw_text (str): フロントエンドから受け取った生のテキスト全体。
 
-    Returns:
-        str: クレンジングされたテキスト。
+compile_rules()
+
+
+# str.splitlines() と同じ改行の区切り
+_LINE_BREAK_RE = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def iter_lines(source):
     """
-    if not isinstance(raw_text, str):
-        return ""
+    テキストを1行ずつ取り出すジェネレーター (改行文字は含まない)
+    splitlines() と違って行のリストを作らないので、巨大な入力でもメモリを食わない。
+    Args:
+        source (str or file-like): 文字列、またはテキスト/バイナリのストリーム
+            (Flask の request.stream など。バイナリは UTF-8 として読む)
+    Yields:
+        str: 1行分のテキスト
+    """
+    if isinstance(source, str):
+        position = 0
+        for match in _LINE_BREAK_RE.finditer(source):
+            yield source[position:match.start()]
+            position = match.end()
+        if position < len(source):
+            yield source[position:]
+        return
+
+    for chunk in source:
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode("utf-8", errors="replace")
+        # ストリームの1行には \v などの区切りが残っている場合があるので、splitlines と揃える
+        yield from chunk.splitlines()
+
+
+def iter_clean_lines(source, stats=None):
+    """
+    クレンジング後の行を1行ずつ返すジェネレーター
+    ヘッダー・フッター・行除去のルールを順番に適用し、フッター開始行が見つかった時点で読むのをやめる。
+    Args:
+        source (str or file-like): 生のテキスト、またはストリーム (iter_lines を参照)
+        stats (dict, optional): 渡すと除去した行数などを書き込む
+            header / body: 除去した行数, footer_line: フッター開始行の行番号 (無ければ None)
+    Yields:
+        str: 残す行 (連続する空行は1つにまとめる)
+    """
+    if stats is None:
+        stats = {}
+    stats.update(header=0, body=0, footer_line=None)
 
-    lines = raw_text.splitlines()
-    cleaned_lines = []
     is_header = True  # 最初はヘッダー部分とみなす
-    is_footer = False # フッター部分はまだ始まっていない
-    header_removed_count = 0
-    line_removed_count = 0
-    footer_removed_count = 0
+    previous_has_text = False # 直前に残した行が空行でないか (連続空行をなくすため)
+
+    # 毎行のグローバル参照を避けるため、ローカル変数に入れておく
+    header_end_match = _HEADER_END_RE.match
+    footer_start_search = _FOOTER_START_RE.search
+    should_remove_line = _should_remove_line
 
-    for i, line in enumerate(lines):
-        original_line = line
+    for i, line in enumerate(iter_lines(source)):
         line_to_check = line.strip()
 
         # --- ヘッダー処理 ---
         if is_header:
             # ヘッダー終了パターンに一致するかチェック
-            if re.match(HEADER_END_PATTERN, line_to_check, re.IGNORECASE):
-                print(f"Header end detected at line {i+1}: '{original_line}'")
+            if header_end_match(line_to_check):
                 is_header = False # ヘッダー終了
-                # この行自体は評価対象に含める (会員No.などは次の行除去で消える想定)
-                # cleaned_lines.append(original_line) # 含めずに次のステップに進む
-                # continue # 次の行の処理へ
+                # この行自体も以降のフッター判定・行除去の対象にする (会員No.などは次の行除去で消える想定)
             else:
                 # まだヘッダー部分なので、この行は無視
-                # print(f"Removing header line: '{original_line}'")
-                header_removed_count += 1
+                stats["header"] += 1
                 continue # 次の行へ
 
         # --- フッター処理 ---
-        if not is_footer:
-             # フッター開始パターンに一致するかチェック
-            if re.match(FOOTER_START_PATTERN, line_to_check, re.IGNORECASE):
-                print(f"Footer start detected at line {i+1}: '{original_line}'")
-                is_footer = True # フッター開始
-                # この行以降はすべて無視
-                footer_removed_count += (len(lines) - i) # 残りの行数をカウント
-                break # ループを抜ける
+        # フッター開始パターンに一致したら、この行以降は読まずに終了
+        if footer_start_search(line_to_check):
+            stats["footer_line"] = i + 1
+            return
 
         # --- 本文の不要行除去処理 ---
-        if not is_header and not is_footer:
-            should_remove = False
-            # 完全一致フレーズ除去 (今回は使わない)
-            # if line_to_check in PHRASES_TO_REMOVE_EXACT:
-            #     should_remove = True
-
-            if not should_remove:
-                # 行パターンで除去するかチェック
-                for pattern in LINE_PATTERNS_TO_REMOVE:
-                    if re.match(pattern, line_to_check, re.IGNORECASE):
-                        # print(f"Removing line by pattern '{pattern}': '{original_line}'")
-                        should_remove = True
-                        line_removed_count += 1
-                        break
-
-            if not should_remove:
-                # 空行でない、または直前が空行でない場合のみ追加 (連続空行をなくす)
-                if line_to_check or (cleaned_lines and cleaned_lines[-1].strip()):
-                     cleaned_lines.append(original_line)
-
-    total_removed = header_removed_count + line_removed_count + footer_removed_count
-    print(f"Cleaned text: Removed {total_removed} lines (Header: {header_removed_count}, Body: {line_removed_count}, Footer: {footer_removed_count}).")
-
-    # クレンジング後の行を結合
-    cleaned_text = "\n".join(cleaned_lines)
-
-    # 最後に全体の不要な空白を除去
-    return cleaned_text.strip()
\ No newline at end of file
+        if should_remove_line(line_to_check):
+            stats["body"] += 1
+            continue
+
+        # 空行でない、または直前が空行でない場合のみ返す (連続空行をなくす)
+        if line_to_check or previous_has_text:
+            previous_has_text = bool(line_to_check)
+            yield line
+
+
+def clean_candidate_text(raw_text):
+    """
+    候補者の生テキストからヘッダー、フッター、不要な定型行を除去する関数。
+
+    Args:
+        raw_text (str or file-like): フロントエンドから受け取った生のテキスト全体。
+            大きな貼り付けの場合はストリーム (request.stream など) をそのまま渡してもよい。
+
+    Returns:
+        str: クレンジングされたテキスト。
+    """
+    if not isinstance(raw_text, str) and not hasattr(raw_text, "read"):
+        return ""
+
+    stats = {}
+    # クレンジング後の行を結合して、最後に全体の不要な空白を除去
+    # (除去した行数は stats に入る。リクエストごとの print はしない)
+    cleaned_text = "\n".join(iter_clean_lines(raw_text, stats)).strip()
+    return cleaned_text
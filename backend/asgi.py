@@ -0,0 +1,232 @@
+# backend/asgi.py
+# 非同期 (ASGI) モードのエントリーポイント。run.py (WSGI) の代わりに使う
+#   ローカル: uvicorn asgi:app --port 5001
+#   本番:     gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+#
+# /api/evaluate と /api/evaluate/batch の POST だけをここで非同期に処理し、
+# Gemini の応答待ちの間もイベントループを止めない (1プロセスで多数の呼び出しを同時に待てる)。
+# それ以外のルート (ヘルスチェック、エクスポートなど) は Flask アプリにそのまま渡す。
+# リクエストの本文はどちらの場合も先に読み切らず、読んだぶんだけ受け取る (_ReceiveStream を参照)。
+import asyncio
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv() # .envファイルから環境変数を読み込む (app をインポートする前に)
+
+from asgiref.sync import AsyncToSync, sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import create_app
+from app import config
+from app.services import evaluation_service
+from app.services import metrics
+from app.utils import profiling
+
+# Flask 側のリクエストを処理するスレッドプール
+# (asgiref の標準設定では全リクエストが1本のスレッドに直列化されるため、専用のプールを使う)
+_wsgi_executor = ThreadPoolExecutor(max_workers=config.ASGI_WSGI_THREADS, thread_name_prefix="wsgi")
+
+
+class _ReceiveStream(io.RawIOBase):
+    """
+    ASGI の receive() から本文を読むファイル風オブジェクト (イベントループ以外のスレッドから読む)
+    読んだぶんだけ http.request メッセージを受け取るので、text/plain の貼り付けでフッターが見つかって
+    読むのをやめれば、残りの本文はメモリに載せずに済む
+    (asgiref の WsgiToAsgi は本文を全部 SpooledTemporaryFile に読み込んでから Flask に渡すので、この効果が無くなる)
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._pending = b""
+        self._finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._finished:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] != "http.request":
+                # 途中で切断された場合は、そこまでを本文として扱う
+                self._finished = True
+                break
+            self._pending = message.get("body", b"")
+            self._finished = not message.get("more_body")
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _receive_stream(receive):
+    """receive() から本文を読むストリームを作る (イベントループのスレッドで呼ぶこと)"""
+    return io.BufferedReader(_ReceiveStream(receive, asyncio.get_running_loop()))
+
+
+class _ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False, executor=_wsgi_executor
+    )
+
+    async def __call__(self, scope, receive, send):
+        # 本文を先に読み切らず、wsgi.input として Flask が読んだぶんだけ受け取る
+        if scope["type"] != "http":
+            raise ValueError("WSGI wrapper received a non-HTTP scope")
+        self.scope = scope
+        self.sync_send = AsyncToSync(send)
+        with _receive_stream(receive) as body:
+            await self.run_wsgi_app(body)
+
+    def build_environ(self, scope, body):
+        environ = super().build_environ(scope, body)
+        # 本文の終わりはストリーム側でわかる (Content-Length の無い chunked の本文も Flask から読めるように)
+        environ["wsgi.input_terminated"] = True
+        return environ
+
+
+class _ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _ThreadPoolWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(
+            scope, receive, send
+        )
+
+
+flask_app = create_app()
+_wsgi_app = _ThreadPoolWsgiToAsgi(flask_app)
+_frontend_url = os.environ.get('FRONTEND_URL', '*')
+
+
+# --- 非同期で処理するルート ---
+async def _evaluate(data):
+    raw_candidate_text, error = evaluation_service.parse_evaluate_request(data)
+    if error:
+        return {"error": error}, 400
+    return await evaluation_service.evaluate_candidate_text_async(raw_candidate_text)
+
+
+async def _evaluate_batch(data):
+    candidate_texts, max_concurrency, error = evaluation_service.parse_batch_request(data)
+    if error:
+        return {"error": error}, 400
+    return await evaluation_service.evaluate_batch_async(candidate_texts, max_concurrency), 200
+
+
+_ASYNC_ROUTES = {
+    "/api/evaluate": _evaluate,
+    "/api/evaluate/batch": _evaluate_batch,
+}
+
+
+def _cors_headers(scope):
+    """Flask-CORS (create_app の設定) と同じ CORS ヘッダーを付ける"""
+    request_origin = None
+    for name, value in scope.get("headers", []):
+        if name == b"origin":
+            request_origin = value.decode("latin1")
+    if not request_origin:
+        return []
+    if _frontend_url != '*' and request_origin != _frontend_url:
+        return []
+    return [
+        (b"access-control-allow-origin", request_origin.encode("latin1")),
+        (b"access-control-allow-credentials", b"true"),
+        (b"vary", b"Origin"),
+    ]
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, scope, payload, status_code, extra_headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("ascii")),
+    ] + _cors_headers(scope) + list(extra_headers)
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _header_value(scope, name):
+    for header_name, value in scope.get("headers", []):
+        if header_name == name:
+            return value.decode("latin1")
+    return None
+
+
+def _is_plain_text(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"content-type":
+            return value.split(b";")[0].strip().lower() == b"text/plain"
+    return False
+
+
+async def _handle_async_route(handler, scope, receive, send):
+    started = time.perf_counter()
+    # プロファイリング (create_app の start_request_profile を参照)。イベントループのスレッドをサンプリングするので、
+    # 同じ時間に動いていた他のリクエストのコルーチンも混ざる (並行数が少ないときに取るほうが読みやすい)。
+    # クレンジングや結果の保存は asyncio.to_thread で別スレッドに回すので、ここには await として現れる
+    profile = profiling.start_request_profile(
+        scope["path"], _header_value(scope, config.PROFILING_HEADER.lower().encode("latin1"))
+    )
+    try:
+        if _is_plain_text(scope):
+            # Flask 側と同じく、text/plain の本文はストリームのまま候補者テキストとして扱う
+            # (クレンジングは別スレッドで行い、フッターが見つかった時点で読むのをやめる)
+            data = {"candidate_text": _receive_stream(receive)}
+        else:
+            data = json.loads(await _read_body(receive) or b"null")
+    except ValueError:
+        payload, status_code = {"error": "Invalid JSON in request body"}, 400
+    else:
+        if data is not None and not isinstance(data, dict):
+            # 5 や "x" のような JSON も読めてしまうので、オブジェクト以外はここで弾く
+            payload, status_code = {"error": "Request body must be a JSON object"}, 400
+        else:
+            payload, status_code = await handler(data)
+    finally:
+        if profile is not None:
+            profile.finish()
+    # Flask 側のルートと同じメトリクスに記録する (create_app の after_request を参照)
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started, method=scope["method"], route=scope["path"], status=str(status_code)
+    )
+    extra_headers = []
+    if profile is not None:
+        extra_headers.append((b"x-profile-file", profile.filename.encode("latin1")))
+    await _send_json(send, scope, payload, status_code, extra_headers)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _wsgi_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] == "http" and scope["method"] == "POST":
+        handler = _ASYNC_ROUTES.get(scope["path"])
+        if handler is not None:
+            await _handle_async_route(handler, scope, receive, send)
+            return
+    await _wsgi_app(scope, receive, send)
@@ -0,0 +1,66 @@
+# backend/benchmarks/bench_prompt_compaction.py
+# compact_candidate_text のベンチマーク
+# 自己PR・職務内容が長い候補者テキストを合成し、圧縮前後のトークン数 (オフラインの見積もり) と処理時間を表示する。
+# 評価基準が見る項目 (年齢・雇用形態・業種・職種など) が圧縮後も残っていることも確認する。
+#
+# 実行方法 (backend ディレクトリで):
+#   python benchmarks/bench_prompt_compaction.py
+#   python benchmarks/bench_prompt_compaction.py --budget 2000 --repeat 5
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.utils import prompt_compaction
+from app.utils import text_processing
+from bench_text_processing import generate_scout_page
+
+# 圧縮後も残っていなければならない行 (generate_scout_page が作る項目の値)
+_REQUIRED_FIELD_MARKERS = ["歳", "正社員", "契約社員", "業務委託", "アルバイト", "ホテル・旅館", "会員No."]
+
+
+def _cleaned_candidate(paragraph_lines, seed):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return text_processing.clean_candidate_text(generate_scout_page(0, seed=seed, paragraph_lines=paragraph_lines))
+
+
+def _check_fields(before, after):
+    """圧縮前にあった項目の行が、圧縮後にも残っているか"""
+    after_lines = set(after.split("\n"))
+    missing = [line for line in before.split("\n")
+               if len(line.strip()) <= prompt_compaction.LONG_LINE_CHARS
+               and any(marker in line for marker in _REQUIRED_FIELD_MARKERS)
+               and line.strip() not in after_lines]
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compact_candidate_text on long candidate texts.")
+    parser.add_argument("--budget", type=int, default=config.COMPACTION_TOKEN_BUDGET)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'paragraph lines':>15} {'chars':>8} {'before':>8} {'after':>8} {'saved':>7} {'dropped':>8} {'trimmed':>8} {'ms':>7}")
+    for paragraph_lines in (6, 40, 150, 600):
+        text = _cleaned_candidate(paragraph_lines, seed=paragraph_lines)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            compacted, stats = prompt_compaction.compact_candidate_text(text, args.budget)
+            best = min(best, time.perf_counter() - start)
+        missing = _check_fields(text, compacted)
+        if missing:
+            print(f"ERROR: fields lost by compaction: {missing[:5]}")
+            sys.exit(1)
+        saved = 1 - stats["after_tokens"] / stats["before_tokens"]
+        print(f"{paragraph_lines:>15} {len(text):>8} {stats['before_tokens']:>8} {stats['after_tokens']:>8} {saved:>6.0%} "
+              f"{stats['dropped_lines']:>8} {stats['trimmed_lines']:>8} {best * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_startup.py
+# ワーカー起動のベンチマーク
+# 新しいプロセスで `from app import create_app; create_app()` を行い、import にかかった時間・create_app の時間・
+# その時点のメモリ使用量 (RSS) と、重いモジュール (google.generativeai, numpy) が読み込まれたかを表示する。
+# 比較用の eager は、以前のように起動時に google.generativeai と numpy を読み込んでから app を読み込む。
+#
+# 実行方法 (backend ディレクトリで):
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --repeat 10
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["google.generativeai", "google.api_core.exceptions", "numpy"]
+
+# 子プロセスで実行するコード (結果を JSON で1行出力する)
+_CHILD_CODE = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    if {eager!r}:
+        import google.generativeai, numpy
+    from app import create_app
+    imported = time.perf_counter()
+    create_app()
+created = time.perf_counter()
+try:
+    with open("/proc/self/status") as status:
+        rss_kb = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+except OSError:
+    import resource # Linux 以外はピーク値で代用する
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "rss_mb": rss_kb / 1024,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_once(eager, data_dir):
+    code = _CHILD_CODE.format(eager=eager, heavy=HEAVY_MODULES)
+    env = dict(os.environ, BACKEND_DATA_DIR=data_dir, JOB_WORKERS_AUTOSTART="0")
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold import time and memory of create_app().")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        print(f"{'mode':>6} {'import ms':>10} {'create ms':>10} {'RSS MB':>8}  loaded heavy modules")
+        for mode, eager in (("eager", True), ("lazy", False)):
+            runs = [run_once(eager, data_dir) for _ in range(args.repeat)]
+            import_ms = statistics.median(run["import_ms"] for run in runs)
+            create_ms = statistics.median(run["create_app_ms"] for run in runs)
+            rss_mb = statistics.median(run["rss_mb"] for run in runs)
+            print(f"{mode:>6} {import_ms:>10.0f} {create_ms:>10.1f} {rss_mb:>8.1f}  {', '.join(runs[-1]['loaded']) or '-'}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
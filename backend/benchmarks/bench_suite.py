@@ -0,0 +1,259 @@
+# backend/benchmarks/bench_suite.py
+# CPU で処理する部分 (クレンジング・スコア計算・エクスポート) をまとめて測るベンチマーク
+# 合成データ (doda 風の貼り付けテキストと、gemini_evaluation と同じ形の評価結果) を乱数シード固定で作り、
+# ケースごとに処理時間 (最速値)・スループット・ピークメモリ (tracemalloc) を表示する。
+# 結果は JSON で保存でき、保存したベースラインと比べて遅く/重くなったケースを REGRESSION として表示する
+# (1件でもあれば終了コード 1)。ベースラインは同じマシンで取ったものと比べること。
+#
+# 実行方法 (backend ディレクトリで):
+#   python benchmarks/bench_suite.py --save-baseline             # 変更前にベースラインを保存
+#   python benchmarks/bench_suite.py                             # 変更後に実行すると、ベースラインと比べる
+#   python benchmarks/bench_suite.py --sizes 10,1000,100000 --only export
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import config
+from app.services import scoring_service
+from app.utils import export_utils
+from app.utils import text_processing
+from bench_text_processing import generate_scout_page
+
+DEFAULT_BASELINE_PATH = os.path.join(config.DATA_DIR, "benchmarks", "baseline.json")
+GROUPS = ("clean", "score", "export")
+
+# --- 合成データ ---
+_SYMBOL_WEIGHTS = {"◎": 3, "〇": 4, "△": 3, "×": 2} # 実際の評価に近い偏り (◎〇が多め)
+_REASON_PHRASES = [
+    "ホテルのフロント業務を{years}年経験しており、接客の基礎がある。",
+    "旅館での客室係の経験があり、宿泊業への理解が深い。",
+    "マネージャーとして{staff}名のスタッフをまとめた経験がある。",
+    "職務経歴に記載がなく、判断材料が不足している。",
+    "自己PRに「チームでの連携を大切にしている」とあり、協調性が期待できる。",
+    "転職回数が{changes}回と多く、定着性に懸念がある。",
+    "副業の希望について記載がなく、条件面の確認が必要。",
+    "英語（日常会話）で海外のお客様に対応した経験がある。",
+]
+
+
+def generate_evaluation(rng):
+    """
+    gemini_evaluation と同じ形 (config.ITEM_WEIGHTS の全項目を埋めた辞書) の評価結果を1件作る
+    理由にはエクスポートでエスケープが必要な文字 (カンマ・引用符・改行・|) もときどき混ぜる
+    """
+    symbols, weights = zip(*_SYMBOL_WEIGHTS.items())
+    evaluation = {}
+    for category, items in config.ITEM_WEIGHTS.items():
+        evaluation[category] = {}
+        for item_key in items:
+            reason = "".join(
+                rng.choice(_REASON_PHRASES).format(years=rng.randint(1, 10), staff=rng.randint(3, 30), changes=rng.randint(2, 6))
+                for _ in range(rng.randint(1, 3))
+            )
+            if rng.random() < 0.1:
+                reason += rng.choice([' "要確認", 面談で質問する', "\n詳細は面談で確認", " | 補足あり"])
+            evaluation[category][item_key] = {"symbol": rng.choices(symbols, weights)[0], "reason": reason}
+    return {
+        "evaluation": evaluation,
+        "candidate_identifier": f"会員No.{rng.randint(100000, 999999)}",
+        "overall_comment": "".join(rng.choice(_REASON_PHRASES).format(years=3, staff=10, changes=2) for _ in range(3)),
+    }
+
+
+def generate_evaluations(count, seed=0):
+    rng = random.Random(seed)
+    return [generate_evaluation(rng) for _ in range(count)]
+
+
+def iter_results(count, seed=0):
+    """/api/evaluate のレスポンス (保存済みの結果) と同じ形の結果を1件ずつ作る"""
+    rng = random.Random(seed)
+    for index in range(count):
+        gemini_evaluation = generate_evaluation(rng)
+        yield {
+            "result_id": f"{seed:04d}{index:012d}",
+            "gemini_evaluation": gemini_evaluation,
+            "calculated_scores": scoring_service.calculate_scores(gemini_evaluation),
+            "evaluated_at": f"2025-03-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+        }
+
+
+def _warm_symbol_rows(evaluations):
+    """評価結果の行を SymbolRowCache に覚えさせ、そのキーのリストを返す"""
+    keys = [("bench", index) for index in range(len(evaluations))]
+    scoring_service.symbol_rows.clear()
+    scoring_service.calculate_scores_bulk(evaluations, keys=keys)
+    return keys
+
+
+# --- ケース ---
+# 各ケースは (名前, 処理する件数, 準備済みの入力を受け取って1回分の処理をする関数, 入力を作る関数)
+def build_cases(sizes, seed):
+    cases = []
+    # クレンジング: 1名分の通常の貼り付けと、フッター以降に他会員が大量に続く貼り付け
+    # (フッターが無い貼り付けは最後の行まで処理するので、件数に比例して遅くなる)
+    for members in (0, 2000):
+        cases.append((
+            f"clean/scout_page_members={members}", 1,
+            text_processing.clean_candidate_text,
+            lambda members=members: generate_scout_page(members, seed=seed),
+        ))
+        cases.append((
+            f"clean/no_footer_members={members}", 1,
+            text_processing.clean_candidate_text,
+            lambda members=members: generate_scout_page(members, seed=seed).replace("今見ているレジュメ", "見ているレジュメ"),
+        ))
+    for size in sizes:
+        cases.append((
+            f"score/calculate_scores_n={size}", size,
+            lambda evaluations: [scoring_service.calculate_scores(evaluation) for evaluation in evaluations],
+            lambda size=size: generate_evaluations(size, seed),
+        ))
+        cases.append((
+            f"score/calculate_scores_bulk_n={size}", size,
+            lambda evaluations: scoring_service.calculate_scores_bulk(evaluations),
+            lambda size=size: generate_evaluations(size, seed),
+        ))
+        # /api/rescore で同じ結果を別の重みで再計算する場合 (行は SymbolRowCache に覚えてあるので、行列の組み立てを省ける)
+        cases.append((
+            f"score/calculate_scores_bulk_cached_n={size}", size,
+            lambda keys: scoring_service.calculate_scores_bulk([None] * len(keys), keys=keys),
+            lambda size=size: _warm_symbol_rows(generate_evaluations(size, seed)),
+        ))
+        cases.append((
+            f"export/generate_csv_n={size}", size,
+            export_utils.generate_csv,
+            lambda size=size: list(iter_results(size, seed)),
+        ))
+        cases.append((
+            f"export/generate_markdown_n={size}", size,
+            export_utils.generate_markdown,
+            lambda size=size: list(iter_results(size, seed)),
+        ))
+    # ストリーミング出力 (/api/export の filter 指定と同じく、結果を1件ずつ読みながら書き出す)。
+    # 入力もその場で作るので、ピークメモリが件数に比例しないことを確認できる (時間には結果の生成も含む)
+    largest = max(sizes)
+    cases.append((
+        f"export/iter_csv_streamed_n={largest}", largest,
+        lambda count: sum(len(chunk) for chunk in export_utils.iter_csv(iter_results(count, seed))),
+        lambda: largest,
+    ))
+    return cases
+
+
+def _loops_for(func, prepared, min_seconds):
+    """1回の計測が min_seconds 以上になる繰り返し回数 (数ミリ秒以下のケースでばらつきを抑えるため)"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(prepared)
+        if time.perf_counter() - start >= min_seconds:
+            return loops
+        loops *= 2
+
+
+def measure(func, prepared, repeat, min_seconds):
+    """
+    1回あたりの処理時間 (秒。repeat 回測った最速値) と、
+    別に1回だけ tracemalloc の下で動かしたときのピークメモリ (バイト) を返す
+    """
+    loops = _loops_for(func, prepared, min_seconds)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(prepared)
+        best = min(best, (time.perf_counter() - start) / loops)
+    # tracemalloc は処理を数倍遅くするので、時間の計測とは分けて動かす
+    tracemalloc.start()
+    try:
+        func(prepared)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """ベースラインより time_threshold / memory_threshold (割合) を超えて悪くなったケースの一覧を返す"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["seconds"] > previous["seconds"] * (1 + time_threshold):
+            regressions.append(f"{name}: time {previous['seconds'] * 1000:.2f} ms -> {current['seconds'] * 1000:.2f} ms")
+        if current["peak_bytes"] > previous["peak_bytes"] * (1 + memory_threshold):
+            regressions.append(
+                f"{name}: peak memory {previous['peak_bytes'] / 2**20:.2f} MB -> {current['peak_bytes'] / 2**20:.2f} MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cleansing, scoring and export against a saved baseline.")
+    parser.add_argument("--sizes", default="10,1000,10000", help="comma-separated result counts for score/export cases")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"comma-separated case groups ({', '.join(GROUPS)})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="minimum seconds per timing run (short cases are looped)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline JSON to compare with / save to")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--time-threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.10, help="allowed peak memory growth")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    groups = {group.strip() for group in args.only.split(",") if group.strip()}
+    unknown = groups - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {sorted(unknown)}")
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"{'case':<40} {'items':>7} {'ms':>10} {'items/s':>12} {'peak MB':>9} {'vs base':>8}")
+    for name, items, func, prepare in build_cases(sizes, args.seed):
+        if name.split("/")[0] not in groups:
+            continue
+        seconds, peak = measure(func, prepare(), args.repeat, args.min_time)
+        results[name] = {"items": items, "seconds": seconds, "peak_bytes": peak}
+        previous = baseline.get(name)
+        change = f"{seconds / previous['seconds'] - 1:>+7.0%}" if previous else f"{'-':>7}"
+        print(f"{name:<40} {items:>7} {seconds * 1000:>10.2f} {items / seconds:>12,.0f} {peak / 2**20:>9.2f} {change:>8}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+        return
+    if not baseline:
+        print(f"No baseline at {args.baseline} (run with --save-baseline to create one)")
+        return
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# backend/benchmarks/bench_text_processing.py
+# clean_candidate_text のベンチマーク
+# doda 風の大きな貼り付けテキストを合成し、旧実装 (1行ごとに全パターンを re.match) と
+# 現在の実装 (起動時にコンパイル済みのルール) の処理時間を比べる。出力が一致することも確認する。
+#
+# 実行方法 (backend ディレクトリで):
+#   python benchmarks/bench_text_processing.py
+#   python benchmarks/bench_text_processing.py --members 500 --repeat 5
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import text_processing
+
+
+def _legacy_clean_candidate_text(raw_text):
+    """比較用: コンパイル済みルール導入前の clean_candidate_text (ログ出力を除いて同じ処理)"""
+    if not isinstance(raw_text, str):
+        return ""
+    lines = raw_text.splitlines()
+    cleaned_lines = []
+    is_header = True
+    for line in lines:
+        line_to_check = line.strip()
+        if is_header:
+            if re.match(text_processing.HEADER_END_PATTERN, line_to_check, re.IGNORECASE):
+                is_header = False
+            else:
+                continue
+        if re.match(text_processing.FOOTER_START_PATTERN, line_to_check, re.IGNORECASE):
+            break
+        should_remove = False
+        for pattern in text_processing.LINE_PATTERNS_TO_REMOVE:
+            if re.match(pattern, line_to_check, re.IGNORECASE):
+                should_remove = True
+                break
+        if not should_remove:
+            if line_to_check or (cleaned_lines and cleaned_lines[-1].strip()):
+                cleaned_lines.append(line)
+    return "\n".join(cleaned_lines).strip()
+
+
+_HEADER_LINES = [
+    "doda ダイレクト", "検索条件を保存", "求職者を探す", "スカウト管理", "お知らせ", "ヘルプ", "ログアウト",
+]
+_PROFILE_BLOCK = [
+    "更新日：2025/03/{day:02d}", "年齢", "{age}歳", "性別", "{gender}", "居住地", "{pref}",
+    "年収", "{income}万円", "現職・離職", "就業中", "最終学歴", "大学", "専攻", "観光学部", "卒業区分", "卒業",
+    "活動状況", "スカウト状況", "※スカウト送信情報の閲覧期限は送信日から1年です",
+    "閲覧可能なスカウト送信情報がありません",
+]
+_CAREER_BLOCK = [
+    "職務経歴", "転職回数", "{changes}回", "海外赴任先", "なし", "直近の職務経歴",
+    "在籍企業", "株式会社{company}", "雇用形態", "{employment}", "業種", "ホテル・旅館", "職種", "{job}",
+    "職務内容", "{duty}",
+    "経験・スキル", "経験職種1", "{job}", "業種1", "ホテル・旅館", "スキル1", "接客",
+    "語学力・資格", "語学力", "英語（日常会話）", "保有資格", "普通自動車第一種運転免許",
+    "行動履歴", "最終ログイン：2025/03/{day:02d}", "スカウト受信数：{scouts}件", "転職活動状況：情報収集中",
+    "よく閲覧する職種：ホテル・旅館", "貴社求人に", "対する行動：なし",
+    "希望条件", "勤務地", "{pref}", "時期", "3ヶ月以内", "転居／転勤", "可",
+    "自由記入欄", "自己PR／表彰歴／職務概要等…", "{pr}", "-----", "",
+]
+_FOOTER_LINES = [
+    "今見ているレジュメと類似するレジュメの対象者が{count}名います",
+]
+
+
+def generate_scout_page(members=200, seed=0, paragraph_lines=6):
+    """
+    doda 風のスカウト画面をまるごと貼り付けたようなテキストを作る
+    先頭の候補者の後にフッター (類似レジュメ一覧) として他の会員情報が続く形にする。
+    Args:
+        members (int): フッター以降に続く他会員の件数 (テキストの大きさを決める)
+        seed (int): 乱数シード (結果を再現できるように)
+        paragraph_lines (int): 自己PR・職務内容の行数
+    """
+    rng = random.Random(seed)
+
+    def member_block(number):
+        values = {
+            "day": rng.randint(1, 28), "age": rng.randint(20, 45), "gender": rng.choice(["男性", "女性"]),
+            "pref": rng.choice(["東京都", "大阪府", "京都府", "北海道", "沖縄県"]),
+            "income": rng.randint(250, 700), "changes": rng.randint(0, 5),
+            "company": rng.choice(["ホテルA", "旅館B", "リゾートC", "トラベルD"]),
+            "employment": rng.choice(["正社員", "契約社員", "業務委託", "アルバイト"]),
+            "job": rng.choice(["フロント", "客室係", "支配人", "料飲サービス"]),
+            "scouts": rng.randint(0, 300),
+            "duty": "\n".join(
+                "　" + rng.choice(["フロント業務全般を担当。", "予約管理とチェックイン対応。", "客室清掃の品質管理。",
+                                  "新人スタッフの教育を担当。", "宴会場の運営。"]) * rng.randint(1, 4)
+                for _ in range(paragraph_lines)
+            ),
+            "pr": "\n".join(
+                rng.choice(["お客様第一で行動してきました。", "チームでの連携を大切にしています。",
+                            "マネージャーとして10名をまとめました。", "語学を活かして海外のお客様に対応しました。"]) * rng.randint(1, 5)
+                for _ in range(paragraph_lines)
+            ),
+        }
+        lines = [f"会員No.{number}｜{rng.choice(['未閲覧', '閲覧済み'])}"]
+        lines += [line.format(**values) for line in _PROFILE_BLOCK + _CAREER_BLOCK]
+        return lines
+
+    lines = list(_HEADER_LINES)
+    lines += member_block(100000 + seed)
+    lines += [line.format(count=members) for line in _FOOTER_LINES]
+    for i in range(members):
+        lines += member_block(200000 + i)
+    return "\n".join(lines)
+
+
+def _best_time(func, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _quiet_clean(text):
+    # clean_candidate_text のログ出力は計測に含めない
+    with contextlib.redirect_stdout(io.StringIO()):
+        return text_processing.clean_candidate_text(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clean_candidate_text on large pasted scout pages.")
+    parser.add_argument("--members", type=int, default=200, help="number of other members after the footer")
+    parser.add_argument("--paragraph-lines", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        # (名前, テキスト) フッターがある通常ケースと、フッターが無く全行を処理するケース
+        ("with footer", generate_scout_page(args.members, paragraph_lines=args.paragraph_lines)),
+        ("no footer", generate_scout_page(args.members, paragraph_lines=args.paragraph_lines).replace("今見ているレジュメ", "見ているレジュメ")),
+    ]
+    print(f"{'case':<12} {'size':>10} {'lines':>8} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    for name, text in cases:
+        expected = _legacy_clean_candidate_text(text)
+        actual = _quiet_clean(text)
+        if expected != actual:
+            print(f"ERROR: output mismatch for case '{name}'")
+            sys.exit(1)
+        legacy = _best_time(_legacy_clean_candidate_text, text, args.repeat)
+        current = _best_time(_quiet_clean, text, args.repeat)
+        print(f"{name:<12} {len(text):>10} {text.count(chr(10)) + 1:>8} {legacy * 1000:>10.2f} {current * 1000:>11.2f} {legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# backend/benchmarks/load_test.py
+# サーバー全体の負荷試験 (Gemini の代わりにオフラインの代役を使うので、APIキー・クォータは不要)
+# ワーカーの方式ごとに gunicorn でサーバーを起動し、/api/evaluate と /api/export を指定した同時接続数で叩いて、
+# 遅延の p50 / p95 / p99、スループット、エラー率を表示する。
+#   sync   : gunicorn run:app -k sync     (1プロセス1リクエストずつ)
+#   gthread: gunicorn run:app -k gthread  (スレッドで同時に処理)
+#   asgi   : gunicorn asgi:app -k uvicorn.workers.UvicornWorker (Procfile と同じ。評価は非同期で待つ)
+#
+# 実行方法 (backend ディレクトリで):
+#   python benchmarks/load_test.py
+#   python benchmarks/load_test.py --workers gthread,asgi --concurrency 32 --requests 400 --latency 2.0
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# generate_scout_page を読み込むと app パッケージも初期化されるので、このプロセスでも代役を使う
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+
+from bench_text_processing import generate_scout_page
+
+WORKER_MODELS = {
+    "sync": ["run:app", "-k", "sync"],
+    "gthread": ["run:app", "-k", "gthread", "--threads", "{threads}"],
+    "asgi": ["asgi:app", "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+def percentile(values, fraction):
+    """最近傍順位法のパーセンタイル (values は並べ替え済み)"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def start_server(worker_model, args, data_dir):
+    """代役の Gemini を使う設定で gunicorn を起動し、応答するようになるまで待つ"""
+    command = [sys.executable, "-m", "gunicorn"]
+    command += [part.format(threads=args.threads) for part in WORKER_MODELS[worker_model]]
+    command += ["-w", str(args.processes), "-b", f"127.0.0.1:{args.port}", "--timeout", "600"]
+    env = dict(
+        os.environ,
+        GEMINI_BACKEND="fake",
+        FAKE_GEMINI_LATENCY_SECONDS=str(args.latency),
+        FAKE_GEMINI_LATENCY_SIGMA=str(args.sigma),
+        BACKEND_DATA_DIR=data_dir,
+    )
+    if args.no_quota:
+        # クライアント側の流量制限で待たされないようにする (サーバー自体の処理能力だけを測る)
+        env.update(GEMINI_RPM_LIMIT="1000000000", GEMINI_TPM_LIMIT="1000000000000")
+    log = open(os.path.join(data_dir, f"{worker_model}.log"), "w")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{worker_model} server exited (see {log.name})")
+        try:
+            if requests.get(base_url + "/", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{worker_model} server did not start within 60s (see {log.name})")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_load(base_url, args):
+    """
+    /api/evaluate と /api/export を混ぜて投げ、1件ごとの (種類, 成否, 秒数, ティア) を返す
+    評価する候補者テキストは毎回違うもの (キャッシュに当たらない) を使う
+    """
+    local = threading.local()
+    rng = random.Random(args.seed)
+    kinds = ["export" if rng.random() < args.export_ratio else "evaluate" for _ in range(args.requests)]
+
+    def send(index):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        kind = kinds[index]
+        start = time.perf_counter()
+        tier = None
+        try:
+            if kind == "evaluate":
+                text = generate_scout_page(0, seed=args.seed * 100000 + index)
+                response = session.post(base_url + "/api/evaluate", json={"candidate_text": text}, timeout=600)
+                ok = response.status_code == 200
+                if ok:
+                    tier = response.json().get("model_tier")
+            else:
+                response = session.post(base_url + "/api/export", json={"format": "csv", "filter": {"limit": args.export_limit}},
+                                        timeout=600)
+                ok = response.status_code == 200
+                if ok:
+                    response.content # 最後まで読む (ストリーミングで返ってくる)
+        except requests.RequestException:
+            ok = False
+        return kind, ok, time.perf_counter() - start, tier
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        samples = list(executor.map(send, range(args.requests)))
+    return samples, time.perf_counter() - start
+
+
+def report(worker_model, samples, elapsed):
+    for kind in ("evaluate", "export"):
+        kind_samples = [sample for sample in samples if sample[0] == kind]
+        if not kind_samples:
+            continue
+        latencies = sorted(seconds for _, ok, seconds, _ in kind_samples if ok)
+        errors = sum(1 for _, ok, _, _ in kind_samples if not ok)
+        p50, p95, p99 = (percentile(latencies, fraction) for fraction in (0.50, 0.95, 0.99))
+        print(f"{worker_model:>8} {kind:>8} {len(kind_samples):>6} {len(kind_samples) / elapsed:>8.2f} "
+              f"{errors / len(kind_samples):>6.1%} "
+              + " ".join(f"{value * 1000:>8.0f}" if value is not None else f"{'-':>8}" for value in (p50, p95, p99)))
+    tiers = Counter(tier for kind, ok, _, tier in samples if kind == "evaluate" and ok)
+    print(f"{'':>8} tiers: " + ", ".join(f"{tier}={count}" for tier, count in sorted(tiers.items(), key=str)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /api/evaluate and /api/export against a fake Gemini backend.")
+    parser.add_argument("--workers", default="sync,gthread,asgi", help=f"comma-separated worker models ({', '.join(WORKER_MODELS)})")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--requests", type=int, default=200, help="requests per worker model")
+    parser.add_argument("--export-ratio", type=float, default=0.1, help="fraction of requests that hit /api/export")
+    parser.add_argument("--export-limit", type=int, default=50, help="results per export")
+    parser.add_argument("--latency", type=float, default=1.5, help="median fake Gemini latency (seconds)")
+    parser.add_argument("--sigma", type=float, default=0.4, help="lognormal sigma of the fake latency (0 = fixed)")
+    parser.add_argument("--processes", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=16, help="threads per process (gthread)")
+    parser.add_argument("--port", type=int, default=5101)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-quota", action="store_true", help="lift the client-side RPM/TPM limits")
+    args = parser.parse_args()
+
+    worker_models = [name.strip() for name in args.workers.split(",") if name.strip()]
+    unknown = [name for name in worker_models if name not in WORKER_MODELS]
+    if unknown:
+        parser.error(f"unknown worker models: {unknown}")
+
+    print(f"concurrency {args.concurrency}, {args.requests} requests, fake latency median {args.latency}s (sigma {args.sigma}), "
+          f"{args.processes} processes{', no quota' if args.no_quota else ''}")
+    print(f"{'worker':>8} {'route':>8} {'count':>6} {'req/s':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for worker_model in worker_models:
+        data_dir = tempfile.mkdtemp(prefix=f"load_test_{worker_model}_")
+        process, base_url = start_server(worker_model, args, data_dir)
+        try:
+            samples, elapsed = run_load(base_url, args)
+        finally:
+            stop_server(process)
+        report(worker_model, samples, elapsed)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# backend/tests/test_cache_service.py
+# 評価結果キャッシュ (services/cache_service.py) の SQLite 層のテスト
+# 接続はスレッドごと・プロセスごとに開き、取り出すたびには書き込まず、最終アクセス時刻はまとめて書くことを確認する
+import threading
+
+import pytest
+
+from app import config
+from app.services import cache_service
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return cache_service.EvaluationCache(
+        max_entries=1, # メモリ層は1件だけにして、SQLite 層から読ませる
+        ttl_seconds=60,
+        sqlite_path=str(tmp_path / "cache.sqlite3"),
+        sqlite_max_entries=2,
+    )
+
+
+def _last_access(cache, key):
+    row = cache._connection().execute("SELECT last_access FROM evaluation_cache WHERE key = ?", (key,)).fetchone()
+    return row[0]
+
+
+def test_construction_does_not_open_sqlite(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache_service.EvaluationCache(max_entries=1, ttl_seconds=60, sqlite_path=str(path))
+    assert not path.exists()
+
+
+def test_get_from_sqlite_does_not_write(cache):
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2}) # "a" はメモリ層から追い出される
+    conn = cache._connection()
+    changes = conn.total_changes
+    assert cache.get("a") == {"value": 1}
+    assert conn.total_changes == changes
+    assert conn.in_transaction is False
+
+
+def test_access_times_are_flushed_in_batches(cache, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_SQLITE_ACCESS_FLUSH_ENTRIES", 2)
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})
+    written = {key: _last_access(cache, key) for key in ("a", "b")}
+
+    assert cache.get("a") == {"value": 1}
+    assert _last_access(cache, "a") == written["a"] # 1件目はまだ書かない
+    assert cache.get("b") == {"value": 2} # 2件たまったので、まとめて書く
+    assert _last_access(cache, "a") > written["a"]
+    assert _last_access(cache, "b") > written["b"]
+    assert cache._pending_access == {}
+
+
+def test_eviction_uses_pending_access_times(cache):
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})
+    cache.get("a") # "b" より新しく使った (まだ書き込み待ち)
+    cache.set("c", {"value": 3}) # 上限2件なので、一番使われていない "b" が消える
+    keys = {key for (key,) in cache._connection().execute("SELECT key FROM evaluation_cache")}
+    assert keys == {"a", "c"}
+
+
+def test_expired_entries_are_not_returned(cache, monkeypatch):
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})
+    monkeypatch.setattr(cache_service.time, "time", lambda: 10 ** 12)
+    assert cache.get("a") is None
+
+
+def test_connections_are_per_thread_and_per_process(cache):
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})
+    main_conn = cache._connection()
+    seen = {}
+
+    def read():
+        seen["value"] = cache.get("a")
+        seen["conn"] = cache._connection()
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    assert seen["value"] == {"value": 1}
+    assert seen["conn"] is not main_conn
+
+    # fork した子プロセスでは (pid が変わるので) 親の接続を使わずに開き直す
+    cache._local.pid = -1
+    assert cache._connection() is not main_conn
@@ -0,0 +1,175 @@
+# backend/tests/test_gemini_client.py
+# Gemini 呼び出しの共通窓口 (gemini_service.GeminiClient / TokenBucket) のテスト
+# 一時的なエラーの再試行、期限 (バックオフとクォータ待ちの両方)、再試行しないエラーを代役のモデルで確認する
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app import config
+from app.services import gemini_service
+from app.services import metrics
+from app.services.fake_gemini import FakeGenerativeModel
+
+
+class FlakyModel(FakeGenerativeModel):
+    """errors に並べた例外を1回ずつ投げてから、普通に応答する代役"""
+
+    def __init__(self, errors, **kwargs):
+        super().__init__(gemini_service.MODEL_NAME, response_text='{"ok": true}', **kwargs)
+        self.errors = list(errors)
+        self.request_options = []
+
+    def generate_content(self, contents, stream=False, request_options=None, **kwargs):
+        self.request_options.append(request_options)
+        if self.errors:
+            self._record(contents)
+            raise self.errors.pop(0)
+        return super().generate_content(contents, stream=stream, request_options=request_options, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def quick_backoff(monkeypatch):
+    monkeypatch.setattr(config, "GEMINI_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(config, "GEMINI_BACKOFF_MAX_SECONDS", 0.02)
+    monkeypatch.setattr(config, "GEMINI_MAX_RETRIES", 3)
+
+
+def test_retryable_error_is_retried_then_succeeds():
+    model = FlakyModel([google_exceptions.ServiceUnavailable("busy"), google_exceptions.TooManyRequests("quota")])
+    client = gemini_service.GeminiClient(model)
+    before = metrics.GEMINI_RETRIES.value(reason="api_error")
+
+    response = client.generate("候補者テキスト")
+
+    assert response.text == '{"ok": true}'
+    assert len(model.calls) == 3
+    assert metrics.GEMINI_RETRIES.value(reason="api_error") - before == 2
+    assert client.usage.report()[gemini_service.MODEL_NAME]["calls"] == 1
+
+
+def test_retries_stop_at_max_retries():
+    model = FlakyModel([google_exceptions.ServiceUnavailable("busy")] * 10)
+    client = gemini_service.GeminiClient(model)
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        client.generate("候補者テキスト")
+    assert len(model.calls) == config.GEMINI_MAX_RETRIES + 1
+
+
+def test_non_retryable_error_is_raised_immediately():
+    model = FlakyModel([ValueError("bad request")])
+    client = gemini_service.GeminiClient(model)
+    with pytest.raises(ValueError):
+        client.generate("候補者テキスト")
+    assert len(model.calls) == 1
+
+
+def test_deadline_bounds_backoff(monkeypatch):
+    # バックオフ (10秒) が期限 (0.5秒) を超えるので、待たずにそのエラーを返す
+    monkeypatch.setattr(config, "GEMINI_BACKOFF_BASE_SECONDS", 10.0)
+    monkeypatch.setattr(config, "GEMINI_BACKOFF_MAX_SECONDS", 10.0)
+    monkeypatch.setattr(gemini_service.random, "uniform", lambda low, high: high)
+    model = FlakyModel([google_exceptions.ServiceUnavailable("busy")])
+    client = gemini_service.GeminiClient(model)
+
+    started = time.monotonic()
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        client.generate("候補者テキスト", deadline_seconds=0.5)
+    assert time.monotonic() - started < 0.5
+    assert len(model.calls) == 1
+    # 1回ごとのタイムアウトも、残りの期限より長くしない
+    assert model.request_options[0]["timeout"] <= 0.5
+
+
+def test_deadline_bounds_quota_wait():
+    model = FlakyModel([])
+    client = gemini_service.GeminiClient(model)
+    client.request_bucket = gemini_service.TokenBucket(1, 1) # 1分に1回
+    client.generate("候補者テキスト")
+
+    started = time.monotonic()
+    with pytest.raises(gemini_service.GeminiDeadlineExceeded):
+        client.generate("候補者テキスト", deadline_seconds=1)
+    assert time.monotonic() - started < 0.5
+    assert len(model.calls) == 1
+
+    # トークン数の待ちで断った場合は、先に予約した回数の分を戻す
+    client = gemini_service.GeminiClient(model)
+    client.token_bucket = gemini_service.TokenBucket(1, 1)
+    client.token_bucket.reserve(1)
+    with pytest.raises(gemini_service.GeminiDeadlineExceeded):
+        client.generate("候補者テキスト", deadline_seconds=1)
+    assert client.request_bucket._tokens == pytest.approx(client.request_bucket.capacity, abs=1)
+    assert len(model.calls) == 1
+
+
+def test_quota_wait_within_deadline_is_waited_out():
+    model = FlakyModel([])
+    client = gemini_service.GeminiClient(model)
+    client.request_bucket = gemini_service.TokenBucket(1, 600) # 0.1秒に1回
+    client.generate("候補者テキスト")
+
+    started = time.monotonic()
+    client.generate("候補者テキスト", deadline_seconds=5)
+    assert time.monotonic() - started >= 0.08
+    assert len(model.calls) == 2
+
+
+def test_usage_settles_token_estimate():
+    model = FlakyModel([])
+    client = gemini_service.GeminiClient(model)
+    client.token_bucket = gemini_service.TokenBucket(100000, 1)
+    client.generate("候補者テキスト")
+    usage = model.generate_content("候補者テキスト").usage_metadata
+    # 見積もり (出力の見込みを含む) ではなく、実際に使った分だけが引かれている
+    assert client.token_bucket._tokens == pytest.approx(100000 - usage.total_token_count, abs=1)
+
+
+class _Chunk:
+    """本物の応答の断片と同じく、テキストの無い断片では text が ValueError を投げる"""
+
+    def __init__(self, texts, prompt_tokens=10, output_tokens=0, blocked=False):
+        self._texts = texts
+        self._blocked = blocked
+        self.usage_metadata = type("Usage", (), {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": output_tokens,
+            "total_token_count": prompt_tokens + output_tokens,
+        })()
+
+    @property
+    def parts(self):
+        if self._blocked:
+            raise ValueError("response.candidates is empty")
+        return [type("Part", (), {"text": text})() for text in self._texts]
+
+    @property
+    def text(self):
+        if not self._texts:
+            raise ValueError("response.text requires a valid Part")
+        return "".join(self._texts)
+
+
+class ChunkedModel(FakeGenerativeModel):
+    def __init__(self, chunks):
+        super().__init__(gemini_service.MODEL_NAME)
+        self.chunks = chunks
+
+    def generate_content(self, contents, stream=False, request_options=None, **kwargs):
+        self._record(contents)
+        return iter(self.chunks)
+
+
+def test_stream_skips_chunks_without_text(monkeypatch):
+    chunks = [
+        _Chunk(['{"a": ']),
+        _Chunk([], blocked=True),
+        _Chunk(["1", "}"]),
+        _Chunk([], output_tokens=5), # 終了理由だけの最後の断片
+    ]
+    client = gemini_service.GeminiClient(ChunkedModel(chunks))
+    monkeypatch.setattr(gemini_service, "client", client)
+
+    assert list(gemini_service.stream_with_gemini(gemini_service.EVALUATION_PROMPT, "候補者テキスト")) == ['{"a": ', "1}"]
+    # 最後の断片まで読んだので、使ったトークン数が精算されている
+    assert client.usage.report()[gemini_service.MODEL_NAME]["calls"] == 1
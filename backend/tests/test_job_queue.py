@@ -0,0 +1,115 @@
+# backend/tests/test_job_queue.py
+# バックグラウンドジョブ (services/job_queue.py) のリース・やり直し・claim_token のテスト
+# ワーカーが落ちても期限切れの1件は取り直され、取り直された後の古いワーカーの書き込みは捨てられることを確認する
+import time
+
+import pytest
+
+from app import config
+from app.services import cache_service
+from app.services import gemini_service
+from app.services import job_queue
+from app.services import metrics
+from app.services import result_store
+from app.services.fake_gemini import FakeGenerativeModel
+
+
+@pytest.fixture
+def store(tmp_path):
+    return job_queue.JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _outcomes():
+    return {outcome: metrics.JOB_ITEMS.value(outcome=outcome) for outcome in ("requeued", "abandoned")}
+
+
+def test_expired_lease_is_requeued(store):
+    store.create_job(["候補者A"])
+    before = _outcomes()
+    first = store.claim_next(lease_seconds=-1) # 取り出した直後に期限切れ (ワーカーが落ちた場合と同じ)
+    second = store.claim_next(lease_seconds=60)
+    assert second is not None
+    assert (second["job_id"], second["item_index"]) == (first["job_id"], first["item_index"])
+    assert second["candidate_text"] == "候補者A"
+    assert second["claim_token"] != first["claim_token"]
+    assert _outcomes()["requeued"] - before["requeued"] == 1
+    # 期限内の1件は取り直さない
+    assert store.claim_next(lease_seconds=60) is None
+
+
+def test_item_fails_after_max_attempts(store, monkeypatch):
+    monkeypatch.setattr(config, "JOB_MAX_ATTEMPTS", 2)
+    job_id, _ = store.create_job(["候補者A"])
+    before = _outcomes()
+    assert store.claim_next(lease_seconds=-1) is not None
+    assert store.claim_next(lease_seconds=-1) is not None
+    assert store.claim_next(lease_seconds=60) is None
+
+    report = store.get_job(job_id, include_results=True)
+    assert report["status"] == "completed"
+    assert report["failed"] == 1
+    assert report["results"][0]["status"] == 500
+    assert "interrupted 2 times" in report["results"][0]["error"]
+    assert _outcomes()["abandoned"] - before["abandoned"] == 1
+
+
+def test_finish_with_stale_claim_token_is_rejected(store):
+    job_id, _ = store.create_job(["候補者A"])
+    stale = store.claim_next(lease_seconds=-1)
+    current = store.claim_next(lease_seconds=60)
+
+    assert store.finish_item(job_id, 0, stale["claim_token"], {"error": "late"}, 500) is False
+    assert store.get_job(job_id)["running"] == 1
+    assert store.finish_item(job_id, 0, current["claim_token"], {"ok": True}, 200) is True
+    report = store.get_job(job_id, include_results=True)
+    assert report["succeeded"] == 1
+    assert report["results"] == [{"index": 0, "status": 200, "ok": True}]
+
+
+def test_renew_leases_only_extends_current_claim(store):
+    store.create_job(["候補者A"])
+    stale = store.claim_next(lease_seconds=-1)
+    current = store.claim_next(lease_seconds=-1)
+    # 取り直された古い印で延ばしても効かず、期限切れのまま
+    store.renew_leases([(stale["job_id"], stale["item_index"], stale["claim_token"])], 60)
+    requeued = store.claim_next(lease_seconds=-1)
+    assert requeued["claim_token"] != current["claim_token"]
+    # 今の印で延ばせば、期限が切れないので取り直されない
+    store.renew_leases([(requeued["job_id"], requeued["item_index"], requeued["claim_token"])], 60)
+    assert store.claim_next(lease_seconds=60) is None
+
+
+def test_heartbeat_keeps_slow_items_leased(store, monkeypatch):
+    # 1件の評価 (0.6秒) がリース (0.2秒) より長くても、ハートビートが延ばすので取り直されない
+    monkeypatch.setattr(config, "JOB_LEASE_SECONDS", 0.2)
+    monkeypatch.setattr(config, "JOB_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(config, "JOB_POLL_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(config, "TIERING_ENABLED", False)
+    monkeypatch.setattr(config, "RESULT_STORE_ENABLED", False)
+    monkeypatch.setattr(result_store, "_result_store", None)
+    monkeypatch.setattr(cache_service, "evaluation_cache", None)
+    model = FakeGenerativeModel(
+        gemini_service.MODEL_NAME,
+        system_instruction=gemini_service.EVALUATION_PROMPT,
+        generation_config=gemini_service.JSON_GENERATION_CONFIG,
+        delay=0.6,
+        vary_by_content=True,
+    )
+    monkeypatch.setattr(gemini_service.client, "model", model)
+
+    candidate_texts = [f"会員No.{number}\n27歳\nホテルのフロント業務を{number}年経験" for number in (1, 2)]
+    job_id, _ = store.create_job(candidate_texts)
+    before = _outcomes()
+    runner = job_queue.JobRunner(store, workers=2)
+    runner.start()
+    try:
+        deadline = time.monotonic() + 10
+        while store.get_job(job_id)["status"] != "completed" and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        assert runner.stop(timeout=5)
+
+    report = store.get_job(job_id)
+    assert report["succeeded"] == 2
+    assert _outcomes()["requeued"] - before["requeued"] == 0
+    assert len(model.calls) == 2
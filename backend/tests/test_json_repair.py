@@ -0,0 +1,155 @@
+# backend/tests/test_json_repair.py
+# 壊れた JSON のローカル修復 (utils/json_repair.py) と、読めない・欠けた出力の頼み直し (gemini_service.recover_evaluation) のテスト
+# ```json の囲み・末尾のカンマ・途中での打ち切りはローカルで直し、項目が欠けていたら評価を1回だけやり直すことを確認する
+import asyncio
+import json
+
+import pytest
+
+from app import config
+from app.services import gemini_service
+from app.services import metrics
+from app.services.fake_gemini import FakeGenerativeModel, build_fake_evaluation
+from app.utils import json_repair
+
+
+class ScriptedModel(FakeGenerativeModel):
+    """responses に並べたテキストを1回ずつ順番に返す代役 (最後の1つは繰り返す)"""
+
+    def __init__(self, model_name, responses):
+        super().__init__(model_name)
+        self.responses = list(responses)
+
+    def _response_for(self, contents):
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+
+def _evaluation_without_item():
+    evaluation = build_fake_evaluation()
+    category = next(iter(config.ITEM_WEIGHTS))
+    item_key = next(iter(config.ITEM_WEIGHTS[category]))
+    del evaluation["evaluation"][category][item_key]
+    return evaluation
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": 1, "b": "x"}\n```', {"a": 1, "b": "x"}),
+    ('以下が評価結果です。\n```json\n{"a": {"b": [1, 2]}}\n```\n以上です。', {"a": {"b": [1, 2]}}),
+    ('{"a": [1, 2,], "b": {"c": 1,},}', {"a": [1, 2], "b": {"c": 1}}),
+    ('{"a": "1行目\n2行目"}', {"a": "1行目\n2行目"}),
+])
+def test_loads_tolerant_repairs_fences_and_trailing_commas(text, expected):
+    assert json_repair.loads_tolerant(text) == (expected, True)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1, "b": "途中', {"a": 1, "b": "途中"}),
+    ('{"a": 1, "b', {"a": 1}),
+    ('{"a": 1, "b":', {"a": 1}),
+    ('{"a": 1, "b": tr', {"a": 1}),
+    ('{"a": 1, "b": true', {"a": 1, "b": True}),
+    ('{"a": [1, 2', {"a": [1, 2]}),
+    ('{"a": {"b": "c\\', {"a": {"b": "c"}}),
+    ('{"a": 1,', {"a": 1}),
+])
+def test_loads_tolerant_closes_truncated_output(text, expected):
+    assert json_repair.loads_tolerant(text) == (expected, True)
+
+
+def test_loads_tolerant_leaves_valid_json_alone():
+    assert json_repair.loads_tolerant('{"a": 1}') == ({"a": 1}, False)
+    assert json_repair.loads_tolerant("JSON はありません") == (None, False)
+    assert json_repair.loads_tolerant(None) == (None, False)
+
+
+def test_parse_evaluation_text_reads_truncated_full_evaluation():
+    evaluation = build_fake_evaluation()
+    text = "```json\n" + json.dumps(evaluation, ensure_ascii=False, indent=2) + "\n```"
+    assert gemini_service.parse_evaluation_text(text) == evaluation
+    # overall_comment の途中で切れても、評価項目がそろっていれば読める
+    truncated = json.dumps(evaluation, ensure_ascii=False)
+    truncated = truncated[:truncated.index('"overall_comment"') + len('"overall_comment": "fake')]
+    result = gemini_service.parse_evaluation_text(truncated)
+    assert "error" not in result
+    assert result["evaluation"] == evaluation["evaluation"]
+    assert result["overall_comment"] == "fake"
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    """client.model と repair_model を ScriptedModel に差し替える関数を返す"""
+    def install(main_responses, repair_responses=("{}",)):
+        main = ScriptedModel(gemini_service.MODEL_NAME, main_responses)
+        repair = ScriptedModel(gemini_service.MODEL_NAME, repair_responses)
+        monkeypatch.setattr(gemini_service.client, "model", main)
+        monkeypatch.setattr(gemini_service, "repair_model", repair)
+        return main, repair
+    monkeypatch.setattr(config, "GEMINI_OUTPUT_RETRIES", 1)
+    return install
+
+
+def _retries():
+    return {reason: metrics.GEMINI_RETRIES.value(reason=reason) for reason in ("repair", "reevaluate")}
+
+
+def test_missing_item_triggers_exactly_one_reevaluation(scripted):
+    complete = build_fake_evaluation()
+    main, repair = scripted([json.dumps(_evaluation_without_item()), json.dumps(complete)])
+    before = _retries()
+
+    result = gemini_service._evaluate_with_gemini(gemini_service.EVALUATION_PROMPT, "候補者テキスト")
+
+    assert result == complete
+    assert len(main.calls) == 2
+    assert main.calls[1] == main.calls[0] # 同じ内容で評価をやり直す
+    assert repair.calls == []
+    assert _retries()["reevaluate"] - before["reevaluate"] == 1
+    assert _retries()["repair"] - before["repair"] == 0
+
+
+def test_reevaluation_is_not_repeated_when_it_fails_again(scripted):
+    incomplete = json.dumps(_evaluation_without_item())
+    main, repair = scripted([incomplete, incomplete])
+
+    result = gemini_service._evaluate_with_gemini(gemini_service.EVALUATION_PROMPT, "候補者テキスト")
+
+    assert result["error"] == "Gemini response does not match the evaluation schema"
+    assert any("missing item" in problem for problem in result["problems"])
+    assert len(main.calls) == 2
+    assert repair.calls == []
+
+
+def test_unreadable_output_is_sent_to_repair_model_once(scripted):
+    complete = build_fake_evaluation()
+    main, repair = scripted(["評価できませんでした"], [json.dumps(complete)])
+    before = _retries()
+
+    result = gemini_service._evaluate_with_gemini(gemini_service.EVALUATION_PROMPT, "候補者テキスト")
+
+    assert result == complete
+    assert len(main.calls) == 1
+    assert repair.calls == ["評価できませんでした"]
+    assert _retries()["repair"] - before["repair"] == 1
+
+
+def test_repairable_output_makes_no_extra_call(scripted):
+    complete = build_fake_evaluation()
+    text = "```json\n" + json.dumps(complete, ensure_ascii=False) + ",\n```"
+    main, repair = scripted([text])
+
+    result = gemini_service._evaluate_with_gemini(gemini_service.EVALUATION_PROMPT, "候補者テキスト")
+
+    assert result == complete
+    assert len(main.calls) == 1
+    assert repair.calls == []
+
+
+def test_recover_evaluation_async_reevaluates_once(scripted):
+    complete = build_fake_evaluation()
+    main, repair = scripted([json.dumps(_evaluation_without_item()), json.dumps(complete)])
+
+    result = asyncio.run(gemini_service._evaluate_with_gemini_async(gemini_service.EVALUATION_PROMPT, "候補者テキスト"))
+
+    assert result == complete
+    assert len(main.calls) == 2
+    assert repair.calls == []
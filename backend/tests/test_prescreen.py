@@ -0,0 +1,92 @@
+# backend/tests/test_prescreen.py
+# 必須条件の事前判定 (utils/prescreen.py) のテスト
+# 事前判定で × になると Gemini を呼ばずに評価を打ち切るので、条件を満たす候補者を × にしないことを確認する
+import pytest
+
+from app.utils import prescreen
+
+
+def _symbols(text):
+    return prescreen.provisional_required_symbols(prescreen.extract_facts(text))
+
+
+@pytest.mark.parametrize("text", [
+    "業務委託希望：なし",
+    "業務委託希望なし。正社員のみ",
+    "フリーランス希望ではありません",
+    "業務委託での就業は希望しない",
+    "正社員を希望します。業務委託は考えていません",
+])
+def test_negated_outsourcing_intent_is_not_disqualifying(text):
+    facts = prescreen.extract_facts(text)
+    assert facts["outsourcing_intent"] is False
+    assert not prescreen.is_clear_disqualification(_symbols(text))
+
+
+@pytest.mark.parametrize("text", [
+    "フリーランスとして働きたいとは思いません",
+    "業務委託希望は特にありません",
+    "業務委託希望の方はご遠慮ください",
+    "以前はフリーランスで活動したいと考えていましたが、今は正社員希望",
+])
+def test_unclear_outsourcing_mention_is_left_to_gemini(text):
+    facts = prescreen.extract_facts(text)
+    assert facts["outsourcing_intent"] is False
+    symbols = _symbols(text)
+    assert symbols["outsourcing"]["symbol"] == "△"
+    assert not prescreen.is_clear_disqualification(symbols)
+
+
+@pytest.mark.parametrize("text", [
+    "業務委託として働きたいです",
+    "今後はフリーランスで活動したい",
+    "業務委託希望：なし\n将来は個人事業主として働きたい",
+])
+def test_outsourcing_intent_is_disqualifying(text):
+    assert prescreen.extract_facts(text)["outsourcing_intent"] is True
+
+
+@pytest.mark.parametrize("text", ["副業希望なし", "副業を希望しない", "副業希望：無し", "副業希望：特になし"])
+def test_negated_side_job_intent(text):
+    assert prescreen.extract_facts(text)["side_job_intent"] is False
+
+
+def test_side_job_intent():
+    assert prescreen.extract_facts("副業を希望しています")["side_job_intent"] is True
+
+
+def test_age_is_not_taken_from_free_text():
+    text = "会員No.123\n自己PR\n満10歳から野球を続け、チームワークを学びました"
+    facts = prescreen.extract_facts(text)
+    assert facts["age"] is None
+    assert "age" not in _symbols(text)
+
+
+@pytest.mark.parametrize("text", [
+    "勤続\n12歳",
+    "会員No.123｜未閲覧\n自己PR\n勤続\n12歳\nお客様第一で行動してきました",
+    "会員No.123\n自己PR\n12歳",
+])
+def test_age_is_not_taken_from_standalone_lines_outside_the_profile(text):
+    assert prescreen.extract_facts(text)["age"] is None
+    assert not prescreen.is_clear_disqualification(_symbols(text))
+
+
+def test_age_from_profile_position():
+    text = "会員No.100001｜未閲覧\n27歳\n男性\n在籍企業\n株式会社トラベルD\n勤続\n12歳"
+    assert prescreen.extract_facts(text)["age"] == 27
+
+
+@pytest.mark.parametrize("text, age", [
+    ("年齢\n28歳\n性別\n女性", 28),
+    ("年齢：27歳", 27),
+    ("年齢 31歳 / 満10歳から野球", 31),
+])
+def test_age_from_profile_field(text, age):
+    assert prescreen.extract_facts(text)["age"] == age
+
+
+def test_clear_disqualification_by_age():
+    symbols = _symbols("年齢\n45歳")
+    assert symbols["age"]["symbol"] == "×"
+    assert prescreen.is_clear_disqualification(symbols)
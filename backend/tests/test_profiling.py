@@ -0,0 +1,69 @@
+# backend/tests/test_profiling.py
+# リクエスト単位のプロファイリング (utils/profiling.py と create_app のフック) のテスト
+# サンプリングのスレッドは止めないと動き続けるので、どの終わり方でも止まることを確認する
+import threading
+
+import pytest
+
+from app import config
+from app import create_app
+from app.services import result_store
+from app.utils import profiling
+
+
+def _profiler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "request-profiler" and thread.is_alive()]
+
+
+@pytest.fixture
+def profiled_app(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "JOB_WORKERS_AUTOSTART", False)
+    monkeypatch.setattr(config, "RESULT_STORE_ENABLED", False)
+    monkeypatch.setattr(result_store, "_result_store", None)
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(config, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROFILING_ROUTES", ("/api/export", "/test/raise"))
+    app = create_app()
+
+    @app.route('/test/raise', methods=['POST'])
+    def raise_error():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def test_profile_finish_is_idempotent(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "PROFILING_OUTPUT_DIR", str(tmp_path))
+    profile = profiling.RequestProfile("test")
+    assert profile.finish() is not None
+    assert profile.finish() is None
+    assert _profiler_threads() == []
+
+
+def test_profiler_stops_when_the_request_raises(profiled_app):
+    # 例外がそのまま外に出る場合 (PROPAGATE_EXCEPTIONS) は after_request が呼ばれない
+    profiled_app.testing = True
+    with pytest.raises(RuntimeError):
+        profiled_app.test_client().post('/test/raise', headers={config.PROFILING_HEADER: "1"})
+    assert _profiler_threads() == []
+
+
+def test_profiler_stops_after_error_response(profiled_app):
+    response = profiled_app.test_client().post('/test/raise', headers={config.PROFILING_HEADER: "1"})
+    assert response.status_code == 500
+    response.close()
+    assert _profiler_threads() == []
+
+
+def test_profiler_stops_after_streamed_response(profiled_app):
+    client = profiled_app.test_client()
+    response = client.post(
+        '/api/export',
+        json={"format": "md", "resultsList": [{"gemini_evaluation": {"evaluation": {}}}]},
+        headers={config.PROFILING_HEADER: "1"},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Profile-File"]
+    response.get_data()
+    response.close()
+    assert _profiler_threads() == []
@@ -0,0 +1,102 @@
+# backend/tests/test_prompt_reuse.py
+# 評価プロンプトの使い回しのテスト
+# 評価基準 + JSON出力指示 (EVALUATION_PROMPT) は起動時に1回だけ組み立ててモデルの system_instruction にするので、
+# 評価のたびに組み立て直したり、リクエストに毎回含めて送ったりしていないことを代役のモデルで確認する
+import asyncio
+
+import pytest
+
+from app import config
+from app.services import cache_service
+from app.services import evaluation_service
+from app.services import gemini_service
+from app.services import result_store
+from app.services.fake_gemini import FakeGenerativeModel
+
+CANDIDATE_TEXTS = [
+    "会員No.100001\n27歳\nホテルのフロント業務を3年経験",
+    "会員No.100002\n25歳\n旅館の客室係として勤務",
+    "会員No.100003\n29歳\n飲食店の店長として10名をマネジメント",
+]
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """評価用・速い評価用のモデルを代役に差し替え、キャッシュと結果の保存は使わない"""
+    models = []
+    for name in (gemini_service.MODEL_NAME, gemini_service.FAST_MODEL_NAME):
+        models.append(FakeGenerativeModel(
+            name,
+            system_instruction=gemini_service.EVALUATION_PROMPT,
+            generation_config=gemini_service.JSON_GENERATION_CONFIG,
+            vary_by_content=True,
+        ))
+    monkeypatch.setattr(gemini_service.client, "model", models[0])
+    monkeypatch.setattr(gemini_service, "fast_model", models[1])
+    monkeypatch.setattr(cache_service, "evaluation_cache", None)
+    monkeypatch.setattr(config, "RESULT_STORE_ENABLED", False)
+    monkeypatch.setattr(result_store, "_result_store", None)
+    return models
+
+
+@pytest.fixture
+def prompt_builds(monkeypatch):
+    """build_evaluation_prompt が呼ばれた回数を数える (呼ばれた引数のリスト)"""
+    calls = []
+    build_evaluation_prompt = gemini_service.build_evaluation_prompt
+
+    def counting_build(criteria_prompt):
+        calls.append(criteria_prompt)
+        return build_evaluation_prompt(criteria_prompt)
+
+    monkeypatch.setattr(gemini_service, "build_evaluation_prompt", counting_build)
+    return calls
+
+
+def _sent_contents(models):
+    return [contents for model in models for contents in model.calls]
+
+
+def _assert_only_candidate_text_sent(models):
+    sent = _sent_contents(models)
+    assert len(sent) >= len(CANDIDATE_TEXTS)
+    for contents in sent:
+        assert isinstance(contents, str)
+        assert gemini_service.EVALUATION_PROMPT not in contents
+        assert config.CRITERIA_PROMPT.strip() not in contents
+        assert contents.startswith("## Candidate Information:")
+    # どの候補者の経歴も、いずれかのリクエストで送られている
+    for text in CANDIDATE_TEXTS:
+        career = text.splitlines()[-1]
+        assert any(career in contents for contents in sent), career
+
+
+def test_evaluation_prompt_is_the_models_system_instruction():
+    for lazy_model in (gemini_service.model, gemini_service.fast_model):
+        assert lazy_model._options["system_instruction"] is gemini_service.EVALUATION_PROMPT
+
+
+def test_evaluate_sends_only_candidate_text(fake_models, prompt_builds):
+    for text in CANDIDATE_TEXTS:
+        payload, status_code = evaluation_service.evaluate_candidate_text(text)
+        assert status_code == 200, payload
+    assert prompt_builds == []
+    _assert_only_candidate_text_sent(fake_models)
+
+
+def test_evaluate_async_sends_only_candidate_text(fake_models, prompt_builds):
+    async def evaluate_all():
+        return await asyncio.gather(*(evaluation_service.evaluate_candidate_text_async(text) for text in CANDIDATE_TEXTS))
+
+    for payload, status_code in asyncio.run(evaluate_all()):
+        assert status_code == 200, payload
+    assert prompt_builds == []
+    _assert_only_candidate_text_sent(fake_models)
+
+
+def test_stream_sends_only_candidate_text(fake_models, prompt_builds):
+    for text in CANDIDATE_TEXTS:
+        events = [event for event, _ in evaluation_service.stream_candidate_evaluation(text)]
+        assert events[-1] == "result"
+    assert prompt_builds == []
+    _assert_only_candidate_text_sent(fake_models)
@@ -0,0 +1,91 @@
+# backend/tests/test_scoring.py
+# スコア計算 (services/scoring_service.py) のテスト
+# 一括版 (calculate_scores_bulk) は /api/rescore で calculate_scores の代わりに使うので、同じ結果になることを確認する
+import random
+
+import pytest
+
+from app import config
+from app.services import metrics
+from app.services import scoring_service
+
+SYMBOLS = ["◎", "〇", "△", "×", "?", None]
+
+
+def _random_evaluation(rng):
+    """ランダムな評価データ (カテゴリ・項目の欠け、不明な記号を含む)"""
+    evaluation = {}
+    for category, items in config.ITEM_WEIGHTS.items():
+        if rng.random() < 0.1:
+            continue
+        evaluation[category] = {
+            item_key: {"symbol": rng.choice(SYMBOLS), "reason": "理由"}
+            for item_key in items if rng.random() >= 0.1
+        }
+    return {"evaluation": evaluation}
+
+
+@pytest.fixture
+def evaluations():
+    rng = random.Random(0)
+    return [_random_evaluation(rng) for _ in range(2000)]
+
+
+@pytest.fixture(autouse=True)
+def empty_row_cache():
+    scoring_service.symbol_rows.clear()
+    yield
+    scoring_service.symbol_rows.clear()
+
+
+def _missing_counts():
+    return {kind: metrics.SCORING_MISSING.value(kind=kind) for kind in ("category", "item")}
+
+
+def _delta(before, after):
+    return {kind: after[kind] - before[kind] for kind in before}
+
+
+def test_bulk_matches_calculate_scores(evaluations):
+    expected = [scoring_service.calculate_scores(evaluation) for evaluation in evaluations]
+    assert scoring_service.calculate_scores_bulk(evaluations) == expected
+
+
+def test_bulk_records_missing_like_calculate_scores(evaluations):
+    before = _missing_counts()
+    for evaluation in evaluations:
+        scoring_service.calculate_scores(evaluation)
+    loop_missing = _delta(before, _missing_counts())
+
+    before = _missing_counts()
+    scoring_service.calculate_scores_bulk(evaluations)
+    assert _delta(before, _missing_counts()) == loop_missing
+    assert loop_missing["category"] > 0 and loop_missing["item"] > 0
+
+
+def test_bulk_reuses_cached_rows(evaluations):
+    expected = [scoring_service.calculate_scores(evaluation) for evaluation in evaluations]
+    keys = [("result_id", str(index)) for index in range(len(evaluations))]
+    assert scoring_service.calculate_scores_bulk(evaluations, keys=keys) == expected
+    # 2回目は評価データが無くても、覚えた行から同じ結果になる
+    assert scoring_service.calculate_scores_bulk([None] * len(keys), keys=keys) == expected
+
+
+def test_bulk_with_weight_overrides_matches_calculate_scores(evaluations, monkeypatch):
+    item_weights, category_weights, error = scoring_service.resolve_weights({
+        "category_weights": {"required": 0.5, "preferred": 0.3, "other": 0.2},
+        "item_weights": {"required": {"age": 0.6}},
+    })
+    assert error is None
+    keys = [("id", str(index)) for index in range(len(evaluations))]
+    # 先に既定の重みで行を覚えさせておき、重みを変えても同じ行を使えることを確かめる
+    scoring_service.calculate_scores_bulk(evaluations, keys=keys)
+    bulk = scoring_service.calculate_scores_bulk([None] * len(keys), item_weights, category_weights, keys=keys)
+
+    monkeypatch.setattr(config, "ITEM_WEIGHTS", item_weights)
+    monkeypatch.setattr(config, "CATEGORY_WEIGHTS", category_weights)
+    assert bulk == [scoring_service.calculate_scores(evaluation) for evaluation in evaluations]
+
+
+def test_bulk_invalid_evaluation_gives_empty_scores():
+    assert scoring_service.calculate_scores_bulk([None, {}, {"other": 1}]) == [{}, {}, {}]
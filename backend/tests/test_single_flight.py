@@ -0,0 +1,96 @@
+# backend/tests/test_single_flight.py
+# 同一リクエストの相乗り (gemini_service.SingleFlight / AsyncSingleFlight) のテスト
+# 同じ評価が同時に来ても generate_content は1回だけ呼ばれ、待っている側がキャンセルされても実行中の呼び出しは止まらないことを確認する
+import asyncio
+import threading
+
+import pytest
+
+from app.services import gemini_service
+from app.services import metrics
+from app.services.fake_gemini import FakeGenerativeModel
+
+CANDIDATE_TEXT = "会員No.100001\n27歳\nホテルのフロント業務を3年経験"
+
+
+@pytest.fixture
+def slow_model(monkeypatch):
+    """応答に時間がかかる代役のモデル (同時に来た評価が重なるように)"""
+    model = FakeGenerativeModel(
+        gemini_service.MODEL_NAME,
+        system_instruction=gemini_service.EVALUATION_PROMPT,
+        generation_config=gemini_service.JSON_GENERATION_CONFIG,
+        delay=0.3,
+        vary_by_content=True,
+    )
+    monkeypatch.setattr(gemini_service.client, "model", model)
+    return model
+
+
+def test_concurrent_identical_evaluations_call_gemini_once(slow_model):
+    workers = 5
+    barrier = threading.Barrier(workers)
+    results = [None] * workers
+    joins_before = metrics.SINGLE_FLIGHT_JOINS.value()
+
+    def evaluate(index):
+        barrier.wait()
+        results[index] = gemini_service.evaluate_with_gemini(gemini_service.EVALUATION_PROMPT, CANDIDATE_TEXT)
+
+    threads = [threading.Thread(target=evaluate, args=(index,)) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(slow_model.calls) == 1
+    assert metrics.SINGLE_FLIGHT_JOINS.value() - joins_before == workers - 1
+    assert all(result == results[0] for result in results)
+    # 相乗りした側には別の辞書が渡る
+    assert len({id(result) for result in results}) == workers
+
+
+def test_different_evaluations_are_not_shared(slow_model):
+    texts = [CANDIDATE_TEXT, CANDIDATE_TEXT + "\n調理師免許あり"]
+    threads = [
+        threading.Thread(target=gemini_service.evaluate_with_gemini, args=(gemini_service.EVALUATION_PROMPT, text))
+        for text in texts
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(slow_model.calls) == 2
+
+
+def test_concurrent_identical_async_evaluations_call_gemini_once(slow_model):
+    async def evaluate_all():
+        return await asyncio.gather(*(
+            gemini_service.evaluate_with_gemini_async(gemini_service.EVALUATION_PROMPT, CANDIDATE_TEXT)
+            for _ in range(5)
+        ))
+
+    results = asyncio.run(evaluate_all())
+    assert len(slow_model.calls) == 1
+    assert all(result is not None and result == results[0] for result in results)
+
+
+def test_cancelling_a_waiter_leaves_the_shared_call_running(slow_model):
+    async def scenario():
+        evaluate = lambda: gemini_service.evaluate_with_gemini_async(gemini_service.EVALUATION_PROMPT, CANDIDATE_TEXT)
+        leader = asyncio.ensure_future(evaluate())
+        follower = asyncio.ensure_future(evaluate())
+        await asyncio.sleep(0.05)
+        # 最初に呼んだ側 (実際に API を呼んでいる側) をキャンセルする
+        leader.cancel()
+        late = asyncio.ensure_future(evaluate())
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, await late
+
+    follower_result, late_result = asyncio.run(scenario())
+    assert follower_result is not None
+    assert late_result == follower_result
+    # キャンセル後に来た評価も、実行中の呼び出しに相乗りする
+    assert len(slow_model.calls) == 1
+    assert gemini_service._async_single_flight._calls == {}
@@ -66,7 +66,10 @@ function App() {
     if (exportData.length === 0) { alert("エクスポートする結果がありません。"); return; }
     console.log(`Exporting ${exportData.length} results as ${exportFormat}...`);
     try {
-      const response = await axios.post(`${API_BASE_URL}/export`, { resultsList: exportData, format: exportFormat }, { responseType: 'blob' });
+      // サーバーに保存済みの結果ならIDだけ送る (結果の本体をアップロードし直さない)
+      const resultIds = exportData.map(result => result?.result_id);
+      const payload = resultIds.every(Boolean) ? { resultIds, format: exportFormat } : { resultsList: exportData, format: exportFormat };
+      const response = await axios.post(`${API_BASE_URL}/export`, payload, { responseType: 'blob' });
       const blob = new Blob([response.data], { type: response.headers['content-type'] });
       const url = window.URL.createObjectURL(blob);
       const link = document.createElement('a');